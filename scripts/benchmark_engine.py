@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark the soapcalc calculation and recommendation hot paths
+Writes a JSON report with p50/p95/p99 and calls per second for every
+operation at every catalog size; --baseline flags regressions
+
+Usage:
+    python benchmark_engine.py -o baseline.json
+    python benchmark_engine.py --sizes 150 1000 --samples 50
+    python benchmark_engine.py --baseline baseline.json --tolerance 0.25
+    python benchmark_engine.py --sizes 10000 --profile stages   # stages.json and stages.prom
+"""
+
+import argparse
+import json
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import load_catalog, profiling
+from soapcalc.benchmark import (
+    DEFAULT_SAMPLES,
+    DEFAULT_SEED,
+    DEFAULT_SIZES,
+    DEFAULT_TOLERANCE,
+    OPERATIONS,
+    compare,
+    run_benchmarks,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help=f"Catalog sizes in oils (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES,
+                        help=f"Recipes timed per operation and size (default: {DEFAULT_SAMPLES})")
+    parser.add_argument('--operations', nargs='+', choices=list(OPERATIONS), help="Operations to run (default: all)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+    parser.add_argument('--baseline', help="Earlier report to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed p50 slowdown against the baseline (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="Also record per-stage engine timings to PREFIX.json and PREFIX.prom")
+    parser.add_argument('--track-allocations', action='store_true',
+                        help="With --profile, record tracemalloc allocations per stage (slow)")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    parser.add_argument('-o', '--output', default='-', help="JSON report file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    catalog = load_catalog()
+    startup.mark('catalog')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    def progress(result):
+        print(f"  {result['operation']:<20} {result['oils']:>7} oils  p50 {result['p50_us']:>10.1f} us",
+              file=sys.stderr)
+
+    if args.profile:
+        profiling.enable(track_allocations=args.track_allocations)
+    report = run_benchmarks(catalog, args.sizes, args.samples, args.operations, args.seed, progress)
+    if args.profile:
+        profiling.write_reports(args.profile)
+        profiling.disable()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        report['baseline'] = args.baseline
+        report['regressions'] = regressions
+
+    text = json.dumps(report, indent=2) + '\n'
+    if args.output == '-':
+        sys.stdout.write(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    for regression in regressions:
+        print(f"❌ {regression['operation']} at {regression['oils']} oils: p50 {regression['p50_us']} us, "
+              f"{regression['ratio']}x the baseline", file=sys.stderr)
+    if args.baseline and not regressions:
+        print("✅ No regressions against the baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Precompute the pairwise oil similarity matrix from the seed oil data
+Writes a compressed .npz with the oil ids, fatty acid profiles and uint8 distances
+
+Usage:
+    python build_similarity_index.py
+    python build_similarity_index.py -o /tmp/oil_similarity.npz
+"""
+
+import argparse
+import os
+import sys
+
+from soapcalc import load_catalog
+from soapcalc.similarity import DEFAULT_PATH, SimilarityIndex
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', default=str(DEFAULT_PATH), help=f"Output file (default: {DEFAULT_PATH})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = SimilarityIndex.from_catalog(load_catalog())
+    index.save(args.output)
+
+    print(f"✅ Built similarity index for {len(index)} oils")
+    print(f"📁 File: {args.output} ({os.path.getsize(args.output)} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
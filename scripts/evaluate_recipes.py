@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Evaluate a stream of JSONL recipes with the vectorized soapcalc engine
+Writes one JSONL result per recipe: lye, water, fatty acids and qualities
+
+Usage:
+    python evaluate_recipes.py recipes.jsonl -o results.jsonl
+    cat recipes.jsonl | python evaluate_recipes.py > results.jsonl
+    python evaluate_recipes.py recipes.jsonl -o results.jsonl --workers 0   # all cores
+"""
+
+import argparse
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import load_catalog
+from soapcalc.batch import DEFAULT_CHUNK_SIZE, chunked_lines, evaluate_lines
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default='-', help="JSONL recipes file (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL results file (default: stdout)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Recipes evaluated per vectorized batch (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes sharing the oil catalog; 0 uses every core (default: 1)")
+    parser.add_argument('--replica', help="Read the oil catalog from this SQLite replica (see sync_catalog.py)")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    return parser.parse_args(argv)
+
+
+def open_stream(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, encoding='utf-8')
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    if args.replica:
+        from soapcalc.replica import load_replica_catalog
+        try:
+            catalog = load_replica_catalog(args.replica)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+    else:
+        catalog = load_catalog()
+    startup.mark('catalog')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    source = open_stream(args.input, 'r')
+    target = open_stream(args.output, 'w')
+    if args.workers == 1:
+        chunks = (evaluate_lines(catalog, chunk) for chunk in chunked_lines(source, args.chunk_size))
+    else:
+        from soapcalc.parallel import evaluate_lines_parallel
+        chunks = evaluate_lines_parallel(catalog, source, args.chunk_size, args.workers or None)
+
+    evaluated = errors = 0
+    try:
+        for results, chunk_errors in chunks:
+            target.writelines(result + '\n' for result in results)
+            evaluated += len(results)
+            errors += chunk_errors
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    print(f"✅ Evaluated {evaluated} recipes ({errors} errors)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
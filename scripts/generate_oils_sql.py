@@ -2,11 +2,23 @@
 """
 Convert OIL_DATABASE.md to SQL INSERT statements
 Generates SQL for inserting all oils into the oils table
+
+Usage:
+    python scripts/generate_oils_sql.py                 # full seed migration
+    python scripts/generate_oils_sql.py --incremental   # new migration with only the changed oils
+    python scripts/generate_oils_sql.py --copy csv --chunk-rows 10000   # COPY scripts for bulk loads
+    python scripts/generate_oils_sql.py --source supplier.csv --source extra.jsonl --report issues.jsonl
 """
 
-import re
+import argparse
+import csv
+from datetime import datetime, timezone
+import hashlib
+import os
 import json
 
+from oil_ingest import IngestReport, as_row, file_rows, ingest, markdown_rows
+
 # Oil data from OIL_DATABASE.md
 oils_data = """
 | Abyssinian Oil | 0.168 | 98 | 70 | 0 | 0 | 3 | 2 | 0 | 18 | 11 | 4 |
@@ -160,82 +172,34 @@ oils_data = """
 | Zapote seed oil, (Aceite de Sapuyul or Mamey) | 0.188 | 72 | 116 | 0 | 0 | 9 | 21 | 0 | 52 | 13 | 0 |
 """
 
-def name_to_id(name):
-    """Convert oil name to slug ID"""
-    # Remove special characters and convert to lowercase
-    id_str = name.lower()
-    # Replace special chars with spaces
-    id_str = re.sub(r'[(),/]', ' ', id_str)
-    # Remove extra text in parentheses
-    id_str = re.sub(r'\s+\w+\s+\w+\s+\w+$', '', id_str)  
-    # Replace spaces with hyphens
-    id_str = re.sub(r'\s+', '-', id_str.strip())
-    # Remove multiple hyphens
-    id_str = re.sub(r'-+', '-', id_str)
-    # Remove trailing hyphens
-    id_str = id_str.strip('-')
-    return id_str
+def markdown_source(text=None, label='oils_data'):
+    """The embedded oil table (or other markdown text) as an ingest source"""
+    return label, markdown_rows((oils_data if text is None else text).split('\n'))
 
-def determine_category(name, ins, lauric, myristic):
-    """Determine oil category based on properties"""
-    name_lower = name.lower()
-    
-    if 'butter' in name_lower or 'wax' in name_lower:
-        return 'Butter'
-    elif 'tallow' in name_lower or 'lard' in name_lower or 'fat' in name_lower:
-        return 'Animal Fat'
-    elif 'acid' in name_lower:
-        return 'Fatty Acid'
-    elif ins > 160:
-        return 'Hard Oil'
-    elif (lauric + myristic) > 40:
-        return 'Hard Oil'
-    elif ins < 100:
-        return 'Liquid Oil'
-    else:
-        return 'Soft Oil'
+def parse_oils(sources=None, report=None):
+    """Oil rows from the embedded table, or from (label, rows) ingest sources
 
-def parse_oils():
-    """Parse the oil data and generate SQL"""
-    oils = []
-    
-    for line in oils_data.strip().split('\n'):
-        if not line.strip() or not line.startswith('|'):
-            continue
-            
-        # Parse the table row
-        parts = [p.strip() for p in line.split('|')[1:-1]]  # Skip empty first and last
-        
-        if len(parts) != 12:
-            continue
-            
-        name, sap, iodine, ins, lauric, myristic, palmitic, stearic, ricinoleic, oleic, linoleic, linolenic = parts
-        
-        oil_id = name_to_id(name)
-        category = determine_category(name, int(ins), int(lauric), int(myristic))
-        
-        fatty_acids = {
-            "lauric": int(lauric),
-            "myristic": int(myristic),
-            "palmitic": int(palmitic),
-            "stearic": int(stearic),
-            "ricinoleic": int(ricinoleic),
-            "oleic": int(oleic),
-            "linoleic": int(linoleic),
-            "linolenic": int(linolenic)
-        }
-        
-        oils.append({
-            'id': oil_id,
-            'name': name,
-            'sap': sap,
-            'iodine': iodine,
-            'ins': ins,
-            'category': category,
-            'fatty_acids': json.dumps(fatty_acids)
-        })
-    
-    return oils
+    Invalid rows and repeated ids are left out and recorded in report.
+    """
+    sources = sources if sources is not None else [markdown_source()]
+    return [as_row(record) for record in ingest(sources, report)]
+
+OIL_COLUMNS = ('id', 'name', 'sap_naoh', 'sap_koh', 'iodine', 'ins', 'category', 'fatty_acids', 'is_system')
+
+SEED_FILE = 'supabase/migrations/20251109000003_seed_all_oils.sql'
+MIGRATIONS_DIR = 'supabase/migrations'
+MANIFEST_FILE = 'supabase/seed_manifest.json'
+
+# Rows per INSERT / DELETE statement in incremental migrations
+BATCH_SIZE = 500
+
+COPY_FORMATS = ('text', 'csv')
+COPY_OUTPUT = 'oils_copy.sql'
+
+def sql_values(oil):
+    """The VALUES tuple for one oil"""
+    name_escaped = oil['name'].replace("'", "''")
+    return f"('{oil['id']}', '{name_escaped}', {oil['sap']}, {oil['sap']}, {oil['iodine']}, {oil['ins']}, '{oil['category']}', '{oil['fatty_acids']}'::JSONB, true)"
 
 def generate_sql(oils):
     """Generate SQL INSERT statements"""
@@ -246,30 +210,215 @@ def generate_sql(oils):
     sql.append(f"-- Total oils: {len(oils)}")
     sql.append("-- Generated automatically")
     sql.append("-- =====================================================\n")
-    sql.append("INSERT INTO oils (id, name, sap_naoh, sap_koh, iodine, ins, category, fatty_acids, is_system) VALUES")
+    sql.append(f"INSERT INTO oils ({', '.join(OIL_COLUMNS)}) VALUES")
     
     for i, oil in enumerate(oils):
         comma = "," if i < len(oils) - 1 else ";"
-        name_escaped = oil['name'].replace("'", "''")
-        sql.append(f"('{oil['id']}', '{name_escaped}', {oil['sap']}, {oil['sap']}, {oil['iodine']}, {oil['ins']}, '{oil['category']}', '{oil['fatty_acids']}'::JSONB, true){comma}")
+        sql.append(f"{sql_values(oil)}{comma}")
     
     sql.append("\n-- Verification query:")
     sql.append("-- SELECT category, COUNT(*) as count FROM oils WHERE is_system = true GROUP BY category ORDER BY count DESC;")
     
     return '\n'.join(sql)
 
-if __name__ == '__main__':
-    oils = parse_oils()
-    sql = generate_sql(oils)
+def unique_oils(oils):
+    """Oils with the first row of each duplicate id, like ON CONFLICT (id) DO NOTHING"""
+    seen = set()
+    for oil in oils:
+        if oil['id'] not in seen:
+            seen.add(oil['id'])
+            yield oil
+
+def build_manifest(oils):
+    """Map each oil id to a hash of its row, keeping the first of duplicate ids like the seed does"""
+    return {oil['id']: hashlib.sha256(sql_values(oil).encode('utf-8')).hexdigest() for oil in unique_oils(oils)}
+
+def load_manifest(path):
+    """Row hashes from the last generated catalog, or an empty manifest if there is none"""
+    try:
+        with open(path) as f:
+            return json.load(f)['oils']
+    except FileNotFoundError:
+        return {}
+
+def save_manifest(path, manifest):
+    with open(path, 'w') as f:
+        json.dump({'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'oils': manifest},
+                  f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def diff_oils(oils, previous):
+    """Oils that are new or changed since the previous manifest, and ids that were removed"""
+    current = build_manifest(oils)
+    changed = [oil for oil in unique_oils(oils) if previous.get(oil['id']) != current[oil['id']]]
+    removed = sorted(oil_id for oil_id in previous if oil_id not in current)
+    return changed, removed
+
+def generate_incremental_sql(changed, removed, batch_size=BATCH_SIZE):
+    """Batched upserts for changed oils and deletes for removed ones"""
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in OIL_COLUMNS[1:])
+    sql = []
+    sql.append("-- =====================================================")
+    sql.append("-- INCREMENTAL OIL CATALOG UPDATE")
+    sql.append("-- =====================================================")
+    sql.append(f"-- Upserted oils: {len(changed)}")
+    sql.append(f"-- Deleted oils: {len(removed)}")
+    sql.append("-- Generated automatically by generate_oils_sql.py --incremental")
+    sql.append("-- =====================================================")
+    
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        sql.append(f"\nINSERT INTO oils ({', '.join(OIL_COLUMNS)}) VALUES")
+        sql.append(',\n'.join(sql_values(oil) for oil in batch))
+        sql.append(f"ON CONFLICT (id) DO UPDATE SET {updates};")
+    
+    for start in range(0, len(removed), batch_size):
+        ids = ', '.join(f"'{oil_id}'" for oil_id in removed[start:start + batch_size])
+        sql.append(f"\nDELETE FROM oils WHERE is_system = true AND id IN ({ids});")
+    
+    return '\n'.join(sql) + '\n'
+
+def copy_fields(oil):
+    """Column values for one oil in OIL_COLUMNS order, as COPY reads them"""
+    return [oil['id'], oil['name'], oil['sap'], oil['sap'], oil['iodine'], oil['ins'],
+            oil['category'], oil['fatty_acids'], 'true']
+
+def copy_text_line(fields):
+    """One row in COPY's text format: tab-separated with backslash escapes"""
+    escaped = (field.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+               for field in fields)
+    return '\t'.join(escaped) + '\n'
+
+def chunk_path(output_file, number):
+    """oils_copy.sql -> oils_copy.0001.sql"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}.{number:04d}{ext}"
+
+def write_copy(oils, output_file, copy_format='text', table='oils', chunk_rows=None):
+    """Stream oils into COPY ... FROM STDIN scripts for psql, returning the files written
+
+    With chunk_rows, every chunk_rows oils go into their own numbered file,
+    each a complete COPY that can be loaded independently.
+    """
+    options = ' WITH (FORMAT csv)' if copy_format == 'csv' else ''
+    header = f"COPY {table} ({', '.join(OIL_COLUMNS)}) FROM STDIN{options};\n"
+    files = []
+    f = writer = None
+    rows = 0
+    try:
+        for oil in unique_oils(oils):
+            if f is None or (chunk_rows and rows == chunk_rows):
+                if f is not None:
+                    f.write('\\.\n')
+                    f.close()
+                path = chunk_path(output_file, len(files) + 1) if chunk_rows else output_file
+                f = open(path, 'w', newline='')
+                f.write(header)
+                writer = csv.writer(f, lineterminator='\n') if copy_format == 'csv' else None
+                files.append(path)
+                rows = 0
+            if writer:
+                writer.writerow(copy_fields(oil))
+            else:
+                f.write(copy_text_line(copy_fields(oil)))
+            rows += 1
+        if f is not None:
+            f.write('\\.\n')
+    finally:
+        if f is not None:
+            f.close()
+    return files
+
+def generate_binary_catalog(oils):
+    """Memory-mappable catalog for the Python engine (needs NumPy)"""
+    try:
+        from soapcalc.binary_catalog import DEFAULT_PATH, source_digest, write_binary_catalog
+        from soapcalc.catalog import OilCatalog
+    except ImportError:
+        print("⚠️  NumPy not installed, skipping the binary catalog")
+        return
+    write_binary_catalog(OilCatalog.from_oils(oils), DEFAULT_PATH, source_digest())
+    print(f"📁 Binary catalog: {DEFAULT_PATH}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help="Write a new timestamped migration with only the oils changed since the manifest")
+    mode.add_argument('--copy', choices=COPY_FORMATS,
+                      help="Write COPY ... FROM STDIN scripts in this format instead of INSERT migrations")
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help=f"Row hash manifest (default: {MANIFEST_FILE})")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"Rows per INSERT/DELETE statement (default: {BATCH_SIZE})")
+    parser.add_argument('--output', default=COPY_OUTPUT, help=f"COPY script path (default: {COPY_OUTPUT})")
+    parser.add_argument('--table', default='oils', help="Table COPY loads into, e.g. a staging table (default: oils)")
+    parser.add_argument('--chunk-rows', type=int, help="Split COPY output into numbered files of this many rows")
+    parser.add_argument('--source', action='append', default=[],
+                        help="Markdown, CSV or JSONL oil table to read instead of the embedded one (repeatable)")
+    parser.add_argument('--report', help="Write rejected rows, warnings and duplicate ids to this JSONL file")
+    parser.add_argument('--strict', action='store_true', help="Exit with an error if any row was rejected")
+    return parser.parse_args(argv)
+
+def finish_report(report, args):
+    """Print the ingest summary and write the issue report; returns the exit status"""
+    print(f"{'⚠️ ' if report.rejected else '✅'} Ingest: {report.summary()}")
+    for issue in report.issues[:5]:
+        if issue.severity == 'error':
+            print(f"   {issue.source} line {issue.line}: {issue.message}")
+    if args.report:
+        report.write_jsonl(args.report)
+        print(f"📁 Report: {args.report}")
+    return 1 if args.strict and report.rejected else 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    sources = [(path, file_rows(path)) for path in args.source] or [markdown_source()]
+    report = IngestReport()
+    
+    if args.copy:
+        # COPY streams rows straight from the sources to the files
+        oils = (as_row(record) for record in ingest(sources, report))
+        files = write_copy(oils, args.output, args.copy, args.table, args.chunk_rows)
+        status = finish_report(report, args)
+        print(f"✅ Generated COPY {args.copy} for {report.accepted} oils in {len(files)} file(s)")
+        for path in files:
+            print(f"📁 File: {path}")
+        print(f"\nTo apply: psql \"$DATABASE_URL\" -f {files[0] if files else args.output}")
+        return status
+    
+    oils = parse_oils(sources, report)
+    status = finish_report(report, args)
+    if status:
+        return status
+    
+    if args.incremental:
+        changed, removed = diff_oils(oils, load_manifest(args.manifest))
+        if not changed and not removed:
+            print("✅ No oil changes since the last manifest")
+            return 0
+        timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        output_file = f"{MIGRATIONS_DIR}/{timestamp}_update_oils.sql"
+        sql = generate_incremental_sql(changed, removed, args.batch_size)
+        print(f"✅ Generated SQL for {len(changed)} changed and {len(removed)} removed oils")
+    else:
+        output_file = SEED_FILE
+        sql = generate_sql(oils)
+        print(f"✅ Generated SQL for {len(oils)} oils")
     
     # Write to file
-    output_file = 'supabase/migrations/20251109000003_seed_all_oils.sql'
     with open(output_file, 'w') as f:
         f.write(sql)
+    save_manifest(args.manifest, build_manifest(oils))
     
-    print(f"✅ Generated SQL for {len(oils)} oils")
     print(f"📁 File: {output_file}")
+    print(f"📁 Manifest: {args.manifest}")
+    if not args.source:
+        generate_binary_catalog(oils)
     print(f"\nTo apply:")
     print(f"1. Copy the contents of {output_file}")
     print(f"2. Paste into Supabase SQL Editor")
     print(f"3. Run the query")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
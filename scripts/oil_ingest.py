@@ -0,0 +1,303 @@
+"""
+Streaming oil catalog ingest
+Reads markdown tables, CSV and JSONL supplier sheets one row at a time,
+validates each row and yields typed OilRecords, reporting every rejected
+or suspicious row instead of dropping it
+"""
+
+from collections import namedtuple
+import csv
+import json
+import math
+import os
+import re
+
+# Same order as soapcalc.catalog.FATTY_ACIDS, kept here so the generator runs without NumPy
+FATTY_ACIDS = ('lauric', 'myristic', 'palmitic', 'stearic', 'ricinoleic', 'oleic', 'linoleic', 'linolenic')
+
+# Column order of the markdown tables in OIL_DATABASE.md
+MARKDOWN_COLUMNS = ('name', 'sap', 'iodine', 'ins') + FATTY_ACIDS
+
+# Alternative CSV / JSONL field names for the same values
+FIELD_ALIASES = {
+    'oil': 'name',
+    'oil_name': 'name',
+    'sap_value': 'sap',
+    'sap_koh': 'sap',
+}
+
+# Supplier profiles are whole percentages, so rounding can push the sum a
+# few points over 100; rows over 100 warn and rows over this are rejected
+FATTY_ACID_TOLERANCE = 5
+
+# INS is SAP (mg KOH/g) minus iodine; rows further off than this are flagged
+INS_TOLERANCE = 20
+
+# Issues kept in an IngestReport; later ones are only counted
+MAX_ISSUES = 10000
+
+OilRecord = namedtuple('OilRecord', [
+    'id',
+    'name',
+    'sap',
+    'iodine',
+    'ins',
+    'category',
+    'fatty_acids',  # {acid: percentage}
+    'source',
+    'line',
+])
+
+Issue = namedtuple('Issue', ['source', 'line', 'severity', 'oil_id', 'message'])
+
+
+class RowError(ValueError):
+    """A row that cannot be ingested"""
+
+
+def name_to_id(name):
+    """Convert oil name to slug ID"""
+    # Remove special characters and convert to lowercase
+    id_str = name.lower()
+    # Replace special chars with spaces
+    id_str = re.sub(r'[(),/]', ' ', id_str)
+    # Remove extra text in parentheses
+    id_str = re.sub(r'\s+\w+\s+\w+\s+\w+$', '', id_str)
+    # Replace spaces with hyphens
+    id_str = re.sub(r'\s+', '-', id_str.strip())
+    # Remove multiple hyphens
+    id_str = re.sub(r'-+', '-', id_str)
+    # Remove trailing hyphens
+    id_str = id_str.strip('-')
+    return id_str
+
+def determine_category(name, ins, lauric, myristic):
+    """Determine oil category based on properties"""
+    name_lower = name.lower()
+
+    if 'butter' in name_lower or 'wax' in name_lower:
+        return 'Butter'
+    elif 'tallow' in name_lower or 'lard' in name_lower or 'fat' in name_lower:
+        return 'Animal Fat'
+    elif 'acid' in name_lower:
+        return 'Fatty Acid'
+    elif ins > 160:
+        return 'Hard Oil'
+    elif (lauric + myristic) > 40:
+        return 'Hard Oil'
+    elif ins < 100:
+        return 'Liquid Oil'
+    else:
+        return 'Soft Oil'
+
+def number_text(value):
+    """SQL / JSON text for a number: 70 rather than 70.0, 0.1946 as written"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _json_number(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+class IngestReport:
+    """Counts and per-row issues from one ingest run"""
+
+    def __init__(self, max_issues=MAX_ISSUES):
+        self.max_issues = max_issues
+        self.issues = []
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.warnings = 0
+
+    def add(self, source, line, severity, oil_id, message):
+        if severity == 'error':
+            self.rejected += 1
+        else:
+            self.warnings += 1
+        if len(self.issues) < self.max_issues:
+            self.issues.append(Issue(source, line, severity, oil_id, message))
+
+    def summary(self):
+        return (f"{self.rows} rows read: {self.accepted} accepted, {self.rejected} rejected, "
+                f"{self.duplicates} duplicate ids skipped, {self.warnings} warnings")
+
+    def write_jsonl(self, path):
+        with open(path, 'w') as f:
+            for issue in self.issues:
+                f.write(json.dumps(issue._asdict()) + '\n')
+
+
+def markdown_rows(lines):
+    """(line number, fields) for each table row; header and separator rows are skipped"""
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line.startswith('|'):
+            continue
+        parts = [p.strip() for p in line.strip('|').split('|')]
+        if parts[0].lower() == 'name' or all(set(p) <= set('-: ') for p in parts):
+            continue
+        if len(parts) != len(MARKDOWN_COLUMNS):
+            yield line_number, RowError(f"Expected {len(MARKDOWN_COLUMNS)} columns, got {len(parts)}")
+            continue
+        yield line_number, dict(zip(MARKDOWN_COLUMNS, parts))
+
+def _field_name(key):
+    key = key.strip().lower().replace(' ', '_')
+    return FIELD_ALIASES.get(key, key)
+
+def csv_rows(lines):
+    """(line number, fields) for each CSV record; the first line holds the column names"""
+    reader = csv.reader(lines)
+    header = [_field_name(key) for key in next(reader, [])]
+    for row in reader:
+        if not any(row):
+            continue
+        yield reader.line_num, dict(zip(header, row))
+
+def jsonl_rows(lines):
+    """(line number, fields) for each JSONL object; fatty_acids may be nested"""
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, RowError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError("Expected a JSON object")
+            continue
+        fields = {_field_name(key): value for key, value in row.items()}
+        nested = fields.pop('fatty_acids', None)
+        if isinstance(nested, str):
+            try:
+                nested = json.loads(nested)
+            except json.JSONDecodeError as e:
+                yield line_number, RowError(f"Invalid fatty_acids JSON: {e}")
+                continue
+        if isinstance(nested, dict):
+            fields.update(nested)
+        yield line_number, fields
+
+READERS = {
+    '.md': markdown_rows,
+    '.markdown': markdown_rows,
+    '.csv': csv_rows,
+    '.jsonl': jsonl_rows,
+    '.ndjson': jsonl_rows,
+}
+
+def file_rows(path):
+    """(line number, fields) from a file, read lazily in the format its extension names"""
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"Unknown source format: {path} (expected {', '.join(sorted(READERS))})")
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from reader(f)
+
+def _number(fields, key, default=None):
+    value = fields.get(key)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        if value is None or not str(value).strip():
+            if default is not None:
+                return default
+            raise RowError(f"Missing {key}") from None
+        raise RowError(f"{key} is not a number: {value!r}") from None
+    if not math.isfinite(number):
+        raise RowError(f"{key} is not a number: {value!r}")
+    return number
+
+def validate(fields, source='', line=0):
+    """OilRecord and warning messages for one row; raises RowError if it cannot be used"""
+    name = str(fields.get('name') or '').strip()
+    if not name:
+        raise RowError("Missing name")
+    oil_id = name_to_id(name)
+    if not oil_id:
+        raise RowError(f"Name has no id characters: {name!r}")
+
+    sap = _number(fields, 'sap')
+    iodine = _number(fields, 'iodine')
+    ins = _number(fields, 'ins')
+    fatty_acids = {acid: _number(fields, acid, 0.0) for acid in FATTY_ACIDS}
+
+    if sap <= 0:
+        raise RowError(f"SAP must be positive, got {number_text(sap)}")
+    negative = [acid for acid, value in fatty_acids.items() if value < 0]
+    if negative:
+        raise RowError(f"Negative {negative[0]}: {number_text(fatty_acids[negative[0]])}")
+    total = sum(fatty_acids.values())
+    if total > 100 + FATTY_ACID_TOLERANCE:
+        raise RowError(f"Fatty acids sum to {number_text(round(total, 2))}%")
+
+    warnings = []
+    if total > 100:
+        warnings.append(f"Fatty acids sum to {number_text(round(total, 2))}%")
+    if abs(sap * 1000 - iodine - ins) > INS_TOLERANCE:
+        warnings.append(f"INS {number_text(ins)} is not SAP x 1000 - iodine "
+                        f"({number_text(round(sap * 1000 - iodine, 2))})")
+
+    record = OilRecord(
+        id=oil_id,
+        name=name,
+        sap=sap,
+        iodine=iodine,
+        ins=ins,
+        category=determine_category(name, ins, fatty_acids['lauric'], fatty_acids['myristic']),
+        fatty_acids={acid: _json_number(value) for acid, value in fatty_acids.items()},
+        source=source,
+        line=line,
+    )
+    return record, warnings
+
+def ingest(sources, report=None, dedupe=True):
+    """Yield an OilRecord for each valid row of each (label, rows) source, in order
+
+    Rows are validated as they are read, so memory holds one row plus the
+    ids seen so far. Rejected rows, warnings and id collisions go to
+    report; with dedupe the first row of each id wins, like the seed
+    migration's ON CONFLICT (id) DO NOTHING.
+    """
+    report = report if report is not None else IngestReport()
+    seen = {}
+    for label, rows in sources:
+        for line, fields in rows:
+            report.rows += 1
+            if isinstance(fields, Exception):
+                report.add(label, line, 'error', None, str(fields))
+                continue
+            try:
+                record, warnings = validate(fields, label, line)
+            except RowError as e:
+                report.add(label, line, 'error', name_to_id(str(fields.get('name') or '')) or None, str(e))
+                continue
+
+            first = seen.get(record.id)
+            if dedupe and first is not None:
+                report.duplicates += 1
+                report.add(label, line, 'warning', record.id,
+                           f"Duplicate id {record.id}: {record.name!r} skipped, keeping {first[0]!r} "
+                           f"from {first[1]} line {first[2]}")
+                continue
+            seen.setdefault(record.id, (record.name, label, line))
+
+            for warning in warnings:
+                report.add(label, line, 'warning', record.id, warning)
+            report.accepted += 1
+            yield record
+
+def as_row(record):
+    """A record in parse_oils()'s row shape, with numbers as SQL text"""
+    return {
+        'id': record.id,
+        'name': record.name,
+        'sap': number_text(record.sap),
+        'iodine': number_text(record.iodine),
+        'ins': number_text(record.ins),
+        'category': record.category,
+        'fatty_acids': json.dumps(record.fatty_acids),
+    }
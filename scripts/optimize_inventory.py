@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cheapest recipe from stock: every quality in range, no oil used beyond what is on hand
+Solves one linear program over the catalog for a production run of
+--run-weight total oils and writes the recipe, weights and cost as JSON
+
+Usage:
+    python optimize_inventory.py --prices prices.csv --stock stock.csv --run-weight 20000
+    python optimize_inventory.py --prices prices.json --stock stock.csv --run-weight 40 --unit lb --soap-type liquid
+    python optimize_inventory.py --prices prices.csv --stock stock.csv --run-weight 20000 --within ideal -o recipe.json
+"""
+
+import argparse
+import json
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import load_catalog
+from soapcalc.inventory import InventoryOptimizer, read_amounts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prices', required=True,
+                        help="JSON object or two-column CSV of oil id and price per unit weight")
+    parser.add_argument('--stock', required=True, help="JSON object or two-column CSV of oil id and amount on hand")
+    parser.add_argument('--run-weight', type=float, required=True,
+                        help="Total oil weight of the production run, in the stock's unit")
+    parser.add_argument('--unit', choices=('g', 'oz', 'lb'), default='g',
+                        help="Unit of stock, run weight and prices (default: g)")
+    parser.add_argument('--soap-type', choices=('hard', 'liquid'), default='hard')
+    parser.add_argument('--within', choices=('range', 'ideal'), default='range',
+                        help="Keep qualities inside their full or ideal ranges (default: range)")
+    parser.add_argument('--pool', help="File with one oil id per line to choose from (default: every oil)")
+    parser.add_argument('-o', '--output', default='-', help="JSON result file (default: stdout)")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    catalog = load_catalog()
+    startup.mark('catalog')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    try:
+        pool = None
+        if args.pool:
+            with open(args.pool, encoding='utf-8') as f:
+                pool = [line.strip() for line in f if line.strip()]
+        prices = read_amounts(args.prices, 'Price')
+        stock = read_amounts(args.stock, 'Stock')
+        if pool is not None:
+            prices = {oil_id: p for oil_id, p in prices.items() if oil_id in pool}
+            stock = {oil_id: s for oil_id, s in stock.items() if oil_id in pool}
+        result = InventoryOptimizer(catalog, prices, stock, args.run_weight, args.soap_type, args.within,
+                                    pool).solve()
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    text = json.dumps(dict(result._asdict(), unit=args.unit), indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    if not result.in_range:
+        print("⚠️  Rounding to 0.1% moved a quality out of range", file=sys.stderr)
+    print(f"✅ {len(result.percentages)} oils, cost {result.cost:.2f} for {args.run_weight:g} {args.unit}"
+          f" ({result.iterations} simplex pivots)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Pareto frontier of recipes over a pool of oils
+Writes one JSONL line per non-dominated recipe: percentages, qualities and
+cost, closest to the ideal ranges first
+
+Usage:
+    python pareto_recipes.py --pool stocked_oils.txt --max-oils 4 --step 5
+    python pareto_recipes.py --pool stocked_oils.txt --prices prices.csv --sort-by cost --limit 20
+    python pareto_recipes.py --pool stocked_oils.txt --cache-dir ~/.cache/soapcalc/frontiers -o frontier.jsonl
+"""
+
+import argparse
+import json
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import QUALITIES, load_catalog
+from soapcalc.inventory import read_amounts
+from soapcalc.pareto import FrontierCache
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool', help="File with one oil id per line to choose from (default: every oil)")
+    parser.add_argument('--max-oils', type=int, default=3, help="Most oils per recipe (default: 3)")
+    parser.add_argument('--step', type=float, default=5, help="Percentage step (default: 5)")
+    parser.add_argument('--soap-type', choices=('hard', 'liquid'), default='hard')
+    parser.add_argument('--prices', help="JSON object or two-column CSV of oil id and price per unit weight; adds cost")
+    parser.add_argument('--within', choices=('range', 'ideal', 'all'), default='range',
+                        help="Only consider recipes with every quality inside these ranges (default: range)")
+    parser.add_argument('--sort-by', choices=QUALITIES + ('cost',), help="Sort the frontier by this column")
+    parser.add_argument('--descending', action='store_true', help="Sort highest first")
+    parser.add_argument('--limit', type=int, help="Recipes written (default: all)")
+    parser.add_argument('--cache-dir', help="Save frontiers here and reuse them on later runs")
+    parser.add_argument('-o', '--output', default='-', help="JSONL results file (default: stdout)")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    catalog = load_catalog()
+    startup.mark('catalog')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    pool = catalog.ids
+    if args.pool:
+        with open(args.pool, encoding='utf-8') as f:
+            pool = [line.strip() for line in f if line.strip()]
+    unknown = [oil_id for oil_id in pool if oil_id not in catalog]
+    if unknown:
+        print(f"❌ Unknown oil id: {unknown[0]}", file=sys.stderr)
+        return 1
+
+    try:
+        prices = read_amounts(args.prices, 'Price') if args.prices else None
+        frontier = FrontierCache(catalog, directory=args.cache_dir).get(
+            pool, args.soap_type, args.max_oils, args.step, prices, None if args.within == 'all' else args.within)
+        positions = frontier.select(sort_by=args.sort_by, descending=args.descending, limit=args.limit)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for recipe in frontier.records(positions):
+            target.write(json.dumps(recipe) + '\n')
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+    print(f"✅ {len(frontier)} recipes on the frontier, wrote {len(positions)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
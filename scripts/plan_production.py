@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Plan a production schedule: scale recipes to batch weights and total the ingredients
+Reads a schedule (CSV or JSONL of recipe, batch_weight, unit, lye_type,
+batches) and the recipes it names, then writes the oil, lye and water
+demand of the whole schedule as JSON
+
+Usage:
+    python plan_production.py schedule.csv --recipes recipes.jsonl
+    python plan_production.py schedule.csv --recipes recipes.jsonl --unit lb -o totals.json
+    python plan_production.py schedule.jsonl --recipes recipes.jsonl --lines batches.jsonl --derived-sap
+"""
+
+import argparse
+import json
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import load_catalog
+from soapcalc.batch import read_recipes
+from soapcalc.planner import UNITS, plan_production, read_schedule
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('schedule', nargs='?', default='-', help="Schedule CSV or JSONL file (default: stdin)")
+    parser.add_argument('--recipes', required=True, help="JSONL recipes, matched to the schedule by id")
+    parser.add_argument('--unit', choices=UNITS, default='g', help="Unit for the totals (default: g)")
+    parser.add_argument('--derived-sap', action='store_true',
+                        help="Convert SAP values between NaOH and KOH by molar mass instead of using "
+                             "the catalog value for both")
+    parser.add_argument('-o', '--output', default='-', help="Totals JSON file (default: stdout)")
+    parser.add_argument('--lines', help="Also write each schedule line's weights to this JSONL file")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    return parser.parse_args(argv)
+
+
+def read_recipe_file(path):
+    """{recipe id: recipe} from a JSONL file"""
+    recipes = {}
+    with open(path, encoding='utf-8') as f:
+        for line_number, recipe in read_recipes(f):
+            if isinstance(recipe, str):
+                raise ValueError(f"{path} line {line_number}: {recipe}")
+            if recipe.get('id') is None:
+                raise ValueError(f"{path} line {line_number}: recipe has no id")
+            recipes[str(recipe['id'])] = recipe
+    return recipes
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    catalog = load_catalog()
+    startup.mark('catalog')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    try:
+        recipes = read_recipe_file(args.recipes)
+        if args.schedule == '-':
+            schedule = read_schedule(sys.stdin)
+        else:
+            with open(args.schedule, encoding='utf-8') as f:
+                schedule = read_schedule(f)
+        plan = plan_production(catalog, recipes, schedule, args.derived_sap)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    if args.lines:
+        with open(args.lines, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(line) + '\n' for line in plan.lines())
+        print(f"📁 Wrote {len(plan)} batch lines to {args.lines}", file=sys.stderr)
+
+    totals = plan.totals(args.unit)
+    text = json.dumps(totals, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    print(f"✅ Planned {len(plan)} schedule lines using {len(totals['oils'])} oils", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Exhaustive search for the best-fitting recipes of up to k oils
+Writes one JSONL line per recipe: percentages, qualities and range fit
+
+Usage:
+    python search_recipes.py --max-oils 3 --step 5 --top 10
+    python search_recipes.py --pool stocked_oils.txt --for-each --max-oils 4 --workers 0 -o starters.jsonl
+"""
+
+import argparse
+import json
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import load_catalog
+from soapcalc.exhaustive import search_recipes
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-oils', type=int, default=3, help="Most oils per recipe (default: 3)")
+    parser.add_argument('--step', type=float, default=5, help="Percentage step (default: 5)")
+    parser.add_argument('--soap-type', choices=('hard', 'liquid'), default='hard')
+    parser.add_argument('--top', type=int, default=10, help="Recipes kept per search (default: 10)")
+    parser.add_argument('--pool', help="File with one oil id per line to choose from (default: every oil)")
+    parser.add_argument('--include', action='append', default=[], help="Oil id every recipe must use (repeatable)")
+    parser.add_argument('--for-each', action='store_true',
+                        help="Run one search per pool oil, each recipe including that oil")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes sharing the oil catalog; 0 uses every core (default: 1)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL results file (default: stdout)")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    catalog = load_catalog()
+    startup.mark('catalog')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    pool = None
+    if args.pool:
+        with open(args.pool, encoding='utf-8') as f:
+            pool = [line.strip() for line in f if line.strip()]
+    unknown = [oil_id for oil_id in (pool or []) + args.include if oil_id not in catalog]
+    if unknown:
+        print(f"❌ Unknown oil id: {unknown[0]}", file=sys.stderr)
+        return 1
+
+    searches = [(oil_id, [oil_id] + args.include) for oil_id in (pool or catalog.ids)] if args.for_each else [(None, args.include)]
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for oil_id, include in searches:
+            recipes = search_recipes(catalog, args.max_oils, args.step, args.soap_type, args.top,
+                                     oil_ids=pool, include=include, workers=args.workers)
+            for rank, recipe in enumerate(recipes, 1):
+                line = {'oil': oil_id, 'rank': rank} if args.for_each else {'rank': rank}
+                line.update(recipe._asdict())
+                target.write(json.dumps(line) + '\n')
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+    print(f"✅ Ran {len(searches)} search{'es' if len(searches) != 1 else ''}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
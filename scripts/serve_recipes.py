@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Serve the soapcalc engine over HTTP
+Concurrent requests arriving within --window-ms are evaluated as one batch
+
+Usage:
+    python serve_recipes.py --port 8400
+    python serve_recipes.py --window-ms 5 --max-batch 512 --similarity-index
+
+    curl -s localhost:8400/calculate -d '{"oils": {"olive-oil": 70, "coconut": 30}, "superfat": 5}'
+    curl -s localhost:8400/recommendations -d '{"oils": {"olive-oil": 70}, "soapType": "hard"}'
+"""
+
+import argparse
+import asyncio
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc import load_catalog
+from soapcalc.service import DEFAULT_HOST, DEFAULT_MAX_BATCH, DEFAULT_PORT, DEFAULT_WINDOW, serve
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW * 1000,
+                        help=f"Batching window in milliseconds; 0 disables batching (default: {DEFAULT_WINDOW * 1000:g})")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help=f"Requests per batch before it runs early (default: {DEFAULT_MAX_BATCH})")
+    parser.add_argument('--similarity-index', action='store_true',
+                        help="Use the precomputed similarity index from build_similarity_index.py")
+    parser.add_argument('--replica', help="Read the oil catalog from this SQLite replica (see sync_catalog.py)")
+    parser.add_argument('--timing', action='store_true', help="Report import and catalog load times on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    if args.replica:
+        from soapcalc.replica import load_replica_catalog
+        try:
+            catalog = load_replica_catalog(args.replica)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+    else:
+        catalog = load_catalog()
+    startup.mark('catalog')
+    index = None
+    if args.similarity_index:
+        from soapcalc.similarity import load_similarity_index
+        index = load_similarity_index(catalog)
+        startup.mark('similarity index')
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+
+    def ready(server):
+        print(f"✅ Serving {len(catalog)} oils on http://{args.host}:{args.port}", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(catalog, args.host, args.port, args.window_ms / 1000, args.max_batch, index, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Vectorized soap calculation engine
+Loads the seed oil catalog into a float32 matrix and evaluates whole
+batches of recipes with matrix math instead of per-oil loops
+
+Names below are imported on first use, so importing the package (or a
+light submodule such as profiling) does not load NumPy or the catalog.
+"""
+
+from importlib import import_module
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'FATTY_ACIDS': 'catalog',
+    'PROPERTIES': 'catalog',
+    'OilCatalog': 'catalog',
+    'load_catalog': 'catalog',
+    'HARD_SOAP_QUALITY_RANGES': 'engine',
+    'LIQUID_SOAP_QUALITY_RANGES': 'engine',
+    'QUALITIES': 'engine',
+    'WATER_METHODS': 'engine',
+    'BatchResults': 'engine',
+    'evaluate': 'engine',
+    'fatty_acid_profiles': 'engine',
+    'get_quality_ranges': 'engine',
+    'lye_weights': 'engine',
+    'oil_weights': 'engine',
+    'quality_values': 'engine',
+    'soap_qualities': 'engine',
+    'water_weights': 'engine',
+    'weighted_properties': 'engine',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
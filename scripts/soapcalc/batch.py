@@ -0,0 +1,199 @@
+"""
+Streaming JSONL recipe evaluation
+Reads recipes line by line, evaluates them in fixed-size chunks and yields
+one result per recipe, so memory stays flat however large the input is
+"""
+
+from itertools import islice
+import json
+import math
+
+import numpy as np
+
+from .catalog import FATTY_ACIDS
+from .engine import QUALITIES, WATER_METHODS, evaluate
+
+# Same defaults as the calculator's initial inputs in CalculatorContext.tsx
+DEFAULT_INPUTS = {
+    'total_oil_weight': 500.0,
+    'lye_type': 'NaOH',
+    'superfat': 5.0,
+    'water_method': 'water_as_percent_of_oils',
+    'water_value': 38.0,
+    'fragrance_weight': 0.0,
+}
+
+# RecipeInputs (camelCase, as stored in saved recipes) -> batch input names
+SAVED_RECIPE_INPUTS = {
+    'totalOilWeight': 'total_oil_weight',
+    'lyeType': 'lye_type',
+    'superfatPercentage': 'superfat',
+    'waterMethod': 'water_method',
+    'waterValue': 'water_value',
+    'fragranceWeight': 'fragrance_weight',
+}
+
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def parse_recipe(recipe):
+    """Normalize one recipe record to ({oil_id: percentage}, inputs)
+
+    Accepts the flat form
+        {"id": ..., "oils": {"olive-oil": 60, ...}, "superfat": 5, ...}
+    or a saved recipe
+        {"id": ..., "inputs": {RecipeInputs}, "selectedOils": [{"id": ..., "percentage": ...}]}
+    Numbers must be finite and not negative, and water_value positive for
+    the lye_concentration and water_to_lye_ratio methods. Raises KeyError,
+    TypeError or ValueError for malformed records.
+    """
+    inputs = dict(DEFAULT_INPUTS)
+
+    if 'inputs' in recipe:
+        for key, name in SAVED_RECIPE_INPUTS.items():
+            if key in recipe['inputs']:
+                inputs[name] = recipe['inputs'][key]
+        oils = recipe.get('selectedOils', [])
+        fields = {name: key for key, name in SAVED_RECIPE_INPUTS.items()}
+    else:
+        for name in DEFAULT_INPUTS:
+            if name in recipe:
+                inputs[name] = recipe[name]
+        oils = recipe.get('oils', {})
+        fields = {name: name for name in DEFAULT_INPUTS}
+
+    for name in ('total_oil_weight', 'superfat', 'water_value', 'fragrance_weight'):
+        inputs[name] = _number(inputs[name], fields[name])
+    if inputs['lye_type'] not in ('NaOH', 'KOH'):
+        raise ValueError(f"Unknown lye type: {inputs['lye_type']}")
+    if inputs['water_method'] not in WATER_METHODS:
+        raise ValueError(f"Unknown water method: {inputs['water_method']}")
+    if inputs['water_method'] != 'water_as_percent_of_oils' and inputs['water_value'] <= 0:
+        raise ValueError(f"{fields['water_value']} must be positive for {inputs['water_method']}")
+
+    if isinstance(oils, dict):
+        percentages = {oil_id: _number(p, f"Percentage of {oil_id}") for oil_id, p in oils.items()}
+    else:
+        percentages = {}
+        for position, oil in enumerate(oils, 1):
+            for field in ('id', 'percentage'):
+                if field not in oil:
+                    raise ValueError(f"selectedOils entry {position} has no {field}")
+            percentage = _number(oil['percentage'], f"Percentage of {oil['id']}")
+            percentages[oil['id']] = percentages.get(oil['id'], 0.0) + percentage
+
+    return percentages, inputs
+
+
+def _number(value, field):
+    """value as a float, or ValueError naming field if it is not finite and non-negative"""
+    number = float(value)
+    if not (math.isfinite(number) and number >= 0):
+        raise ValueError(f"{field} must be a finite, non-negative number, got {value!r}")
+    return number
+
+
+def read_recipes(lines, start=1):
+    """Yield (line_number, recipe dict or error message) for each non-blank line"""
+    for line_number, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            recipe = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(recipe, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, recipe
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_chunk(catalog, chunk):
+    """Evaluate a list of (line_number, recipe) pairs, returning result dicts in order
+
+    Recipes that cannot be evaluated get an error record instead of stopping
+    the whole batch.
+    """
+    results = [None] * len(chunk)
+    rows, parsed = [], []
+
+    for position, (line_number, recipe) in enumerate(chunk):
+        if isinstance(recipe, str):
+            results[position] = {'line': line_number, 'error': recipe}
+            continue
+        try:
+            percentages, inputs = parse_recipe(recipe)
+            unknown = [oil_id for oil_id in percentages if oil_id not in catalog]
+            if unknown:
+                raise KeyError(f"Unknown oil id: {unknown[0]}")
+        except (KeyError, TypeError, ValueError) as e:
+            results[position] = {'id': recipe.get('id'), 'line': line_number,
+                                 'error': e.args[0] if e.args else str(e)}
+            continue
+        rows.append(position)
+        parsed.append((recipe.get('id'), percentages, inputs))
+
+    if not parsed:
+        return results
+
+    matrix = catalog.percentage_matrix([percentages for _, percentages, _ in parsed])
+    inputs = {name: np.array([i[name] for _, _, i in parsed]) for name in DEFAULT_INPUTS}
+    batch = evaluate(
+        catalog,
+        matrix,
+        total_oil_weight=inputs['total_oil_weight'],
+        superfat=inputs['superfat'],
+        water_method=inputs['water_method'],
+        water_value=inputs['water_value'],
+        lye_type=inputs['lye_type'],
+        fragrance_weight=inputs['fragrance_weight'],
+    )
+
+    for i, position in enumerate(rows):
+        results[position] = {
+            'id': parsed[i][0],
+            'lye_weight': float(batch.lye_weight[i]),
+            'water_weight': float(batch.water_weight[i]),
+            'total_batch_weight': float(batch.total_batch_weight[i]),
+            'fatty_acids': dict(zip(FATTY_ACIDS, batch.fatty_acids[i].tolist())),
+            'qualities': dict(zip(QUALITIES, batch.qualities[i].tolist())),
+        }
+    return results
+
+
+def evaluate_stream(catalog, lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one result dict per recipe line, evaluating chunk_size recipes at a time"""
+    for chunk in chunked(read_recipes(lines), chunk_size):
+        yield from evaluate_chunk(catalog, chunk)
+
+
+def chunked_lines(lines, size):
+    """Split raw input lines into (first_line_number, lines) chunks"""
+    start = 1
+    for chunk in chunked(lines, size):
+        yield start, chunk
+        start += len(chunk)
+
+
+def evaluate_lines(catalog, start_and_lines):
+    """Evaluate one chunked_lines() chunk, returning (JSONL result lines, error count)
+
+    Parsing and serializing happen here too, so process pool workers do
+    all the per-recipe work and the parent only moves strings.
+    """
+    start, lines = start_and_lines
+    results = evaluate_chunk(catalog, list(read_recipes(lines, start)))
+    errors = sum('error' in result for result in results)
+    return [json.dumps(result) for result in results], errors
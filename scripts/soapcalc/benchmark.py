@@ -0,0 +1,216 @@
+"""
+Engine benchmarks
+Times the calculation and recommendation hot paths on synthetic recipes
+over catalogs grown from the seed oils, and compares runs against a
+stored baseline
+"""
+
+from collections import namedtuple
+import platform
+import sys
+import time
+
+import numpy as np
+
+from .catalog import FATTY_ACID_COLUMNS, IODINE, INS, SAP, OilCatalog
+from .engine import fatty_acid_profiles, lye_weights, oil_weights, soap_qualities, water_weights, weighted_properties
+from .recommend import Recommender
+
+DEFAULT_SIZES = (150, 1000, 10000, 100000)
+DEFAULT_SAMPLES = 200
+DEFAULT_SEED = 42
+MAX_RECIPE_OILS = 20
+
+# A run is a regression when its p50 is this much slower than the baseline's
+DEFAULT_TOLERANCE = 0.2
+
+# Calls made before timing starts, so first-call costs stay out of the percentiles
+WARMUP_CALLS = 3
+
+Recipe = namedtuple('Recipe', ['rows', 'percentages', 'soap_type'])
+
+
+def synthetic_catalog(seed_catalog, size, seed=DEFAULT_SEED):
+    """The seed oils followed by jittered copies of them, size oils in all
+
+    Copies perturb each fatty acid by up to +/-3 points (keeping the
+    profile at or under 100%) and SAP, iodine and INS by up to 5%, so
+    scoring and similarity see realistic but distinct oils.
+    """
+    n = len(seed_catalog)
+    if size <= n:
+        return OilCatalog(seed_catalog.ids[:size], seed_catalog.names[:size],
+                          seed_catalog.categories[:size], seed_catalog.matrix[:size])
+
+    rng = np.random.default_rng(seed)
+    extra = size - n
+    source = rng.integers(0, n, extra)
+    matrix = seed_catalog.matrix[source].astype(np.float64)
+
+    fatty_acids = np.clip(matrix[:, FATTY_ACID_COLUMNS] + rng.uniform(-3, 3, (extra, 8)), 0, None)
+    totals = fatty_acids.sum(axis=1, keepdims=True)
+    matrix[:, FATTY_ACID_COLUMNS] = np.round(fatty_acids * np.minimum(1, 100 / np.maximum(totals, 1)))
+    for column in (SAP, IODINE, INS):
+        matrix[:, column] *= rng.uniform(0.95, 1.05, extra)
+    matrix[:, SAP] = np.round(matrix[:, SAP], 4)
+    matrix[:, IODINE:INS + 1] = np.round(matrix[:, IODINE:INS + 1])
+
+    ids = [f"synthetic-{i}" for i in range(extra)]
+    return OilCatalog(
+        seed_catalog.ids + ids,
+        seed_catalog.names + [f"{seed_catalog.names[s]} (synthetic {i})" for i, s in enumerate(source)],
+        seed_catalog.categories + [seed_catalog.categories[s] for s in source],
+        np.concatenate([seed_catalog.matrix, matrix.astype(np.float32)]),
+    )
+
+
+def synthetic_recipes(seed_oils, count, seed=DEFAULT_SEED, max_oils=MAX_RECIPE_OILS):
+    """Recipes of 1 to max_oils distinct seed oils at 0.1% steps summing to 100, alternating soap type"""
+    rng = np.random.default_rng(seed)
+    recipes = []
+    for i in range(count):
+        k = int(rng.integers(1, max_oils + 1))
+        rows = np.sort(rng.choice(seed_oils, k, replace=False))
+        tenths = np.floor(rng.dirichlet(np.ones(k)) * 1000)
+        tenths[0] += 1000 - tenths.sum()
+        recipes.append(Recipe(rows, tenths / 10, 'hard' if i % 2 == 0 else 'liquid'))
+    return recipes
+
+
+def _dense(catalog, recipe):
+    percentages = np.zeros((1, len(catalog)))
+    percentages[0, recipe.rows] = recipe.percentages
+    return percentages
+
+
+def _profile(catalog, recommender, recipe, dense):
+    return lambda: fatty_acid_profiles(catalog, dense)
+
+
+def _qualities(catalog, recommender, recipe, dense):
+    return lambda: soap_qualities(weighted_properties(catalog, dense))
+
+
+def _lye_water(catalog, recommender, recipe, dense):
+    def run():
+        weights = oil_weights(dense, 1000)
+        lye = lye_weights(catalog, weights, 'KOH' if recipe.soap_type == 'liquid' else 'NaOH', 5)
+        return water_weights(1000, lye, 'water_as_percent_of_oils', 38)
+    return run
+
+
+def _current_oils(catalog, recipe):
+    return {catalog.ids[row]: p for row, p in zip(recipe.rows.tolist(), recipe.percentages.tolist())}
+
+
+def _recommend(catalog, recommender, recipe, dense):
+    current = _current_oils(catalog, recipe)
+    return lambda: recommender.recommend(current, recipe.soap_type)
+
+
+def _incompatible(catalog, recommender, recipe, dense):
+    current = _current_oils(catalog, recipe)
+
+    def run():
+        # getIncompatibleOils: score everything, keep unselected oils under the threshold
+        scores = recommender.score(recommender.context(current), recipe.soap_type)
+        return np.flatnonzero(scores.candidates & (scores.scores < 25))
+    return run
+
+
+# Operation name -> factory returning a zero-argument call for one recipe
+OPERATIONS = {
+    'fatty_acid_profile': _profile,
+    'qualities': _qualities,
+    'lye_water': _lye_water,
+    'recommend': _recommend,
+    'incompatible': _incompatible,
+}
+
+
+def percentiles(durations):
+    """p50/p95/p99 in microseconds and calls per second from durations in nanoseconds"""
+    durations = np.asarray(durations, dtype=np.float64) / 1000
+    p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+    return {
+        'p50_us': round(float(p50), 3),
+        'p95_us': round(float(p95), 3),
+        'p99_us': round(float(p99), 3),
+        'ops_per_sec': round(1e6 / float(durations.mean()), 1),
+    }
+
+
+def run_benchmarks(seed_catalog, sizes=DEFAULT_SIZES, samples=DEFAULT_SAMPLES, operations=None,
+                   seed=DEFAULT_SEED, progress=None):
+    """Benchmark every operation at every catalog size; returns the JSON-ready report
+
+    Each sample times one call on one synthetic recipe with
+    time.perf_counter_ns. Recipes only use seed oils, so every size
+    evaluates the same recipes.
+    """
+    operations = list(operations or OPERATIONS)
+    recipes = synthetic_recipes(np.arange(len(seed_catalog)), samples, seed)
+    results = []
+
+    for size in sizes:
+        catalog = synthetic_catalog(seed_catalog, size, seed)
+        start = time.perf_counter_ns()
+        recommender = Recommender(catalog)
+        setup_ns = time.perf_counter_ns() - start
+
+        for name in operations:
+            factory = OPERATIONS[name]
+            durations = []
+            for i, recipe in enumerate(recipes):
+                call = factory(catalog, recommender, recipe, _dense(catalog, recipe))
+                if i == 0:
+                    for _ in range(WARMUP_CALLS):
+                        call()
+                start = time.perf_counter_ns()
+                call()
+                durations.append(time.perf_counter_ns() - start)
+            result = {'operation': name, 'oils': len(catalog), 'samples': len(durations)}
+            result.update(percentiles(durations))
+            results.append(result)
+            if progress:
+                progress(result)
+
+        setup = {'operation': 'recommender_setup', 'oils': len(catalog), 'samples': 1}
+        setup.update(percentiles([setup_ns]))
+        results.append(setup)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': sys.platform,
+        },
+        'seed': seed,
+        'samples': samples,
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Results whose p50 is more than tolerance slower than the baseline's, by (operation, oils)
+
+    Single-sample timings such as recommender_setup are too noisy to flag
+    and are skipped.
+    """
+    previous = {(r['operation'], r['oils']): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        before = previous.get((result['operation'], result['oils']))
+        if before is None or before['p50_us'] <= 0 or result['samples'] < 2:
+            continue
+        ratio = result['p50_us'] / before['p50_us']
+        if ratio > 1 + tolerance:
+            regressions.append({
+                'operation': result['operation'],
+                'oils': result['oils'],
+                'baseline_p50_us': before['p50_us'],
+                'p50_us': result['p50_us'],
+                'ratio': round(ratio, 3),
+            })
+    return regressions
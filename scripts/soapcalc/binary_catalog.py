@@ -0,0 +1,227 @@
+"""
+Binary oil catalog
+A versioned fixed-layout file that is memory-mapped and indexed in place,
+so loading the catalog costs no parsing
+
+Layout (little-endian):
+    header       HEADER struct, see below
+    string index (3 * oils + 1) uint32 offsets into the string data;
+                 oil i has its id, name and category at entries 3i, 3i+1, 3i+2
+    string data  UTF-8 bytes
+    id order     oils uint32 rows, sorted by id bytes for binary search
+    properties   (PROPERTIES x oils) float32, column-major: each property
+                 is one contiguous run, aligned to ALIGNMENT bytes
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from . import startup
+from .catalog import PROPERTIES, OilCatalog
+
+# os.path rather than pathlib, whose import alone costs more than loading the catalog
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(SCRIPTS_DIR, 'data', 'oil_catalog.bin')
+
+# The seed catalog is parsed from these files; a binary catalog is only
+# used while its header digest matches theirs
+SOURCE_FILES = (os.path.join(SCRIPTS_DIR, 'generate_oils_sql.py'), os.path.join(SCRIPTS_DIR, 'oil_ingest.py'))
+
+# Catalogs parsed because DEFAULT_PATH was stale are cached here, keyed on the digest
+CACHE_ENV_VAR = 'SOAPCALC_CACHE_DIR'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'soapcalc')
+
+MAGIC = b'SOAPCAT\x00'
+VERSION = 1
+ALIGNMENT = 64
+
+# magic, version, reserved, oils, properties, reserved, source digest,
+# string index offset, string data offset, string data size, id order offset, properties offset
+HEADER = struct.Struct('<8sHHIII32sQQQQQ')
+
+
+def source_digest(paths=SOURCE_FILES):
+    """SHA-256 over the files a catalog was built from, stored in the header"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def cache_path(digest):
+    """Cache file for a catalog built from sources with this digest"""
+    directory = os.environ.get(CACHE_ENV_VAR) or DEFAULT_CACHE_DIR
+    return os.path.join(directory, f"oil_catalog-{digest.hex()[:16]}.bin")
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_binary_catalog(catalog, path=DEFAULT_PATH, digest=b''):
+    """Write catalog in the binary layout; digest identifies its source data"""
+    strings = [s.encode('utf-8') for i in range(len(catalog))
+               for s in (catalog.ids[i], catalog.names[i], catalog.categories[i])]
+    string_index = np.zeros(len(strings) + 1, dtype='<u4')
+    string_index[1:] = np.cumsum([len(s) for s in strings])
+    string_data = b''.join(strings)
+    id_order = np.array(sorted(range(len(catalog)), key=lambda i: strings[3 * i]), dtype='<u4')
+
+    index_offset = HEADER.size
+    data_offset = index_offset + string_index.nbytes
+    order_offset = data_offset + len(string_data)
+    properties_offset = _align(order_offset + id_order.nbytes)
+
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, len(catalog), len(PROPERTIES), 0, digest.ljust(32, b'\x00'),
+        index_offset, data_offset, len(string_data), order_offset, properties_offset,
+    )
+    properties = np.ascontiguousarray(catalog.matrix.T, dtype='<f4')
+
+    # Written beside the target and renamed, so readers never map a partial file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(partial, 'wb') as f:
+            f.write(header)
+            f.write(string_index.tobytes())
+            f.write(string_data)
+            f.write(id_order.tobytes())
+            f.write(b'\x00' * (properties_offset - order_offset - id_order.nbytes))
+            f.write(properties.tobytes())
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+class BinaryCatalog:
+    """Memory-mapped view of a binary catalog file
+
+    Oils are read straight out of the mapping: matrix is a zero-copy
+    (oils x PROPERTIES) view and strings are decoded only when asked for.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if len(self._map) < HEADER.size:
+                raise ValueError(f"Not a binary oil catalog: {path}")
+            (magic, version, _, oils, properties, _, digest,
+             index_offset, data_offset, data_size, order_offset, properties_offset) = HEADER.unpack_from(self._map)
+            if magic != MAGIC:
+                raise ValueError(f"Not a binary oil catalog: {path}")
+            if version != VERSION or properties != len(PROPERTIES):
+                raise ValueError(f"Unsupported binary catalog version {version} with {properties} properties")
+            sections = ((index_offset, 4 * (3 * oils + 1)), (data_offset, data_size), (order_offset, 4 * oils),
+                        (properties_offset, 4 * properties * oils))
+            if any(offset + size > len(self._map) for offset, size in sections):
+                raise ValueError(f"Truncated binary oil catalog: {path}")
+
+            self.digest = digest
+            self._oils = oils
+            self._string_index = np.frombuffer(self._map, dtype='<u4', count=3 * oils + 1, offset=index_offset)
+            self._data_offset = data_offset
+            self._id_order = np.frombuffer(self._map, dtype='<u4', count=oils, offset=order_offset)
+            self.matrix = np.frombuffer(
+                self._map, dtype='<f4', count=properties * oils, offset=properties_offset,
+            ).reshape(properties, oils).T
+        except ValueError:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self._oils
+
+    def close(self):
+        """Unmap the file; any arrays still viewing matrix keep it open until they are dropped"""
+        self.matrix = self._string_index = self._id_order = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def _string(self, k):
+        start = self._data_offset + int(self._string_index[k])
+        end = self._data_offset + int(self._string_index[k + 1])
+        return self._map[start:end]
+
+    def id(self, i):
+        return self._string(3 * i).decode('utf-8')
+
+    def name(self, i):
+        return self._string(3 * i + 1).decode('utf-8')
+
+    def category(self, i):
+        return self._string(3 * i + 2).decode('utf-8')
+
+    def find(self, oil_id):
+        """Row of oil_id by binary search over the id order, or -1"""
+        key = oil_id.encode('utf-8')
+        low, high = 0, self._oils
+        while low < high:
+            mid = (low + high) // 2
+            if self._string(3 * int(self._id_order[mid])) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._oils and self._string(3 * int(self._id_order[low])) == key:
+            return int(self._id_order[low])
+        return -1
+
+    def to_catalog(self):
+        """An OilCatalog over the mapped matrix; only the strings are decoded"""
+        n = self._oils
+        return OilCatalog(
+            [self.id(i) for i in range(n)],
+            [self.name(i) for i in range(n)],
+            [self.category(i) for i in range(n)],
+            self.matrix,
+        )
+
+
+def load_binary_catalog(path=DEFAULT_PATH):
+    """OilCatalog from a binary catalog file"""
+    return BinaryCatalog(path).to_catalog()
+
+
+def _current(path, digest):
+    try:
+        catalog = BinaryCatalog(path)
+    except (OSError, ValueError):
+        return None
+    if catalog.digest != digest:
+        catalog.close()
+        return None
+    return catalog
+
+
+def load_seed_catalog():
+    """The seed catalog, from the first binary catalog built from the current sources
+
+    Tries DEFAULT_PATH, then the cache directory. Failing both it parses
+    generate_oils_sql.py and caches the result; a read-only cache
+    directory only means the next process parses again.
+    """
+    digest = source_digest()
+    for path, origin in ((DEFAULT_PATH, 'binary catalog'), (cache_path(digest), 'cached catalog')):
+        mapped = _current(path, digest)
+        if mapped is not None:
+            startup.note('catalog', origin)
+            return mapped.to_catalog()
+
+    from generate_oils_sql import parse_oils
+    catalog = OilCatalog.from_oils(parse_oils())
+    try:
+        write_binary_catalog(catalog, cache_path(digest), digest)
+    except OSError:
+        pass
+    startup.note('catalog', 'parsed')
+    return catalog
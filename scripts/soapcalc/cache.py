@@ -0,0 +1,216 @@
+"""
+Memoized recipe evaluation
+Recipes are reduced to a canonical fingerprint (sorted oil ids, percentages
+at the app's 0.1% precision, soap type) and their results kept in an
+LRU + TTL cache that can drop just the entries touching an edited oil
+"""
+
+from collections import OrderedDict
+from copy import deepcopy
+import hashlib
+import time
+
+from .catalog import FATTY_ACIDS
+from .engine import QUALITIES, js_round
+from .recommend import Recommender
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL = 300.0
+
+# Dependency tag for results that read every oil in the catalog
+ALL_OILS = '*'
+
+_MISSING = object()
+
+
+def canonical_recipe(current_oils):
+    """Sorted (oil_id, tenths of a percent) pairs
+
+    Repeated ids are summed first; percentages round like weightToPercentage,
+    so a recipe toggled between weight and percentage input maps to the
+    same key.
+    """
+    totals = {}
+    items = current_oils.items() if isinstance(current_oils, dict) else current_oils
+    for oil_id, percentage in items:
+        totals[oil_id] = totals.get(oil_id, 0.0) + float(percentage)
+    return tuple(sorted((oil_id, int(js_round(p * 10))) for oil_id, p in totals.items()))
+
+
+def recipe_fingerprint(canonical, *extra):
+    """Hex digest identifying a canonical recipe plus extra parameters such as the soap type"""
+    parts = [str(value) for value in extra] + [f"{oil_id}={tenths}" for oil_id, tenths in canonical]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Least-recently-used cache with a per-entry time to live and oil dependencies
+
+    Each entry records the oil ids it was computed from (or ALL_OILS), so
+    invalidate_oil() only drops what an edit can change. Values are handed
+    out through copy (deep copies by default), so a caller editing a result
+    does not change what the next hit returns; pass copy=None for values
+    that are never modified. Not thread-safe.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, clock=time.monotonic, copy=deepcopy):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.copy = copy
+        self._entries = OrderedDict()  # key -> (value, expires_at, oil_ids)
+        self._by_oil = {}              # oil id -> keys depending on it
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return default
+        if entry[1] <= self.clock():
+            self._remove(key)
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return default
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return self.copy_of(entry[0])
+
+    def copy_of(self, value):
+        """value as get() hands it out"""
+        return value if self.copy is None else self.copy(value)
+
+    def put(self, key, value, oil_ids=(ALL_OILS,)):
+        if key in self._entries:
+            self._remove(key)
+        oil_ids = frozenset(oil_ids)
+        self._entries[key] = (value, self.clock() + self.ttl, oil_ids)
+        for oil_id in oil_ids:
+            self._by_oil.setdefault(oil_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    def get_or_compute(self, key, oil_ids, compute):
+        """Cached value for key, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value, oil_ids)
+            value = self.copy_of(value)
+        return value
+
+    def invalidate_oil(self, oil_id):
+        """Drop entries computed from oil_id or from the whole catalog; returns how many"""
+        keys = self._by_oil.get(oil_id, set()) | self._by_oil.get(ALL_OILS, set())
+        for key in list(keys):
+            self._remove(key)
+        self.stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_oil.clear()
+
+    def _remove(self, key):
+        _, _, oil_ids = self._entries.pop(key)
+        for oil_id in oil_ids:
+            keys = self._by_oil[oil_id]
+            keys.discard(key)
+            if not keys:
+                del self._by_oil[oil_id]
+
+
+class CachedEvaluator:
+    """Recipe qualities and recommendations behind an LRUCache
+
+    Qualities depend only on the recipe's own oils. Recommendations score
+    every catalog oil, so any catalog edit drops them. Results are computed
+    for the canonical recipe, oils in id order at 0.1% precision.
+    """
+
+    def __init__(self, catalog, cache=None, similarity_index=None):
+        self.cache = cache if cache is not None else LRUCache()
+        self.similarity_index = similarity_index
+        self.recommender = Recommender(catalog, similarity_index)
+
+    @property
+    def catalog(self):
+        return self.recommender.catalog
+
+    def qualities(self, current_oils):
+        """{'fattyAcids', 'qualities'} of a recipe, rounded like calculateRecipe"""
+        canonical = canonical_recipe(current_oils)
+        key = recipe_fingerprint(canonical, 'qualities')
+
+        def compute():
+            context = self.recommender.context(_percentages(canonical))
+            return {
+                'fattyAcids': dict(zip(FATTY_ACIDS, context.fatty_acids.tolist())),
+                'qualities': dict(zip(QUALITIES, context.qualities.tolist())),
+            }
+        return self.cache.get_or_compute(key, [oil_id for oil_id, _ in canonical], compute)
+
+    def evaluate(self, current_oils, soap_type='hard', max_recommendations=5, threshold=25):
+        """Recommender.evaluate for the canonical recipe"""
+        canonical = canonical_recipe(current_oils)
+        key = recipe_fingerprint(canonical, 'evaluate', soap_type, max_recommendations, threshold)
+        return self.cache.get_or_compute(
+            key, (ALL_OILS,),
+            lambda: self.recommender.evaluate(_percentages(canonical), soap_type, max_recommendations, threshold),
+        )
+
+    def evaluate_many(self, requests):
+        """evaluate() for many (current_oils, soap_type, max_recommendations, threshold) requests
+
+        Cache misses are scored together by Recommender.evaluate_many. A
+        request that fails gets its exception in place of a result.
+        """
+        results = [None] * len(requests)
+        misses = {}  # key -> (request for the canonical recipe, positions asking for it)
+        for i, (current_oils, soap_type, max_recommendations, threshold) in enumerate(requests):
+            try:
+                canonical = canonical_recipe(current_oils)
+            except (TypeError, ValueError) as e:
+                results[i] = e
+                continue
+            key = recipe_fingerprint(canonical, 'evaluate', soap_type, max_recommendations, threshold)
+            if key in misses:
+                misses[key][1].append(i)
+                continue
+            value = self.cache.get(key, _MISSING)
+            if value is _MISSING:
+                misses[key] = ((_percentages(canonical), soap_type, max_recommendations, threshold), [i])
+            else:
+                results[i] = value
+        computed = self.recommender.evaluate_many([request for request, _ in misses.values()])
+        for (key, (_, positions)), value in zip(misses.items(), computed):
+            failed = isinstance(value, Exception)
+            if not failed:
+                self.cache.put(key, value, (ALL_OILS,))
+            for i in positions:
+                results[i] = value if failed else self.cache.copy_of(value)
+        return results
+
+    def set_oil(self, oil):
+        """Add or replace an oil (OilData shape) and drop the cache entries it affects"""
+        catalog = self.catalog.with_oil(oil)
+        if self.similarity_index is not None:
+            self.similarity_index.set_oil(oil['id'], catalog.oil(oil['id'])['fatty_acids'])
+        self.recommender = Recommender(catalog, self.similarity_index)
+        return self.cache.invalidate_oil(oil['id'])
+
+    def remove_oil(self, oil_id):
+        """Remove an oil and drop the cache entries it affects"""
+        self.recommender = Recommender(self.catalog.without_oil(oil_id), self.similarity_index)
+        return self.cache.invalidate_oil(oil_id)
+
+
+def _percentages(canonical):
+    return {oil_id: tenths / 10 for oil_id, tenths in canonical}
@@ -0,0 +1,207 @@
+"""
+Oil catalog as a contiguous float32 property matrix
+One row per oil: SAP, iodine, INS and the eight fatty acids
+"""
+
+from functools import lru_cache
+import json
+
+import numpy as np
+
+FATTY_ACIDS = (
+    'lauric',
+    'myristic',
+    'palmitic',
+    'stearic',
+    'ricinoleic',
+    'oleic',
+    'linoleic',
+    'linolenic',
+)
+
+PROPERTIES = ('sap', 'iodine', 'ins') + FATTY_ACIDS
+
+# Column positions in OilCatalog.matrix
+SAP = 0
+IODINE = 1
+INS = 2
+FATTY_ACID_COLUMNS = slice(3, 3 + len(FATTY_ACIDS))
+
+# Molar masses (g/mol) for converting SAP values between lye types
+LYE_MOLAR_MASS = {'NaOH': 39.997, 'KOH': 56.106}
+
+# Lye type the seed SAP column is measured in. The generator writes one value
+# to both sap_naoh and sap_koh, but the values are KOH figures (olive 0.190,
+# coconut 0.257; their NaOH values are about 0.135 and 0.183)
+SAP_BASIS = 'KOH'
+
+
+class OilCatalog:
+    """Oil ids, names and categories alongside an (oils x PROPERTIES) float32 matrix
+
+    The matrix may be row- or column-major (a memory-mapped binary catalog
+    is column-major); anything else is copied into a contiguous array.
+    """
+
+    def __init__(self, ids, names, categories, matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if not (matrix.flags.c_contiguous or matrix.flags.f_contiguous):
+            matrix = np.ascontiguousarray(matrix)
+        if matrix.shape != (len(ids), len(PROPERTIES)):
+            raise ValueError(f"Expected a {len(ids)}x{len(PROPERTIES)} property matrix, got {matrix.shape}")
+
+        self.ids = list(ids)
+        self.names = list(names)
+        self.categories = list(categories)
+        self.matrix = matrix
+        self.index = {oil_id: i for i, oil_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, oil_id):
+        return oil_id in self.index
+
+    @classmethod
+    def from_oils(cls, oils):
+        """Build a catalog from parse_oils() rows or OilData-shaped dicts
+
+        Duplicate ids keep their first row, matching the seed migration's
+        ON CONFLICT (id) DO NOTHING.
+        """
+        ids, names, categories, rows = [], [], [], []
+        seen = set()
+
+        for oil in oils:
+            if oil['id'] in seen:
+                continue
+            seen.add(oil['id'])
+
+            fatty_acids = oil['fatty_acids']
+            if isinstance(fatty_acids, str):
+                fatty_acids = json.loads(fatty_acids)
+            sap = oil['sap'] if 'sap' in oil else oil['sap_naoh']
+
+            ids.append(oil['id'])
+            names.append(oil['name'])
+            categories.append(oil.get('category') or '')
+            rows.append([float(sap), float(oil['iodine']), float(oil['ins'])] +
+                        [float(fatty_acids.get(acid, 0)) for acid in FATTY_ACIDS])
+
+        matrix = np.array(rows, dtype=np.float32).reshape(len(rows), len(PROPERTIES))
+        return cls(ids, names, categories, matrix)
+
+    def extended(self, oils):
+        """A new catalog with custom oils appended after the existing rows"""
+        extra = OilCatalog.from_oils(oils)
+        duplicates = [oil_id for oil_id in extra.ids if oil_id in self.index]
+        if duplicates:
+            raise ValueError(f"Oil id already in catalog: {duplicates[0]}")
+        return OilCatalog(
+            self.ids + extra.ids,
+            self.names + extra.names,
+            self.categories + extra.categories,
+            np.concatenate([self.matrix, extra.matrix]),
+        )
+
+    def with_oil(self, oil):
+        """A new catalog with oil replacing the row of the same id, or appended if it is new"""
+        if oil['id'] not in self.index:
+            return self.extended([oil])
+        i = self.index[oil['id']]
+        row = OilCatalog.from_oils([oil])
+        matrix = self.matrix.copy()
+        matrix[i] = row.matrix[0]
+        return OilCatalog(
+            self.ids,
+            self.names[:i] + row.names + self.names[i + 1:],
+            self.categories[:i] + row.categories + self.categories[i + 1:],
+            matrix,
+        )
+
+    def without_oil(self, oil_id):
+        """A new catalog without oil_id"""
+        i = self.index[oil_id]
+        return OilCatalog(
+            self.ids[:i] + self.ids[i + 1:],
+            self.names[:i] + self.names[i + 1:],
+            self.categories[:i] + self.categories[i + 1:],
+            np.delete(self.matrix, i, axis=0),
+        )
+
+    @property
+    def sap(self):
+        return self.matrix[:, SAP]
+
+    @property
+    def iodine(self):
+        return self.matrix[:, IODINE]
+
+    @property
+    def ins(self):
+        return self.matrix[:, INS]
+
+    @property
+    def fatty_acids(self):
+        return self.matrix[:, FATTY_ACID_COLUMNS]
+
+    def sap_column(self, lye_type='NaOH', derived=False):
+        """Float64 SAP values for a lye type, at the NUMERIC(6,4) precision of the oils table
+
+        Lye weights are rounded to 0.01 g, so they are computed from these
+        rather than the float32 matrix column. The seed data stores one value
+        in both sap_naoh and sap_koh, so by default both lye types read the
+        same column, as the app does. derived=True instead converts the
+        SAP_BASIS value to lye_type by molar mass, rounded to 4 decimals like
+        a stored value.
+        """
+        if lye_type not in LYE_MOLAR_MASS:
+            raise ValueError(f"Unknown lye type: {lye_type}")
+        sap = np.round(self.sap.astype(np.float64), 4)
+        if derived and lye_type != SAP_BASIS:
+            sap = np.round(sap * LYE_MOLAR_MASS[lye_type] / LYE_MOLAR_MASS[SAP_BASIS], 4)
+        return sap
+
+    def indices(self, oil_ids):
+        """Row indices for a sequence of oil ids"""
+        try:
+            return np.array([self.index[oil_id] for oil_id in oil_ids], dtype=np.intp)
+        except KeyError as e:
+            raise KeyError(f"Unknown oil id: {e.args[0]}") from None
+
+    def oil(self, oil_id):
+        """A single oil in the app's OilData shape"""
+        i = self.index[oil_id]
+        row = self.matrix[i]
+        return {
+            'id': self.ids[i],
+            'name': self.names[i],
+            'sap_naoh': float(self.sap_column('NaOH')[i]),
+            'sap_koh': float(self.sap_column('KOH')[i]),
+            'fatty_acids': {acid: float(v) for acid, v in zip(FATTY_ACIDS, row[FATTY_ACID_COLUMNS])},
+            'iodine': float(row[IODINE]),
+            'ins': float(row[INS]),
+            'category': self.categories[i],
+        }
+
+    def percentage_matrix(self, recipes):
+        """Dense (recipes x oils) percentage matrix from {oil_id: percentage} mappings"""
+        percentages = np.zeros((len(recipes), len(self)))
+        for row, recipe in enumerate(recipes):
+            for oil_id, percentage in recipe.items():
+                try:
+                    percentages[row, self.index[oil_id]] += percentage
+                except KeyError:
+                    raise KeyError(f"Unknown oil id: {oil_id}") from None
+        return percentages
+
+
+@lru_cache(maxsize=None)
+def load_catalog():
+    """The seed catalog, loaded once per process
+
+    Memory-maps a binary catalog built from the current seed sources, so
+    the table in generate_oils_sql.py is only parsed when those change.
+    """
+    from .binary_catalog import load_seed_catalog
+    return load_seed_catalog()
@@ -0,0 +1,211 @@
+"""
+Batch recipe math over a recipes x oils percentage matrix
+Mirrors the formulas in lib/calculations.ts, one row per recipe
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .catalog import FATTY_ACID_COLUMNS, PROPERTIES
+from .profiling import timed
+
+QUALITIES = ('hardness', 'cleansing', 'conditioning', 'bubbly', 'creamy', 'iodine', 'ins')
+
+# Quality ranges for HARD (BAR) SOAP based on SoapCalc standards
+HARD_SOAP_QUALITY_RANGES = {
+    'hardness': {'min': 29, 'max': 54, 'ideal': {'min': 29, 'max': 54}},
+    'cleansing': {'min': 12, 'max': 22, 'ideal': {'min': 12, 'max': 22}},
+    'conditioning': {'min': 44, 'max': 69, 'ideal': {'min': 44, 'max': 69}},
+    'bubbly': {'min': 14, 'max': 46, 'ideal': {'min': 14, 'max': 46}},
+    'creamy': {'min': 16, 'max': 48, 'ideal': {'min': 16, 'max': 48}},
+    'iodine': {'min': 41, 'max': 70, 'ideal': {'min': 41, 'max': 70}},
+    'ins': {'min': 136, 'max': 165, 'ideal': {'min': 136, 'max': 165}},
+}
+
+# Quality ranges for LIQUID SOAP based on specialized formulation requirements
+LIQUID_SOAP_QUALITY_RANGES = {
+    'hardness': {'min': 10, 'max': 25, 'ideal': {'min': 15, 'max': 20}},
+    'cleansing': {'min': 5, 'max': 15, 'ideal': {'min': 8, 'max': 12}},
+    'conditioning': {'min': 60, 'max': 85, 'ideal': {'min': 65, 'max': 75}},
+    'bubbly': {'min': 15, 'max': 30, 'ideal': {'min': 18, 'max': 25}},
+    'creamy': {'min': 20, 'max': 40, 'ideal': {'min': 25, 'max': 35}},
+    'iodine': {'min': 50, 'max': 85, 'ideal': {'min': 55, 'max': 75}},
+    'ins': {'min': 90, 'max': 130, 'ideal': {'min': 100, 'max': 120}},
+}
+
+WATER_METHODS = ('water_as_percent_of_oils', 'lye_concentration', 'water_to_lye_ratio')
+
+
+# Weighted properties each quality adds up, in calculateSoapQualities order
+QUALITY_TERMS = {
+    'hardness': ('lauric', 'myristic', 'palmitic', 'stearic'),
+    'cleansing': ('lauric', 'myristic'),
+    'conditioning': ('oleic', 'linoleic', 'linolenic', 'ricinoleic'),
+    'bubbly': ('lauric', 'myristic', 'ricinoleic'),
+    'creamy': ('palmitic', 'stearic', 'ricinoleic'),
+    'iodine': ('iodine',),
+    'ins': ('ins',),
+}
+
+_QUALITY_COLUMNS = [[PROPERTIES.index(prop) for prop in QUALITY_TERMS[quality]] for quality in QUALITIES]
+
+
+def _quality_matrix():
+    """(PROPERTIES x QUALITIES) map from weighted properties to soap qualities"""
+    matrix = np.zeros((len(PROPERTIES), len(QUALITIES)), dtype=np.float32)
+    for col, columns in enumerate(_QUALITY_COLUMNS):
+        matrix[columns, col] = 1
+    return matrix
+
+
+QUALITY_MATRIX = _quality_matrix()
+
+BatchResults = namedtuple('BatchResults', [
+    'fatty_acids',
+    'qualities',
+    'oil_weights',
+    'lye_weight',
+    'water_weight',
+    'total_batch_weight',
+])
+
+
+def get_quality_ranges(soap_type='hard'):
+    """Get quality ranges based on soap type"""
+    return LIQUID_SOAP_QUALITY_RANGES if soap_type == 'liquid' else HARD_SOAP_QUALITY_RANGES
+
+
+def js_round(values, decimals=0):
+    """Math.round semantics (half rounds up) rather than NumPy's half-to-even
+
+    Compares the fraction against 0.5 instead of computing floor(x + 0.5),
+    which rounds 0.49999999999999994 up where Math.round does not.
+    """
+    scaled = np.asarray(values, dtype=np.float64) * 10 ** decimals
+    whole = np.floor(scaled)
+    return (whole + (scaled - whole >= 0.5)) / 10 ** decimals
+
+
+def _as_float(percentages):
+    percentages = np.asarray(percentages)
+    if percentages.dtype not in (np.float32, np.float64):
+        percentages = percentages.astype(np.float64)
+    return percentages
+
+
+def weighted_properties(catalog, percentages):
+    """Percentage-weighted SAP, iodine, INS and fatty acids for every recipe row
+
+    Rows with no oils come back as zeros, like calculateFattyAcidProfile.
+    The math runs in the dtype of percentages: float64 (the default) rounds
+    exactly like the app, float32 halves memory traffic for large sweeps.
+    """
+    percentages = _as_float(percentages)
+    totals = percentages.sum(axis=1, keepdims=True)
+    sums = percentages @ catalog.matrix.astype(percentages.dtype, copy=False)
+    return np.divide(sums, totals, out=np.zeros_like(sums), where=totals > 0)
+
+
+def fatty_acid_profiles(catalog, percentages):
+    """(recipes x FATTY_ACIDS) weighted fatty acid profiles"""
+    return weighted_properties(catalog, percentages)[:, FATTY_ACID_COLUMNS]
+
+
+def quality_values(properties):
+    """Unrounded qualities from weighted properties, (... x PROPERTIES) to (... x QUALITIES)
+
+    Each quality adds its terms left to right as calculateSoapQualities
+    does. A product with QUALITY_MATRIX sums them in whatever order BLAS
+    picks, which differs between one row and many and can round 79.5 and
+    79.49999 apart.
+    """
+    properties = np.asarray(properties)
+    values = np.empty(properties.shape[:-1] + (len(QUALITIES),), dtype=properties.dtype)
+    for col, columns in enumerate(_QUALITY_COLUMNS):
+        total = properties[..., columns[0]].copy()
+        for column in columns[1:]:
+            total += properties[..., column]
+        values[..., col] = total
+    return values
+
+
+def soap_qualities(properties):
+    """(recipes x QUALITIES) rounded qualities from weighted_properties() rows"""
+    return js_round(quality_values(properties)).astype(np.int32)
+
+
+def oil_weights(percentages, total_oil_weight):
+    """Per-oil weights rounded to 2 decimals, as calculateOilWeights"""
+    total = np.asarray(total_oil_weight, dtype=np.float64).reshape(-1, 1)
+    return js_round(total * np.asarray(percentages, dtype=np.float64) / 100, 2)
+
+
+def lye_weights(catalog, weights, lye_type='NaOH', superfat=0.0, derived_sap=False):
+    """Lye needed per recipe from an oil weight matrix, rounded to 2 decimals
+
+    lye_type may be a single value or one per recipe. derived_sap converts
+    SAP values by molar mass (see OilCatalog.sap_column).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    lye_type = np.asarray(lye_type)
+    naoh = weights @ catalog.sap_column('NaOH', derived_sap)
+    koh = weights @ catalog.sap_column('KOH', derived_sap)
+    before_superfat = np.where(lye_type == 'KOH', koh, naoh)
+    return js_round(before_superfat * (1 - np.asarray(superfat, dtype=np.float64) / 100), 2)
+
+
+def water_weights(total_oil_weight, lye_weight, method, value):
+    """Water weight per recipe for any mix of WATER_METHODS, rounded to 2 decimals
+
+    Unknown methods give 0, like the switch in calculateWaterWeight.
+    """
+    total = np.asarray(total_oil_weight, dtype=np.float64)
+    lye = np.asarray(lye_weight, dtype=np.float64)
+    value = np.asarray(value, dtype=np.float64)
+    method = np.asarray(method)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        water = np.select(
+            [
+                method == 'water_as_percent_of_oils',
+                method == 'lye_concentration',
+                method == 'water_to_lye_ratio',
+            ],
+            [
+                total * value / 100,
+                lye * (100 / value - 1),
+                lye * value,
+            ],
+            0.0,
+        )
+    return js_round(water, 2)
+
+
+@timed('engine.evaluate')
+def evaluate(catalog, percentages, total_oil_weight, superfat=0.0,
+             water_method='water_as_percent_of_oils', water_value=38.0,
+             lye_type='NaOH', fragrance_weight=0.0):
+    """Full calculateRecipe for a batch of recipes
+
+    Every argument after percentages may be a scalar or one value per recipe.
+    """
+    percentages = _as_float(percentages)
+    n = len(percentages)
+    total_oil_weight = np.broadcast_to(np.asarray(total_oil_weight, dtype=np.float64), (n,))
+
+    properties = weighted_properties(catalog, percentages)
+    weights = oil_weights(percentages, total_oil_weight)
+    lye = lye_weights(catalog, weights, lye_type, superfat)
+    water = water_weights(total_oil_weight, lye, water_method, water_value)
+    total_batch = js_round(total_oil_weight + lye + water + np.asarray(fragrance_weight, dtype=np.float64), 2)
+
+    return BatchResults(
+        fatty_acids=properties[:, FATTY_ACID_COLUMNS],
+        qualities=soap_qualities(properties),
+        oil_weights=weights,
+        lye_weight=lye,
+        water_weight=water,
+        total_batch_weight=np.broadcast_to(total_batch, (n,)),
+    )
+
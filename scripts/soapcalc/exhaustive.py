@@ -0,0 +1,219 @@
+"""
+Exhaustive k-oil recipe search
+Enumerates every mix of up to k oils at a fixed percentage step and keeps
+the best N by the optimizer's fit penalty, pruning branches whose quality
+bounds cannot beat the current Nth best
+"""
+
+from collections import namedtuple
+import heapq
+import os
+
+import numpy as np
+
+from .engine import get_quality_ranges
+from .optimizer import center_penalty, ideal_targets, quality_contributions, recipe_result
+
+SearchSpec = namedtuple('SearchSpec', [
+    'pool',       # catalog rows to choose from, required oils first
+    'required',   # how many leading pool oils every recipe must use
+    'max_oils',
+    'units',      # 100 / step
+    'soap_type',
+    'top',
+])
+
+# Candidate recipes as (penalty, pool positions, percentage units)
+Candidate = namedtuple('Candidate', ['penalty', 'positions', 'units'])
+
+
+class _Search:
+    """Depth-first branch and bound over one SearchSpec
+
+    Quality contributions are linear, so each node carries the running
+    (QUALITIES,) sums of the oils chosen so far and a child only adds its
+    own oil's share; nothing is recomputed from the fatty acid profiles.
+    Sums start at minus the middle of each ideal range, so a finished
+    recipe's sums are already the offsets center_penalty() takes.
+    """
+
+    def __init__(self, catalog, spec):
+        self.spec = spec
+        self.step = 100 / spec.units
+        self.contributions = quality_contributions(catalog, spec.pool)
+        ideal_min, ideal_max, self.scale = ideal_targets(get_quality_ranges(spec.soap_type))
+        self.center = (ideal_min + ideal_max) / 2
+        self.half_widths = (ideal_max - ideal_min) / 2
+
+        # Range of every quality over the oils after each pool position
+        n, q = self.contributions.shape
+        self.suffix_min = np.full((n + 1, q), np.inf)
+        self.suffix_max = np.full((n + 1, q), -np.inf)
+        for i in range(n - 1, -1, -1):
+            self.suffix_min[i] = np.minimum(self.suffix_min[i + 1], self.contributions[i])
+            self.suffix_max[i] = np.maximum(self.suffix_max[i + 1], self.contributions[i])
+
+        self.heap = []  # max-heap of the best spec.top, as (-penalty, positions, units)
+
+    @property
+    def threshold(self):
+        """Penalty a recipe has to beat to enter the top N"""
+        return -self.heap[0][0] if len(self.heap) >= self.spec.top else np.inf
+
+    def _offer(self, penalties, positions, units):
+        for penalty, pos, unit in zip(penalties.tolist(), positions, units):
+            entry = (-penalty, tuple(pos), tuple(unit))
+            if len(self.heap) < self.spec.top:
+                heapq.heappush(self.heap, entry)
+            elif entry > self.heap[0]:
+                heapq.heapreplace(self.heap, entry)
+
+    def penalty(self, offsets):
+        return center_penalty(offsets, self.half_widths, self.scale)
+
+    def lower_bound(self, low, high):
+        """Smallest fit penalty any offsets within [low, high] can reach"""
+        return self.penalty(np.maximum(np.maximum(low, -high), 0))
+
+    def _choices(self, depth, last):
+        """Pool positions the oil at this depth may take"""
+        if depth < self.spec.required:
+            return np.array([depth]) if depth > last else np.empty(0, dtype=np.intp)
+        return np.arange(max(last + 1, self.spec.required), len(self.spec.pool))
+
+    def _finish(self, sums, remaining, lasts, depth, positions, units):
+        """Complete each node with one more oil taking all of its remaining units
+
+        sums, remaining and lasts are arrays over nodes at the same depth
+        (depth + 1 oils chosen), all finished in one vectorized pass.
+        """
+        if not len(sums) or depth + 2 < self.spec.required or depth + 2 > self.spec.max_oils:
+            return
+        choices = self._choices(depth + 1, -1)
+        valid = choices[None, :] > lasts[:, None]
+        final = sums[:, None, :] + (remaining * self.step)[:, None, None] * self.contributions[choices] / 100
+        penalties = np.where(valid, self.penalty(final), np.inf)
+
+        keep = np.flatnonzero(penalties.ravel() < self.threshold)
+        if len(keep) > self.spec.top:
+            keep = keep[np.argpartition(penalties.ravel()[keep], self.spec.top - 1)[:self.spec.top]]
+        node, choice = np.unravel_index(keep, penalties.shape)
+        self._offer(
+            penalties[node, choice],
+            [positions[i] + (int(choices[j]),) for i, j in zip(node, choice)],
+            [units[i] + (int(remaining[i]),) for i in node],
+        )
+
+    def expand(self, sums, remaining, last, depth, positions, units):
+        """Search every recipe extending one node: the oils at positions with units so far"""
+        spec = self.spec
+        if remaining == 0:
+            if depth + 1 >= spec.required:
+                self._offer(self.penalty(sums)[None], [positions], [units])
+            return
+
+        self._finish(sums[None], np.array([remaining]), np.array([last]), depth, [positions], [units])
+        if depth + 3 > spec.max_oils or remaining < 2:
+            return
+
+        # Children keep at least one unit back for a later oil
+        choices = self._choices(depth + 1, last)
+        choices = choices[choices < len(spec.pool) - 1]
+        if not len(choices):
+            return
+        shares = np.arange(1, remaining)
+        child_sums = sums + shares[:, None, None] * self.step * self.contributions[choices][None] / 100
+        left = (remaining - shares)[:, None, None] * self.step / 100
+        low = child_sums + left * self.suffix_min[choices + 1][None]
+        high = child_sums + left * self.suffix_max[choices + 1][None]
+        bounds = self.lower_bound(low, high)
+
+        share, choice = np.nonzero(bounds < self.threshold)
+        order = np.argsort(bounds[share, choice], kind='stable')
+        share, choice = share[order], choice[order]
+
+        if depth + 3 == spec.max_oils:
+            # Children can only be finished, so finish them all in one pass
+            self._finish(
+                child_sums[share, choice],
+                remaining - shares[share],
+                choices[choice],
+                depth + 1,
+                [positions + (int(choices[j]),) for j in choice],
+                [units + (int(shares[i]),) for i in share],
+            )
+            return
+
+        for i, j in zip(share, choice):
+            if bounds[i, j] >= self.threshold:
+                continue
+            self.expand(child_sums[i, j], remaining - shares[i], choices[j], depth + 1,
+                        positions + (int(choices[j]),), units + (int(shares[i]),))
+
+    def search_root(self, position, units):
+        """Search every recipe whose first oil is the one at pool position, at units"""
+        sums = self.contributions[position] * units * self.step / 100 - self.center
+        self.expand(sums, self.spec.units - units, position, 0, (position,), (units,))
+
+    def candidates(self):
+        return [Candidate(-penalty, positions, units) for penalty, positions, units in self.heap]
+
+
+def _roots(spec):
+    """First-oil branches (pool position, units) the search splits into"""
+    first = [0] if spec.required else range(len(spec.pool))
+    return [(position, units) for position in first for units in range(1, spec.units + 1)]
+
+
+# First-oil branches handed to each worker per task; interleaving them
+# balances the work and lets one task's top N prune its other branches
+TASKS_PER_WORKER = 4
+
+
+def _search_roots(catalog, item):
+    """Top N candidates over a list of first-oil branches; runs in pool workers"""
+    spec, roots = item
+    search = _Search(catalog, spec)
+    for root in roots:
+        search.search_root(*root)
+    return search.candidates()
+
+
+def search_recipes(catalog, max_oils=3, step=5, soap_type='hard', top=10, oil_ids=None, include=(), workers=1):
+    """The best top recipes of 1 to max_oils oils in step% increments, best first
+
+    oil_ids limits the oils considered (default: the whole catalog) and every
+    recipe uses all of include. workers > 1 (or 0 for every core) splits the
+    first-oil branches across a process pool. Returns OptimizedRecipe
+    tuples, best fit first.
+    """
+    units = round(100 / step)
+    if units * step != 100:
+        raise ValueError("Percentage step must divide 100")
+    if not 1 <= max_oils <= units:
+        raise ValueError(f"max_oils must be between 1 and {units}")
+    include = list(dict.fromkeys(include))
+    if len(include) > max_oils:
+        raise ValueError("More required oils than max_oils")
+
+    oil_ids = catalog.ids if oil_ids is None else oil_ids
+    pool_ids = include + [oil_id for oil_id in dict.fromkeys(oil_ids) if oil_id not in include]
+    spec = SearchSpec(catalog.indices(pool_ids), len(include), max_oils, units, soap_type, top)
+
+    roots = _roots(spec)
+    if workers == 1:
+        candidates = _search_roots(catalog, (spec, roots))
+    else:
+        from .parallel import CatalogPool
+        tasks = TASKS_PER_WORKER * (workers or os.cpu_count())
+        candidates = []
+        with CatalogPool(catalog, workers or None) as pool:
+            for found in pool.imap(_search_roots, [(spec, roots[i::tasks]) for i in range(min(tasks, len(roots)))]):
+                candidates.extend(found)
+
+    candidates.sort(key=lambda c: (c.penalty, c.positions, c.units))
+    ranges = get_quality_ranges(soap_type)
+    return [
+        recipe_result(catalog, spec.pool[list(c.positions)], np.array(c.units) * step, ranges)
+        for c in candidates[:top]
+    ]
@@ -0,0 +1,155 @@
+"""
+Incremental recipe evaluation
+Keeps the percentage-weighted property sums of a recipe, so adding,
+removing or resizing one oil costs one row update instead of
+renormalizing and re-reducing the whole oil list
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .catalog import FATTY_ACID_COLUMNS, PROPERTIES, SAP
+from .engine import QUALITIES, js_round, quality_values
+from .recommend import RecommendationContext
+
+RecipeChange = namedtuple('RecipeChange', [
+    'fatty_acids',  # (FATTY_ACIDS,) profile after the change
+    'qualities',    # (QUALITIES,) rounded qualities after the change
+    'changes',      # qualities minus the rounded qualities before, like calculatePredictedImpact's qualityChanges
+])
+
+
+class IncrementalRecipe:
+    """A recipe as running sums of percentage x oil properties
+
+    Every operation is O(PROPERTIES) whatever the recipe size. Like the
+    batch engine, properties are percentage sums divided once by the total
+    rather than the TS per-oil weights, so a quality landing exactly on .5
+    can come out one off from calculateRecipe; use Recommender where that
+    matters. The sums also collect float error one update at a time:
+    refresh() recomputes them, and they reset to zero whenever the recipe is
+    emptied.
+    """
+
+    def __init__(self, catalog, current_oils=()):
+        self.catalog = catalog
+        self.percentages = {}
+        self.sums = np.zeros(len(PROPERTIES))
+        self.total = 0.0
+        for oil_id, percentage in dict(current_oils).items():
+            self.add_oil(oil_id, percentage)
+
+    def __len__(self):
+        return len(self.percentages)
+
+    def __contains__(self, oil_id):
+        return oil_id in self.percentages
+
+    def _row(self, oil_id):
+        try:
+            return self.catalog.matrix[self.catalog.index[oil_id]].astype(np.float64)
+        except KeyError:
+            raise KeyError(f"Unknown oil id: {oil_id}") from None
+
+    @staticmethod
+    def _properties(sums, total):
+        if total <= 0:
+            return np.zeros(len(PROPERTIES))
+        return sums / total
+
+    @property
+    def properties(self):
+        """(PROPERTIES,) weighted SAP, iodine, INS and fatty acids"""
+        return self._properties(self.sums, self.total)
+
+    @property
+    def fatty_acids(self):
+        return self.properties[FATTY_ACID_COLUMNS]
+
+    @property
+    def qualities(self):
+        """(QUALITIES,) rounded qualities"""
+        return js_round(quality_values(self.properties)).astype(np.int64)
+
+    @property
+    def sap(self):
+        """Percentage-weighted SAP value, in the catalog's SAP_BASIS (KOH) like the stored column"""
+        return float(self.properties[SAP])
+
+    def quality_dict(self):
+        return dict(zip(QUALITIES, self.qualities.tolist()))
+
+    def preview(self, oil_id, percentage):
+        """RecipeChange of setting oil_id to percentage (0 removes it), without applying it"""
+        delta = percentage - self.percentages.get(oil_id, 0.0)
+        sums = self.sums + delta * self._row(oil_id)
+        return self._change(sums, self.total + delta)
+
+    def preview_batch(self, rows, percentages):
+        """Rounded (rows x QUALITIES) qualities after adding each catalog row at its percentage
+
+        The what-if of calculatePredictedImpact for many candidate oils at
+        once, as a rank-one update of the current sums. Rows already in the
+        recipe are treated as extra percentage of that oil; a candidate that
+        leaves no oil at all gets zero qualities, like an empty recipe.
+        """
+        percentages = np.asarray(percentages, dtype=np.float64)[:, None]
+        sums = self.sums + percentages * self.catalog.matrix[rows].astype(np.float64)
+        totals = self.total + percentages
+        properties = np.divide(sums, totals, out=np.zeros_like(sums), where=totals > 0)
+        return js_round(quality_values(properties)).astype(np.int64)
+
+    def set_percentage(self, oil_id, percentage):
+        """Set oil_id to percentage, adding it if new; 0 removes it. Returns the RecipeChange"""
+        if percentage < 0:
+            raise ValueError(f"Negative percentage for {oil_id}: {percentage}")
+        delta = percentage - self.percentages.get(oil_id, 0.0)
+        sums = self.sums + delta * self._row(oil_id)
+        change = self._change(sums, self.total + delta)
+
+        if percentage == 0:
+            self.percentages.pop(oil_id, None)
+        else:
+            self.percentages[oil_id] = float(percentage)
+        self.sums = sums
+        self.total += delta
+        if not self.percentages:
+            self.sums[:] = 0
+            self.total = 0.0
+        return change
+
+    def add_oil(self, oil_id, percentage):
+        """Add oil_id at percentage; the percentage adds on if it is already in the recipe"""
+        return self.set_percentage(oil_id, self.percentages.get(oil_id, 0.0) + percentage)
+
+    def remove_oil(self, oil_id):
+        if oil_id not in self.percentages:
+            raise KeyError(f"Oil not in recipe: {oil_id}")
+        return self.set_percentage(oil_id, 0)
+
+    def refresh(self):
+        """Recompute the sums from the stored percentages, dropping accumulated float error"""
+        rows = self.catalog.indices(list(self.percentages))
+        percentages = np.array(list(self.percentages.values()), dtype=np.float64)
+        self.sums = percentages @ self.catalog.matrix[rows].astype(np.float64)
+        self.total = float(percentages.sum())
+
+    def context(self):
+        """RecommendationContext for Recommender.score and friends, without re-reducing the oils"""
+        return RecommendationContext(
+            indices=self.catalog.indices(list(self.percentages)),
+            percentages=np.array(list(self.percentages.values()), dtype=np.float64),
+            total_percentage=self.total,
+            fatty_acids=self.fatty_acids,
+            qualities=self.qualities,
+        )
+
+    def _change(self, sums, total):
+        properties = self._properties(sums, total)
+        qualities = js_round(quality_values(properties)).astype(np.int64)
+        return RecipeChange(
+            fatty_acids=properties[FATTY_ACID_COLUMNS],
+            qualities=qualities,
+            changes=qualities - self.qualities,
+        )
@@ -0,0 +1,173 @@
+"""
+Inventory- and cost-constrained recipe optimization
+Finds the cheapest recipe whose qualities all stay inside the soap type's
+ranges without using more of any oil than is in stock for the whole
+production run. Qualities and stock use are linear in the percentages, so
+this is one LP over the catalog, re-solved warm when a price or stock level
+changes.
+"""
+
+from collections import namedtuple
+import csv
+import json
+
+import numpy as np
+
+from . import lp
+from .engine import QUALITIES, evaluate, get_quality_ranges
+from .optimizer import quality_contributions, round_percentages
+
+CostOptimizedRecipe = namedtuple('CostOptimizedRecipe', [
+    'percentages',  # {oil_id: percentage}, summing to 100
+    'weights',      # {oil_id: weight of the oil the run uses}
+    'cost',         # price of those oils
+    'qualities',    # {quality: value} of the rounded recipe, as calculateRecipe
+    'in_range',     # every rounded quality inside the limits solved for
+    'limited',      # oil ids the run uses all the stock of
+    'iterations',   # simplex pivots; a warm re-solve usually takes a few
+])
+
+
+def read_amounts(path, label='Amount'):
+    """{oil_id: number} from a JSON object or a CSV of oil id, number rows (a header row is skipped)
+
+    Used for price and stock files; label names the value in errors.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return {oil_id: float(value) for oil_id, value in json.load(f).items()}
+        amounts = {}
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[0].strip():
+                continue
+            try:
+                amounts[row[0].strip()] = float(row[1])
+            except ValueError:
+                if amounts:
+                    raise ValueError(f"{label} for {row[0]} is not a number: {row[1]!r}") from None
+        return amounts
+
+
+def quality_limits(ranges, within='range'):
+    """(min, max) arrays in QUALITIES order from the full ('range') or 'ideal' ranges"""
+    if within not in ('range', 'ideal'):
+        raise ValueError(f"Unknown quality limits: {within}")
+    limits = [ranges[name] if within == 'range' else ranges[name]['ideal'] for name in QUALITIES]
+    return (np.array([limit['min'] for limit in limits], dtype=np.float64),
+            np.array([limit['max'] for limit in limits], dtype=np.float64))
+
+
+class InventoryOptimizer:
+    """Cheapest in-range recipe for a production run, kept solved as prices and stock change
+
+    prices are per unit weight and stock is in the same unit as run_weight,
+    the total oil weight of the run. Oils without both a price and some
+    stock stay in the LP at 0%, so setting either later is a warm re-solve
+    like any other edit.
+    """
+
+    def __init__(self, catalog, prices, stock, run_weight, soap_type='hard', within='range', oil_ids=None):
+        self.catalog = catalog
+        self.oil_ids = list(dict.fromkeys(catalog.ids if oil_ids is None else oil_ids))
+        if not self.oil_ids:
+            raise ValueError("Select at least one oil to optimize")
+        self.rows = catalog.indices(self.oil_ids)
+        self.position = {oil_id: i for i, oil_id in enumerate(self.oil_ids)}
+        self.soap_type = soap_type
+        self.within = within
+        self.prices = np.full(len(self.oil_ids), np.nan)
+        self.stock = np.zeros(len(self.oil_ids))
+        for oil_id, price in prices.items():
+            self.prices[self._position(oil_id)] = price
+        for oil_id, amount in stock.items():
+            self.stock[self._position(oil_id)] = amount
+        if (self.prices < 0).any() or (self.stock < 0).any():
+            raise ValueError("Prices and stock must not be negative")
+        if not run_weight > 0:
+            raise ValueError("Run weight must be positive")
+        self.run_weight = float(run_weight)
+        self.program = self._program()
+
+    def _position(self, oil_id):
+        try:
+            return self.position[oil_id]
+        except KeyError:
+            raise ValueError(f"Unknown oil id: {oil_id}") from None
+
+    def _costs(self):
+        """Price of each oil's share of the run per percent"""
+        return np.nan_to_num(self.prices) * self.run_weight / 100
+
+    def _upper(self):
+        """Most percent of the run each oil's stock covers; 0 without a price"""
+        upper = np.minimum(100, 100 * self.stock / self.run_weight)
+        return np.where(np.isnan(self.prices), 0, upper)
+
+    def _program(self):
+        """Variables are percentages. Rows: quality <= max, -quality <= -min, percentage <= stock cap"""
+        n = len(self.oil_ids)
+        quality = quality_contributions(self.catalog, self.rows).T / 100
+        low, high = quality_limits(get_quality_ranges(self.soap_type), self.within)
+        A_ub = np.vstack([quality, -quality, np.eye(n)])
+        b_ub = np.concatenate([high, -low, self._upper()])
+        return lp.LinearProgram(self._costs(), A_ub, b_ub, np.ones((1, n)), [100])
+
+    def _bounds_changed(self):
+        b_ub = self.program.b_ub.copy()
+        b_ub[-len(self.oil_ids):] = self._upper()
+        self.program.set_b_ub(b_ub)
+
+    def set_price(self, oil_id, price):
+        """New price per unit weight; None marks the oil unavailable"""
+        i = self._position(oil_id)
+        if price is not None and price < 0:
+            raise ValueError("Prices must not be negative")
+        was_priced = not np.isnan(self.prices[i])
+        self.prices[i] = np.nan if price is None else price
+        self.program.set_costs(self._costs())
+        if was_priced != (price is not None):
+            self._bounds_changed()
+
+    def set_stock(self, oil_id, amount):
+        if amount < 0:
+            raise ValueError("Stock must not be negative")
+        self.stock[self._position(oil_id)] = amount
+        self._bounds_changed()
+
+    def set_run_weight(self, run_weight):
+        if not run_weight > 0:
+            raise ValueError("Run weight must be positive")
+        self.run_weight = float(run_weight)
+        self.program.set_costs(self._costs())
+        self._bounds_changed()
+
+    def solve(self):
+        """CostOptimizedRecipe; raises ValueError when no stocked mix keeps every quality in range"""
+        result = self.program.solve()
+        if result.status != 'optimal':
+            raise ValueError(f"No recipe within stock keeps every quality in range ({result.status})")
+
+        upper = self._upper()
+        percentages = round_percentages(np.clip(result.x, 0, upper), upper=upper)
+        used = np.flatnonzero(percentages > 0)
+        matrix = np.zeros((1, len(self.catalog)))
+        matrix[0, self.rows[used]] = percentages[used]
+        batch = evaluate(self.catalog, matrix, total_oil_weight=self.run_weight)
+        weights = batch.oil_weights[0, self.rows[used]]
+        qualities = batch.qualities[0]
+
+        low, high = quality_limits(get_quality_ranges(self.soap_type), self.within)
+        return CostOptimizedRecipe(
+            percentages={self.oil_ids[i]: float(percentages[i]) for i in used},
+            weights={self.oil_ids[i]: float(w) for i, w in zip(used, weights)},
+            cost=round(float(np.nan_to_num(self.prices[used]) @ weights), 2),
+            qualities=dict(zip(QUALITIES, qualities.tolist())),
+            in_range=bool(((qualities >= low) & (qualities <= high)).all()),
+            limited=[self.oil_ids[i] for i, w in zip(used, weights) if w >= self.stock[i] - 0.005],
+            iterations=result.iterations,
+        )
+
+
+def optimize_inventory(catalog, prices, stock, run_weight, soap_type='hard', within='range', oil_ids=None):
+    """One-off InventoryOptimizer(...).solve(); keep the optimizer to re-solve after edits"""
+    return InventoryOptimizer(catalog, prices, stock, run_weight, soap_type, within, oil_ids).solve()
@@ -0,0 +1,243 @@
+"""
+Small dense linear program solver
+Two-phase simplex on a NumPy tableau, sized for recipe problems with tens
+of variables where the solve has to finish in well under a millisecond.
+LinearProgram keeps the final tableau so edited costs or bounds re-solve
+from the previous optimum.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+TOLERANCE = 1e-9
+
+LinearProgramResult = namedtuple('LinearProgramResult', [
+    'x',           # solution, or None unless status is 'optimal'
+    'objective',   # c @ x
+    'status',      # 'optimal', 'infeasible', 'unbounded' or 'iteration_limit'
+    'iterations',  # simplex pivots over both phases
+])
+
+
+def _rows(A, b, n):
+    if A is None:
+        return np.zeros((0, n)), np.zeros(0)
+    return np.atleast_2d(np.asarray(A, dtype=np.float64)), np.atleast_1d(np.asarray(b, dtype=np.float64))
+
+
+def _pivot(tableau, basis, row, col):
+    tableau[row] /= tableau[row, col]
+    factors = tableau[:, col].copy()
+    factors[row] = 0
+    tableau -= np.outer(factors, tableau[row])
+    basis[row] = col
+
+
+def _simplex(tableau, basis, columns, max_iterations):
+    """Minimize the objective in the last tableau row using the first columns columns
+
+    Uses Dantzig's rule, falling back to Bland's rule after a degenerate
+    pivot so the method cannot cycle. Returns (status, iterations).
+    """
+    degenerate = False
+    for iterations in range(max_iterations):
+        costs = tableau[-1, :columns]
+        entering = np.flatnonzero(costs < -TOLERANCE)
+        if not len(entering):
+            return 'optimal', iterations
+        col = entering[0] if degenerate else entering[np.argmin(costs[entering])]
+
+        column = tableau[:-1, col]
+        positive = column > TOLERANCE
+        if not positive.any():
+            return 'unbounded', iterations
+        ratios = np.full(len(column), np.inf)
+        ratios[positive] = tableau[:-1, -1][positive] / column[positive]
+        best = ratios.min()
+        ties = np.flatnonzero(ratios <= best + TOLERANCE)
+        row = ties[np.argmin(basis[ties])]
+
+        degenerate = best <= TOLERANCE
+        _pivot(tableau, basis, row, col)
+    return 'iteration_limit', max_iterations
+
+
+def _dual_simplex(tableau, basis, columns, max_iterations):
+    """Restore non-negative right-hand sides while keeping every reduced cost non-negative
+
+    Used after b changes under an optimal basis. Returns (status, iterations);
+    'infeasible' when a negative row has no entry that can leave it.
+    """
+    for iterations in range(max_iterations):
+        rhs = tableau[:-1, -1]
+        row = np.argmin(rhs)
+        if rhs[row] >= -TOLERANCE:
+            return 'optimal', iterations
+        entries = tableau[row, :columns]
+        negative = entries < -TOLERANCE
+        if not negative.any():
+            return 'infeasible', iterations
+        ratios = np.full(columns, np.inf)
+        ratios[negative] = np.maximum(tableau[-1, :columns][negative], 0) / -entries[negative]
+        _pivot(tableau, basis, row, np.argmin(ratios))
+    return 'iteration_limit', max_iterations
+
+
+class LinearProgram:
+    """minimize c @ x subject to A_ub @ x <= b_ub, A_eq @ x == b_eq and x >= 0, re-solvable after edits
+
+    The final tableau of an optimal solve is kept. New costs leave that basis
+    feasible, so the primal simplex continues from it; a new b_ub leaves it
+    dual feasible, so the dual simplex repairs it. Either usually takes a few
+    pivots instead of both phases from scratch. A warm solve whose answer
+    does not check out against the constraints is redone cold.
+    """
+
+    def __init__(self, c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, max_iterations=1000):
+        self.c = np.array(c, dtype=np.float64)
+        n = len(self.c)
+        self.A_ub, b_ub = _rows(A_ub, b_ub, n)
+        self.A_eq, b_eq = _rows(A_eq, b_eq, n)
+        self.b_ub = b_ub.copy()
+        self.b_eq = b_eq.copy()
+        self.max_iterations = max_iterations
+        self._tableau = None  # phase 2 tableau of the last optimal solve
+        self._basis = None
+
+    @property
+    def warm(self):
+        """Whether the next solve starts from the previous optimal basis"""
+        return self._tableau is not None
+
+    def set_costs(self, c):
+        c = np.asarray(c, dtype=np.float64)
+        if c.shape != self.c.shape:
+            raise ValueError(f"Expected {len(self.c)} costs, got {c.shape}")
+        self.c = c.copy()
+        if self._tableau is not None:
+            self._price(self._tableau, self._basis)
+
+    def set_b_ub(self, b_ub):
+        b_ub = np.asarray(b_ub, dtype=np.float64)
+        if b_ub.shape != self.b_ub.shape:
+            raise ValueError(f"Expected {len(self.b_ub)} upper bounds, got {b_ub.shape}")
+        changed = np.flatnonzero(b_ub != self.b_ub)
+        if self._tableau is not None and len(changed):
+            # The slack column of <= row r holds B^-1 e_r (sign-adjusted if the row was flipped)
+            slack = len(self.c) + changed
+            self._tableau[:, -1] += self._tableau[:, slack] @ (b_ub - self.b_ub)[changed]
+        self.b_ub = b_ub.copy()
+
+    def _price(self, tableau, basis):
+        """Objective row for the current costs against basis"""
+        costs = np.concatenate([self.c, np.zeros(len(self.A_ub))])
+        tableau[-1, :-1] = costs
+        tableau[-1, -1] = 0
+        tableau[-1] -= costs[basis] @ tableau[:-1]
+
+    def _result(self, tableau, basis, iterations):
+        columns = len(self.c) + len(self.A_ub)
+        x = np.zeros(columns)
+        x[basis] = tableau[:-1, -1]
+        x = x[:len(self.c)]
+        return LinearProgramResult(x, float(self.c @ x), 'optimal', iterations)
+
+    def _feasible(self, x):
+        scale = TOLERANCE * 1e3 * max(1.0, np.abs(self.b_ub).max(initial=0), np.abs(self.b_eq).max(initial=0))
+        return ((x >= -scale).all()
+                and (self.A_ub @ x <= self.b_ub + scale).all()
+                and (np.abs(self.A_eq @ x - self.b_eq) <= scale).all())
+
+    def solve(self):
+        """LinearProgramResult; it does not raise for infeasible or unbounded problems"""
+        if self._tableau is not None:
+            result = self._solve_warm()
+            if result is not None:
+                return result
+        return self._solve_cold()
+
+    def _solve_warm(self):
+        tableau, basis = self._tableau, self._basis
+        columns = len(self.c) + len(self.A_ub)
+        status, iterations = _dual_simplex(tableau, basis, columns, self.max_iterations)
+        if status == 'optimal':
+            status, primal = _simplex(tableau, basis, columns, self.max_iterations - iterations)
+            iterations += primal
+        if status == 'optimal':
+            result = self._result(tableau, basis, iterations)
+            if self._feasible(result.x):
+                return result
+        self._tableau = self._basis = None
+        return None
+
+    def _solve_cold(self):
+        c, A_ub, b_ub, A_eq, b_eq = self.c, self.A_ub, self.b_ub, self.A_eq, self.b_eq
+        max_iterations = self.max_iterations
+        self._tableau = self._basis = None
+        n = len(c)
+        m_ub, m = len(A_ub), len(A_ub) + len(A_eq)
+
+        # Equality form: [A_ub I; A_eq 0] with every right-hand side made non-negative
+        A = np.zeros((m, n + m_ub))
+        A[:m_ub, :n] = A_ub
+        A[:m_ub, n:] = np.eye(m_ub)
+        A[m_ub:, :n] = A_eq
+        b = np.concatenate([b_ub, b_eq])
+        flipped = b < 0
+        A[flipped] *= -1
+        b[flipped] *= -1
+
+        # Slacks of unflipped <= rows start basic; every other row gets an artificial
+        needs_artificial = np.ones(m, dtype=bool)
+        needs_artificial[:m_ub] = flipped[:m_ub]
+        artificial_rows = np.flatnonzero(needs_artificial)
+        columns = n + m_ub
+
+        tableau = np.zeros((m + 1, columns + len(artificial_rows) + 1))
+        tableau[:m, :columns] = A
+        tableau[artificial_rows, columns + np.arange(len(artificial_rows))] = 1
+        tableau[:m, -1] = b
+        basis = np.where(needs_artificial, 0, n + np.arange(m)).astype(np.intp)
+        basis[artificial_rows] = columns + np.arange(len(artificial_rows))
+
+        # Phase 1: minimize the sum of the artificials
+        iterations = 0
+        if len(artificial_rows):
+            tableau[-1] = -tableau[artificial_rows].sum(axis=0)
+            tableau[-1, columns:-1] = 0
+            status, iterations = _simplex(tableau, basis, columns, max_iterations)
+            if status == 'iteration_limit':
+                return LinearProgramResult(None, None, status, iterations)
+            if -tableau[-1, -1] > TOLERANCE * max(1.0, np.abs(b).max()):
+                return LinearProgramResult(None, None, 'infeasible', iterations)
+
+            # Pivot any artificials left at zero out of the basis; drop rows that are redundant
+            keep = np.ones(m + 1, dtype=bool)
+            for row in np.flatnonzero(basis >= columns):
+                nonzero = np.flatnonzero(np.abs(tableau[row, :columns]) > TOLERANCE)
+                if len(nonzero):
+                    _pivot(tableau, basis, row, nonzero[0])
+                else:
+                    keep[row] = False
+            tableau = np.delete(tableau[keep], np.s_[columns:-1], axis=1)
+            basis = basis[keep[:-1]]
+
+        # Phase 2: the real objective, priced out against the current basis
+        self._price(tableau, basis)
+        status, phase2 = _simplex(tableau, basis, columns, max_iterations - iterations)
+        iterations += phase2
+        if status != 'optimal':
+            return LinearProgramResult(None, None, status, iterations)
+
+        self._tableau, self._basis = tableau, basis
+        return self._result(tableau, basis, iterations)
+
+
+def solve(c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, max_iterations=1000):
+    """minimize c @ x subject to A_ub @ x <= b_ub, A_eq @ x == b_eq and x >= 0
+
+    Returns a LinearProgramResult; it does not raise for infeasible or
+    unbounded problems.
+    """
+    return LinearProgram(c, A_ub, b_ub, A_eq, b_eq, max_iterations).solve()
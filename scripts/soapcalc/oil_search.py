@@ -0,0 +1,253 @@
+"""
+In-memory oil search
+Prefix and trigram indexes over oil names, ids and aliases for
+autocomplete, plus sorted per-property columns for range filters like
+"oleic > 60 and linolenic < 5"
+"""
+
+from bisect import bisect_left, bisect_right, insort
+import re
+
+import numpy as np
+
+from .catalog import PROPERTIES, OilCatalog
+
+# pg_trgm's default similarity threshold
+DEFAULT_SIMILARITY = 0.3
+
+OPERATORS = ('<', '<=', '>', '>=', '=')
+
+_CONDITION = re.compile(r'^\s*(\w+)\s*(<=|>=|<|>|=)\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def normalize(text):
+    """Lowercase words with punctuation and hyphens turned into single spaces"""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', text.lower()).split())
+
+
+def name_aliases(name):
+    """Search terms for an oil name: the name itself and its comma parts reordered
+
+    "Linseed Oil, flax" also matches as "flax linseed oil", so a search
+    for either word order finds it.
+    """
+    terms = [normalize(name)]
+    head, _, rest = name.partition(',')
+    if rest.strip():
+        terms.append(normalize(f"{rest} {head}"))
+    return terms
+
+
+def trigrams(term):
+    """pg_trgm-style trigrams: each word padded with two leading spaces and one trailing"""
+    grams = set()
+    for word in term.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def parse_conditions(text):
+    """[(property, operator, value)] from "oleic > 60 and linolenic < 5" """
+    conditions = []
+    for part in re.split(r'\s+and\s+', text.strip(), flags=re.IGNORECASE):
+        match = _CONDITION.match(part)
+        if not match:
+            raise ValueError(f"Cannot parse condition: {part!r}")
+        prop, op, value = match.groups()
+        if prop not in PROPERTIES:
+            raise ValueError(f"Unknown property: {prop}")
+        conditions.append((prop, op, float(value)))
+    return conditions
+
+
+class OilSearchIndex:
+    """Name, id and alias search with per-property range filters
+
+    Oils are keyed by id, so custom oils can be added, replaced or removed
+    one at a time: each change touches only that oil's index entries.
+    """
+
+    def __init__(self, catalog=None, aliases=None):
+        self.names = {}
+        self.values = {}
+        self._terms = {}                                 # oil id -> search terms
+        self._word_trigrams = {}                         # oil id -> per term, trigrams of each word
+        self._tokens = []                                # sorted (word, oil id)
+        self._trigrams = {}                              # trigram -> oil ids
+        self._columns = {prop: ([], []) for prop in PROPERTIES}  # sorted values, matching oil ids
+        aliases = aliases or {}
+
+        if catalog is not None:
+            for i, oil_id in enumerate(catalog.ids):
+                self._insert(oil_id, catalog.names[i], catalog.matrix[i].tolist(), aliases.get(oil_id, ()))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, oil_id):
+        return oil_id in self.names
+
+    def set_oil(self, oil, aliases=()):
+        """Add or replace an oil given as a parse_oils() row or OilData dict"""
+        row = OilCatalog.from_oils([oil])
+        if oil['id'] in self.names:
+            self.remove_oil(oil['id'])
+        self._insert(oil['id'], oil['name'], row.matrix[0].tolist(), aliases)
+
+    def remove_oil(self, oil_id):
+        del self._word_trigrams[oil_id]
+        for term in self._terms.pop(oil_id):
+            for word in set(term.split()):
+                i = bisect_left(self._tokens, (word, oil_id))
+                if i < len(self._tokens) and self._tokens[i] == (word, oil_id):
+                    del self._tokens[i]
+            for gram in trigrams(term):
+                oils = self._trigrams.get(gram)
+                if oils is not None:
+                    oils.discard(oil_id)
+                    if not oils:
+                        del self._trigrams[gram]
+        for prop, value in zip(PROPERTIES, self.values.pop(oil_id)):
+            values, ids = self._columns[prop]
+            i = bisect_left(values, value)
+            while ids[i] != oil_id:
+                i += 1
+            del values[i], ids[i]
+        del self.names[oil_id]
+
+    def _insert(self, oil_id, name, values, aliases):
+        terms = list(dict.fromkeys(
+            name_aliases(name) + [normalize(oil_id)] + [normalize(alias) for alias in aliases]
+        ))
+        self.names[oil_id] = name
+        self.values[oil_id] = values
+        self._terms[oil_id] = terms
+        self._word_trigrams[oil_id] = [[trigrams(word) for word in term.split()] for term in terms]
+        for term in terms:
+            for word in set(term.split()):
+                insort(self._tokens, (word, oil_id))
+            for gram in trigrams(term):
+                self._trigrams.setdefault(gram, set()).add(oil_id)
+        for prop, value in zip(PROPERTIES, values):
+            column_values, column_ids = self._columns[prop]
+            i = bisect_right(column_values, value)
+            column_values.insert(i, value)
+            column_ids.insert(i, oil_id)
+
+    def _by_name(self, oil_ids):
+        return sorted(oil_ids, key=lambda oil_id: (self.names[oil_id].lower(), oil_id))
+
+    def _word_prefix(self, prefix):
+        """Oil ids with a word starting with prefix"""
+        start = bisect_left(self._tokens, (prefix,))
+        found = set()
+        for word, oil_id in self._tokens[start:]:
+            if not word.startswith(prefix):
+                break
+            found.add(oil_id)
+        return found
+
+    def autocomplete(self, query, limit=10):
+        """Oils where every query word starts a word of the name, id or an alias, by name
+
+        "sw alm" finds "Almond Oil, sweet".
+        """
+        words = normalize(query).split()
+        if not words:
+            return []
+        found = None
+        for word in sorted(words, key=len, reverse=True):
+            matches = self._word_prefix(word)
+            found = matches if found is None else found & matches
+            if not found:
+                return []
+        return self._by_name(found)[:limit]
+
+    def contains(self, query):
+        """Oils whose name, id or an alias contains query, by name, like searchOils' ilike '%query%'
+
+        Queries of three or more characters are narrowed to oils holding
+        every trigram of the query before the substring check.
+        """
+        query = normalize(query)
+        if not query:
+            return self._by_name(self.names)
+        candidates = self.names.keys()
+        if len(query) >= 3:
+            grams = {query[i:i + 3] for i in range(len(query) - 2)}
+            candidates = None
+            for gram in grams:
+                # Word-padded trigrams cover every gram of a substring except
+                # those with a space in the middle, which span two words
+                if gram[1] == ' ':
+                    continue
+                oils = self._trigrams.get(gram, set())
+                candidates = oils if candidates is None else candidates & oils
+                if not candidates:
+                    return []
+        return self._by_name(oil_id for oil_id in (candidates if candidates is not None else self.names)
+                             if any(query in term for term in self._terms[oil_id]))
+
+    def fuzzy(self, query, threshold=DEFAULT_SIMILARITY, limit=10):
+        """(oil id, similarity) for oils with a name, id or alias trigram-similar to query, best first
+
+        Similarity is shared trigrams over all trigrams, as pg_trgm's
+        similarity(), taken against whole terms and against every run of as
+        many words as the query, so "jojba" finds Jojoba Oil (a Liquid Wax
+        Ester) despite the long name.
+        """
+        query = normalize(query)
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        width = len(query.split())
+        candidates = set()
+        for gram in query_grams:
+            candidates |= self._trigrams.get(gram, set())
+
+        scored = []
+        for oil_id in candidates:
+            best = 0.0
+            for words in self._word_trigrams[oil_id]:
+                spans = [set().union(*words)] + [set().union(*words[i:i + width])
+                                                 for i in range(len(words) - width + 1)]
+                for grams in spans:
+                    best = max(best, len(query_grams & grams) / len(query_grams | grams))
+            if best >= threshold:
+                scored.append((oil_id, best))
+        scored.sort(key=lambda item: (-item[1], self.names[item[0]].lower(), item[0]))
+        return scored[:limit]
+
+    def range_ids(self, prop, op, value):
+        """Oil ids whose property satisfies op value, from the sorted column"""
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator: {op}")
+        # Columns hold the catalog's float32 values, so compare at that precision
+        value = float(np.float32(value))
+        values, ids = self._columns[prop]
+        if op == '<':
+            return set(ids[:bisect_left(values, value)])
+        if op == '<=':
+            return set(ids[:bisect_right(values, value)])
+        if op == '>':
+            return set(ids[bisect_right(values, value):])
+        if op == '>=':
+            return set(ids[bisect_left(values, value):])
+        return set(ids[bisect_left(values, value):bisect_right(values, value)])
+
+    def where(self, conditions):
+        """Oil ids matching every condition, by name
+
+        conditions is a string like "oleic > 60 and linolenic < 5" or a list
+        of (property, operator, value) tuples.
+        """
+        if isinstance(conditions, str):
+            conditions = parse_conditions(conditions)
+        found = None
+        for prop, op, value in conditions:
+            matches = self.range_ids(prop, op, value)
+            found = matches if found is None else found & matches
+            if not found:
+                return []
+        return self._by_name(found if found is not None else self.names)
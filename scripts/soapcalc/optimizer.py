@@ -0,0 +1,176 @@
+"""
+Recipe optimizer
+Solves for oil percentages that put every soap quality in its ideal range.
+Qualities are linear in the percentages, so this is a small linear program
+instead of the fixed calculateSuggestedPercentage heuristics.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from . import lp
+from .engine import QUALITIES, QUALITY_MATRIX, evaluate, get_quality_ranges
+
+# Objective weight of distance from the middle of the ideal range, relative
+# to distance outside it; only breaks ties between in-range solutions
+CENTERING_WEIGHT = 0.01
+
+# Percentages are returned in these steps, like the 0.1% display in the app
+PERCENTAGE_STEP = 0.1
+
+OptimizedRecipe = namedtuple('OptimizedRecipe', [
+    'percentages',  # {oil_id: percentage}, summing to 100
+    'qualities',    # {quality: value} of the rounded recipe, as calculateRecipe
+    'deviations',   # {quality: signed distance outside the ideal range, 0 when inside}
+    'in_range',     # every quality inside its ideal range
+])
+
+
+def quality_contributions(catalog, rows):
+    """(oils x QUALITIES) quality of a recipe made of 100% of each oil"""
+    return catalog.matrix[rows].astype(np.float64) @ QUALITY_MATRIX.astype(np.float64)
+
+
+def round_percentages(percentages, step=PERCENTAGE_STEP, upper=None):
+    """Round to multiples of step that still sum to 100, by largest remainder
+
+    Rounding down never passes a lower bound on the step grid. With upper,
+    only percentages with room below their cap are rounded up, falling back
+    to ignoring the caps when they leave too little room, which can
+    overshoot a cap by less than one step.
+    """
+    units = np.asarray(percentages, dtype=np.float64) / step
+    whole = np.floor(units + 1e-9)
+    missing = int(round(100 / step - whole.sum()))
+    if missing > 0:
+        order = np.argsort(-(units - whole), kind='stable')
+        if upper is not None:
+            room = (whole + 1) * step <= np.asarray(upper) + 1e-9
+            if room[order].sum() >= missing:
+                order = order[room[order]]
+        whole[order[:missing]] += 1
+    return np.round(whole * step, 10)
+
+
+def ideal_targets(ranges):
+    """(ideal min, ideal max, scale) arrays in QUALITIES order
+
+    scale is one over the width of each quality's full range, so distances
+    in iodine and INS do not outweigh the other qualities.
+    """
+    ideal_min = np.array([ranges[name]['ideal']['min'] for name in QUALITIES], dtype=np.float64)
+    ideal_max = np.array([ranges[name]['ideal']['max'] for name in QUALITIES], dtype=np.float64)
+    width = np.array([ranges[name]['max'] - ranges[name]['min'] for name in QUALITIES], dtype=np.float64)
+    return ideal_min, ideal_max, 1 / np.maximum(width, 1)
+
+
+def fit_penalty(qualities, ranges):
+    """The optimizer's objective for (... x QUALITIES) unrounded qualities; 0 is a perfect center"""
+    ideal_min, ideal_max, scale = ideal_targets(ranges)
+    return center_penalty(qualities - (ideal_min + ideal_max) / 2, (ideal_max - ideal_min) / 2, scale)
+
+
+def center_penalty(offsets, half_widths, scale):
+    """fit_penalty from each quality's offset from the middle of its ideal range
+
+    The penalty only grows with the size of the offset, which lets the
+    exhaustive search bound whole branches by their smallest possible offset.
+    """
+    offsets = np.abs(offsets)
+    return (np.maximum(offsets - half_widths, 0) + CENTERING_WEIGHT * offsets) @ scale
+
+
+def recipe_result(catalog, rows, percentages, ranges):
+    """OptimizedRecipe for percentages of catalog rows, with qualities as calculateRecipe rounds them"""
+    matrix = np.zeros((1, len(catalog)))
+    matrix[0, rows] = percentages
+    qualities = evaluate(catalog, matrix, total_oil_weight=100).qualities[0]
+
+    deviations = {}
+    for name, value in zip(QUALITIES, qualities.tolist()):
+        ideal = ranges[name]['ideal']
+        deviations[name] = min(0, value - ideal['min']) + max(0, value - ideal['max'])
+
+    return OptimizedRecipe(
+        percentages={catalog.ids[i]: float(p) for i, p in zip(rows, percentages) if p > 0},
+        qualities=dict(zip(QUALITIES, qualities.tolist())),
+        deviations=deviations,
+        in_range=not any(deviations.values()),
+    )
+
+
+def _bounds(oil_ids, bounds, step=PERCENTAGE_STEP):
+    """(lower, upper) arrays, narrowed to multiples of step so the rounded recipe stays inside them"""
+    lower = np.zeros(len(oil_ids))
+    upper = np.full(len(oil_ids), 100.0)
+    for i, oil_id in enumerate(oil_ids):
+        if bounds and oil_id in bounds:
+            lower[i], upper[i] = bounds[oil_id]
+    if (lower < 0).any() or (upper > 100).any() or (lower > upper).any():
+        raise ValueError("Percentage bounds must satisfy 0 <= min <= max <= 100")
+    lower = np.round(np.ceil(lower / step - 1e-9) * step, 10)
+    upper = np.round(np.floor(upper / step + 1e-9) * step, 10)
+    if (lower > upper).any():
+        raise ValueError(f"Percentage bounds must include a multiple of {step:g}%")
+    if lower.sum() > 100 + 1e-9 or upper.sum() < 100 - 1e-9:
+        raise ValueError("Percentage bounds cannot add up to 100%")
+    return lower, upper
+
+
+def solve_percentages(contributions, ranges, lower, upper):
+    """Raw LP solution: percentages minimizing the weighted distance outside each ideal range
+
+    Variables are [percentages, below, above, over_center, under_center],
+    one of each deviation per quality, weighted by ideal_targets() scale.
+    """
+    n, q = contributions.shape
+    ideal_min, ideal_max, scale = ideal_targets(ranges)
+
+    quality = contributions.T / 100
+    eye = np.eye(q)
+    zeros = np.zeros((q, q))
+    free = np.eye(n)
+
+    # quality + below >= ideal min; quality - above <= ideal max; percentage bounds
+    A_ub = np.block([
+        [-quality, -eye, zeros, zeros, zeros],
+        [quality, zeros, -eye, zeros, zeros],
+        [free, np.zeros((n, 4 * q))],
+        [-free, np.zeros((n, 4 * q))],
+    ])
+    b_ub = np.concatenate([-ideal_min, ideal_max, upper, -lower])
+
+    # quality - center = over - under; percentages sum to 100
+    A_eq = np.block([
+        [quality, zeros, zeros, -eye, eye],
+        [np.ones((1, n)), np.zeros((1, 4 * q))],
+    ])
+    b_eq = np.concatenate([(ideal_min + ideal_max) / 2, [100]])
+
+    c = np.concatenate([np.zeros(n), scale, scale, CENTERING_WEIGHT * scale, CENTERING_WEIGHT * scale])
+    result = lp.solve(c, A_ub, b_ub, A_eq, b_eq)
+    if result.status != 'optimal':
+        raise ValueError(f"Recipe optimization failed: {result.status}")
+    return np.clip(result.x[:n], lower, upper)
+
+
+def optimize_recipe(catalog, oil_ids, soap_type='hard', bounds=None):
+    """Percentages of oil_ids that best fit the soap type's ideal quality ranges
+
+    bounds maps oil ids to (min, max) percentages, e.g. to pin an oil the
+    user has already set; the rounded percentages stay inside them. Raises
+    ValueError for bounds that cannot add up to 100% in PERCENTAGE_STEP
+    steps. When no mix reaches every ideal range the closest one is
+    returned with in_range False.
+    """
+    oil_ids = list(dict.fromkeys(oil_ids))
+    if not oil_ids:
+        raise ValueError("Select at least one oil to optimize")
+    rows = catalog.indices(oil_ids)
+    lower, upper = _bounds(oil_ids, bounds)
+    ranges = get_quality_ranges(soap_type)
+
+    raw = solve_percentages(quality_contributions(catalog, rows), ranges, lower, upper)
+    percentages = round_percentages(raw, upper=upper)
+    return recipe_result(catalog, rows, percentages, ranges)
@@ -0,0 +1,127 @@
+"""
+Process pool fan-out with a shared-memory oil catalog
+The property matrix is copied into one multiprocessing.shared_memory block
+that every worker maps zero-copy instead of unpickling its own catalog
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+import sys
+
+import numpy as np
+
+from .batch import DEFAULT_CHUNK_SIZE, chunked_lines, evaluate_lines
+from .catalog import OilCatalog
+
+# Set in each worker by _init_worker
+_worker_catalog = None
+_worker_memory = None
+
+
+class SharedCatalog:
+    """Owns a shared memory copy of a catalog's property matrix
+
+    spec is the small picklable description workers use to attach.
+    """
+
+    def __init__(self, catalog):
+        matrix = catalog.matrix
+        self._memory = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        view = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=self._memory.buf)
+        view[:] = matrix
+        self.spec = {
+            'name': self._memory.name,
+            'shape': matrix.shape,
+            'dtype': matrix.dtype.str,
+            'ids': catalog.ids,
+            'names': catalog.names,
+            'categories': catalog.categories,
+        }
+
+    def close(self):
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach(spec):
+    """Map a SharedCatalog spec back to (OilCatalog, SharedMemory) without copying the matrix
+
+    Keep the returned SharedMemory alive for as long as the catalog is used.
+    """
+    if sys.version_info >= (3, 13):
+        memory = shared_memory.SharedMemory(name=spec['name'], track=False)
+    else:
+        memory = shared_memory.SharedMemory(name=spec['name'])
+    matrix = np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=memory.buf)
+    return OilCatalog(spec['ids'], spec['names'], spec['categories'], matrix), memory
+
+
+def _init_worker(spec):
+    global _worker_catalog, _worker_memory
+    _worker_catalog, _worker_memory = attach(spec)
+
+
+def _call(func, item):
+    return func(_worker_catalog, item)
+
+
+class CatalogPool:
+    """Process pool whose workers share one catalog
+
+    imap(func, items) runs func(catalog, item) in the workers and yields
+    results in input order, keeping at most window * workers items in flight
+    so arbitrarily long inputs stream through in bounded memory.
+    """
+
+    def __init__(self, catalog, workers=None, window=2):
+        self.workers = workers or os.cpu_count() or 1
+        self.window = window
+        self._shared = SharedCatalog(catalog)
+        try:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._shared.spec,),
+            )
+        except Exception:
+            self._shared.close()
+            raise
+
+    def imap(self, func, items):
+        pending = deque()
+        limit = self.workers * self.window
+        for item in items:
+            pending.append(self._executor.submit(_call, func, item))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown()
+        self._shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def evaluate_lines_parallel(catalog, lines, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """Parallel counterpart of evaluate_lines over a whole input stream
+
+    Yields (JSONL result lines, error count) per chunk, in input order.
+    """
+    with CatalogPool(catalog, workers) as pool:
+        yield from pool.imap(evaluate_lines, chunked_lines(lines, chunk_size))
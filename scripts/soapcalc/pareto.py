@@ -0,0 +1,388 @@
+"""
+Pareto frontier recipe explorer
+Enumerates every mix of up to k pool oils at a fixed step in vectorized
+batches and keeps the recipes that no other recipe beats on every soap
+quality (and cost): the best trade-offs, cached per pool
+"""
+
+from itertools import combinations, islice
+import hashlib
+from math import comb
+import os
+
+import numpy as np
+
+from .cache import LRUCache
+from .engine import QUALITIES, get_quality_ranges, quality_values, soap_qualities, weighted_properties
+from .optimizer import fit_penalty
+from .records import RecipeBatch
+
+# Which way each quality is better on the frontier
+SENSES = {
+    'hardness': 'max',
+    'cleansing': 'min',      # gentler
+    'conditioning': 'max',
+    'bubbly': 'max',
+    'creamy': 'max',
+    'iodine': 'min',         # slower to go rancid
+    'ins': 'max',
+}
+
+# Candidates kept: 'range' (every quality within its min/max), 'ideal' or None for all
+WITHIN = ('range', 'ideal', None)
+
+# Candidate qualities computed per enumeration batch
+BATCH_CANDIDATES = 262144
+
+# Candidates merged into the running frontier at once
+MERGE_CANDIDATES = 262144
+
+# Percentage matrix cells built at once for the engine's weighted properties
+DENSE_CELLS = 1 << 22
+
+# Points compared per skyline block
+SKYLINE_BLOCK = 1024
+
+DEFAULT_CACHE_ENTRIES = 64
+
+
+def compositions(units, parts):
+    """(count x parts) int16 array of every split of units into parts positive integers"""
+    cuts = np.array(list(combinations(range(1, units), parts - 1)), dtype=np.int16)
+    cuts = cuts.reshape(comb(units - 1, parts - 1), parts - 1)
+    edges = np.hstack([np.zeros((len(cuts), 1), np.int16), cuts, np.full((len(cuts), 1), units, np.int16)])
+    return np.diff(edges, axis=1)
+
+
+def skyline(points, block=SKYLINE_BLOCK):
+    """Rows of points (minimizing every column) that no other row dominates
+
+    Sort-filter-skyline: after sorting by row sum a point can only be
+    dominated by points before it, so blocks are checked against the
+    frontier so far and then among themselves, never all pairs. Frontier
+    points are tried in order of how many points they have already
+    eliminated, so most dominated points are discarded by the first few
+    comparisons. Of identical rows only the first is kept.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if not len(points):
+        return np.zeros(0, dtype=np.intp)
+    unique, first = np.unique(points, axis=0, return_index=True)
+    order = np.argsort(unique.sum(axis=1), kind='stable')
+    ordered, source = unique[order], first[order]
+
+    frontier = np.empty((0, points.shape[1]))
+    kills = np.zeros(0, dtype=np.int64)
+    kept = []
+    for start in range(0, len(ordered), block):
+        candidates = ordered[start:start + block]
+        alive = np.arange(len(candidates))
+
+        # Against the frontier so far, strongest points first, in growing chunks
+        strongest = np.argsort(-kills, kind='stable')
+        tried, step = 0, 8
+        while tried < len(frontier) and len(alive):
+            chunk = strongest[tried:tried + step]
+            dominated = (frontier[chunk][None] <= candidates[alive][:, None]).all(axis=-1)
+            hit = dominated.any(axis=1)
+            np.add.at(kills, chunk[dominated[hit].argmax(axis=1)], 1)
+            alive = alive[~hit]
+            tried += step
+            step = min(2 * step, max(8, block * block // max(len(alive), 1)))
+
+        # Then among the survivors of this block
+        rest = candidates[alive]
+        dominated = (rest[None] <= rest[:, None]).all(axis=-1)
+        np.fill_diagonal(dominated, False)
+        alive = alive[~dominated.any(axis=1)]
+
+        frontier = np.concatenate([frontier, candidates[alive]])
+        kills = np.concatenate([kills, np.zeros(len(alive), dtype=np.int64)])
+        kept.append(start + alive)
+    return source[np.concatenate(kept)]
+
+
+def _limits(soap_type, within):
+    ranges = get_quality_ranges(soap_type)
+    if within == 'range':
+        return (np.array([ranges[q]['min'] for q in QUALITIES]), np.array([ranges[q]['max'] for q in QUALITIES]))
+    if within == 'ideal':
+        return (np.array([ranges[q]['ideal']['min'] for q in QUALITIES]),
+                np.array([ranges[q]['ideal']['max'] for q in QUALITIES]))
+    if within is None:
+        return None
+    raise ValueError(f"within must be one of {WITHIN}")
+
+
+def _signs(senses):
+    senses = dict(SENSES, **(senses or {}))
+    unknown = set(senses) - set(QUALITIES)
+    if unknown or any(sense not in ('min', 'max') for sense in senses.values()):
+        raise ValueError(f"senses map qualities to 'min' or 'max', got {senses}")
+    return np.array([1 if senses[q] == 'min' else -1 for q in QUALITIES], dtype=np.float64)
+
+
+class ParetoFrontier:
+    """Non-dominated recipes of one pool, soap type and step
+
+    recipes holds catalog rows and percentages, qualities the rounded
+    (recipes x QUALITIES) values and cost the price per unit weight of
+    oils (None without prices). Recipes are ordered by the optimizer's fit
+    penalty, closest to the ideal ranges first.
+    """
+
+    def __init__(self, catalog, recipes, qualities, cost=None, soap_type='hard'):
+        self.catalog = catalog
+        self.recipes = recipes
+        self.qualities = np.asarray(qualities, dtype=np.int32)
+        self.cost = None if cost is None else np.asarray(cost, dtype=np.float64)
+        self.soap_type = soap_type
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def recipe(self, i):
+        """One frontier recipe as {'percentages', 'qualities', 'cost'}"""
+        result = {
+            'percentages': {k: round(p, 10) for k, p in self.recipes[i].as_dict(self.catalog).items()},
+            'qualities': dict(zip(QUALITIES, self.qualities[i].tolist())),
+        }
+        if self.cost is not None:
+            result['cost'] = round(float(self.cost[i]), 6)
+        return result
+
+    def select(self, limits=None, sort_by=None, descending=False, limit=None):
+        """Positions of frontier recipes within limits, optionally sorted
+
+        limits maps qualities (or 'cost') to (min, max), either side None;
+        sort_by is a quality or 'cost'. Works on the cached arrays only,
+        so it answers UI filters without another search.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        for name, (low, high) in (limits or {}).items():
+            values = self._column(name)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+        positions = np.flatnonzero(keep)
+        if sort_by is not None:
+            values = self._column(sort_by)[positions]
+            positions = positions[np.argsort(-values if descending else values, kind='stable')]
+        return positions[:limit] if limit is not None else positions
+
+    def records(self, positions=None):
+        positions = range(len(self)) if positions is None else positions
+        return [self.recipe(int(i)) for i in positions]
+
+    def _column(self, name):
+        if name == 'cost':
+            if self.cost is None:
+                raise ValueError("Frontier was built without prices")
+            return self.cost
+        if name not in QUALITIES:
+            raise ValueError(f"Unknown quality: {name}")
+        return self.qualities[:, QUALITIES.index(name)]
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f, ids=np.array([self.catalog.ids[r] for r in np.unique(self.recipes.rows)]),
+                rows=self.recipes.rows, percentages=self.recipes.percentages, qualities=self.qualities,
+                cost=np.zeros(0) if self.cost is None else self.cost, has_cost=self.cost is not None,
+                soap_type=self.soap_type,
+            )
+
+    @classmethod
+    def load(cls, path, catalog):
+        """A saved frontier; its rows must still point at the same oils in catalog"""
+        with np.load(path) as data:
+            ids = [str(oil_id) for oil_id in data['ids']]
+            rows = data['rows']
+            if [catalog.ids[r] for r in np.unique(rows)] != ids:
+                raise ValueError(f"Frontier {path} was built from a different catalog")
+            return cls(catalog, RecipeBatch(rows, data['percentages']), data['qualities'],
+                       data['cost'] if bool(data['has_cost']) else None, str(data['soap_type']))
+
+
+def _candidate_batches(pool_size, max_oils, units, batch=BATCH_CANDIDATES):
+    """(pool positions (subsets x j), compositions (c x j)) covering every recipe of 1 to max_oils oils"""
+    for parts in range(1, min(max_oils, pool_size, units) + 1):
+        splits = compositions(units, parts)
+        subsets = combinations(range(pool_size), parts)
+        per_batch = max(1, batch // len(splits))
+        while True:
+            chunk = np.array(list(islice(subsets, per_batch)), dtype=np.int32).reshape(-1, parts)
+            if not len(chunk):
+                break
+            yield chunk, splits
+
+
+def _batch_qualities(catalog, rows, subsets, shares_pct, cells=DENSE_CELLS):
+    """(subsets * compositions x QUALITIES) qualities through engine.weighted_properties
+
+    Each candidate is a full catalog row, so it is summed and rounded
+    exactly as evaluate() rounds the same recipe (a pool-sized product can
+    land 79.49999 where evaluate has 79.5).
+    """
+    width = len(catalog)
+    splits = len(shares_pct)
+    qualities = np.empty((len(subsets) * splits, len(QUALITIES)))
+    per_block = max(1, cells // (splits * width))
+    for start in range(0, len(subsets), per_block):
+        block = subsets[start:start + per_block]
+        dense = np.zeros((len(block), splits, width))
+        dense[np.arange(len(block))[:, None, None], np.arange(splits)[None, :, None], rows[block][:, None, :]] = \
+            shares_pct
+        properties = weighted_properties(catalog, dense.reshape(-1, width))
+        qualities[start * splits:(start + len(block)) * splits] = soap_qualities(properties)
+    return qualities
+
+
+def pareto_frontier(catalog, oil_ids, soap_type='hard', max_oils=3, step=5, prices=None,
+                    within='range', senses=None):
+    """Frontier of every mix of up to max_oils of oil_ids in step% increments
+
+    prices maps every pool oil id to a price per unit weight and adds cost
+    (minimized) as an eighth objective. within drops candidates outside
+    the soap type's quality ranges before the skyline; senses overrides
+    SENSES per quality.
+    """
+    units = round(100 / step)
+    if units * step != 100:
+        raise ValueError("Percentage step must divide 100")
+    oil_ids = list(dict.fromkeys(oil_ids))
+    if not oil_ids:
+        raise ValueError("Select at least one oil")
+    if max_oils < 1:
+        raise ValueError("max_oils must be at least 1")
+    pool = catalog.indices(oil_ids)
+    limits = _limits(soap_type, within)
+    signs = _signs(senses)
+    pool_prices = None
+    if prices is not None:
+        missing = [oil_id for oil_id in oil_ids if oil_id not in prices]
+        if missing:
+            raise ValueError(f"No price for {missing[0]}")
+        pool_prices = np.array([float(prices[oil_id]) for oil_id in oil_ids])
+
+    k = min(max_oils, len(pool), units)
+    rows = np.empty((0, k), dtype=np.int32)
+    shares = np.empty((0, k), dtype=np.int16)
+    objectives = np.empty((0, len(QUALITIES) + (pool_prices is not None)))
+    pending = []
+
+    def merge():
+        nonlocal rows, shares, objectives
+        rows = np.concatenate([rows] + [p[0] for p in pending])
+        shares = np.concatenate([shares] + [p[1] for p in pending])
+        objectives = np.concatenate([objectives] + [p[2] for p in pending])
+        pending.clear()
+        keep = np.sort(skyline(objectives))
+        rows, shares, objectives = rows[keep], shares[keep], objectives[keep]
+
+    waiting = 0
+    for subsets, splits in _candidate_batches(len(pool), max_oils, units):
+        shares_pct = (splits * step).astype(np.float64)
+        qualities = _batch_qualities(catalog, pool, subsets, shares_pct)
+        keep = np.arange(len(qualities)) if limits is None else np.flatnonzero(
+            ((qualities >= limits[0]) & (qualities <= limits[1])).all(axis=1))
+        if not len(keep):
+            continue
+        subset, split = np.divmod(keep, len(splits))
+        objective = qualities[keep] * signs
+        if pool_prices is not None:
+            cost = np.einsum('cj,sj->sc', shares_pct / 100, pool_prices[subsets]).reshape(-1)[keep]
+            objective = np.column_stack([objective, cost])
+
+        parts = subsets.shape[1]
+        batch_rows = np.zeros((len(keep), k), dtype=np.int32)
+        batch_rows[:, :parts] = subsets[subset]
+        batch_shares = np.zeros((len(keep), k), dtype=np.int16)
+        batch_shares[:, :parts] = splits[split]
+        pending.append((batch_rows, batch_shares, objective))
+        waiting += len(keep)
+        if waiting >= MERGE_CANDIDATES:
+            merge()
+            waiting = 0
+    if pending:
+        merge()
+
+    qualities = np.rint(objectives[:, :len(QUALITIES)] * signs).astype(np.int32)
+    percentages = shares * step
+    dense = np.zeros((len(rows), len(catalog)))
+    np.add.at(dense, (np.arange(len(rows))[:, None], pool[rows]), percentages)
+    unrounded = quality_values(weighted_properties(catalog, dense))
+    order = np.argsort(fit_penalty(unrounded, get_quality_ranges(soap_type)), kind='stable')
+    cost = objectives[order, len(QUALITIES)] if pool_prices is not None else None
+    recipes = RecipeBatch(pool[rows[order]], percentages[order].astype(np.float64))
+    return ParetoFrontier(catalog, recipes, qualities[order], cost, soap_type)
+
+
+def _pool_key(catalog, oil_ids, *settings):
+    """Digest of the settings plus the pool oils' ids and catalog rows, so edited oils miss"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(settings).encode('utf-8'))
+    oil_ids = sorted(set(oil_ids))
+    for oil_id, row in zip(oil_ids, catalog.indices(oil_ids)):
+        digest.update(oil_id.encode('utf-8') + b'\x1f')
+        digest.update(np.ascontiguousarray(catalog.matrix[row]).tobytes())
+    return digest.hexdigest()
+
+
+class FrontierCache:
+    """Frontiers by pool and settings, in memory and optionally on disk
+
+    Frontiers do not expire; invalidate_oil() drops those whose pool uses
+    an edited oil. Cached frontiers are shared, not copied, so their arrays
+    are made read-only. With a directory each frontier is also saved as
+    <key>.npz, so other processes and restarts skip the search.
+    """
+
+    def __init__(self, catalog, cache=None, directory=None):
+        self.catalog = catalog
+        self.cache = cache if cache is not None else LRUCache(DEFAULT_CACHE_ENTRIES, ttl=float('inf'), copy=None)
+        self.directory = directory
+
+    def get(self, oil_ids, soap_type='hard', max_oils=3, step=5, prices=None, within='range', senses=None):
+        oil_ids = sorted(set(oil_ids))
+        price_list = None if prices is None else tuple(float(prices[oil_id]) for oil_id in oil_ids if oil_id in prices)
+        key = _pool_key(self.catalog, oil_ids, soap_type, max_oils, float(step), price_list, within,
+                        tuple(sorted((senses or {}).items())))
+
+        def compute():
+            path = os.path.join(self.directory, f"{key}.npz") if self.directory else None
+            frontier = None
+            if path and os.path.exists(path):
+                try:
+                    frontier = ParetoFrontier.load(path, self.catalog)
+                except (OSError, ValueError, KeyError):
+                    pass
+            if frontier is None:
+                frontier = pareto_frontier(self.catalog, oil_ids, soap_type, max_oils, step, prices, within, senses)
+                if path:
+                    os.makedirs(self.directory, exist_ok=True)
+                    frontier.save(path)
+            for array in (frontier.recipes.rows, frontier.recipes.percentages, frontier.qualities, frontier.cost):
+                if array is not None:
+                    array.flags.writeable = False
+            return frontier
+
+        return self.cache.get_or_compute(key, oil_ids, compute)
+
+    def invalidate_oil(self, oil_id):
+        return self.cache.invalidate_oil(oil_id)
+
+    def set_catalog(self, catalog, oil_id):
+        """Switch to a catalog with oil_id edited, added or removed
+
+        Frontiers that used oil_id are dropped; if rows moved, every
+        frontier is, since they hold catalog rows.
+        """
+        moved = catalog.ids[:len(self.catalog)] != self.catalog.ids
+        self.catalog = catalog
+        if moved:
+            dropped = len(self.cache)
+            self.cache.clear()
+            return dropped
+        return self.invalidate_oil(oil_id)
@@ -0,0 +1,223 @@
+"""
+Production batch planning
+Scales many recipes to a schedule of batch weights, units and lye types in
+one vectorized pass and totals what the schedule needs of every oil, lye
+and water
+"""
+
+import csv
+import json
+
+import numpy as np
+
+from .batch import parse_recipe
+from .engine import js_round, water_weights
+
+# Exact avoirdupois definitions; convertWeight uses the rounded 28.3495 and 453.592
+GRAMS_PER_UNIT = {'g': 1.0, 'oz': 28.349523125, 'lb': 453.59237}
+UNITS = tuple(GRAMS_PER_UNIT)
+
+# Schedule columns; only recipe and batch_weight are required
+SCHEDULE_FIELDS = ('recipe', 'batch_weight', 'unit', 'lye_type', 'batches')
+
+
+def convert_weight(weight, from_unit, to_unit):
+    """Weights (scalar or array) in from_unit converted to to_unit, unrounded"""
+    for unit in (from_unit, to_unit):
+        if unit not in GRAMS_PER_UNIT:
+            raise ValueError(f"Unknown unit: {unit}")
+    if from_unit == to_unit:
+        return weight
+    return np.asarray(weight, dtype=np.float64) * (GRAMS_PER_UNIT[from_unit] / GRAMS_PER_UNIT[to_unit])
+
+
+def read_schedule(lines, csv_format=None):
+    """Schedule entries from CSV (with a header naming SCHEDULE_FIELDS) or JSONL lines
+
+    csv_format None guesses from the first non-blank line.
+    """
+    lines = iter(lines)
+    first = next((line for line in lines if line.strip()), None)
+    if first is None:
+        return []
+    if csv_format is None:
+        csv_format = not first.lstrip().startswith('{')
+    if csv_format:
+        reader = csv.DictReader([first], skipinitialspace=True)
+        header = reader.fieldnames
+        if 'recipe' not in header or 'batch_weight' not in header:
+            raise ValueError("Schedule CSV needs recipe and batch_weight columns")
+        rows = csv.DictReader((line for line in lines if line.strip()), fieldnames=header, skipinitialspace=True)
+        return [{k: v for k, v in row.items() if v not in (None, '')} for row in rows]
+    entries = []
+    for line_number, line in enumerate([first, *lines], 1):
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Schedule line {line_number}: invalid JSON: {e}") from None
+    return entries
+
+
+class ProductionPlan:
+    """Per-line weights for a schedule, each in its line's unit, and total demand in grams
+
+    rows and oil_weights are (lines x k) arrays padded with row 0 at 0, as in
+    records.RecipeBatch.
+    """
+
+    def __init__(self, catalog, recipe_ids, units, lye_types, batches, batch_weights, rows, oil_weights,
+                 lye_weights, water_weights, fragrance_weights):
+        self.catalog = catalog
+        self.recipe_ids = recipe_ids
+        self.units = units
+        self.lye_types = lye_types
+        self.batches = batches
+        self.batch_weights = batch_weights
+        self.rows = rows
+        self.oil_weights = oil_weights
+        self.lye_weights = lye_weights
+        self.water_weights = water_weights
+        self.fragrance_weights = fragrance_weights
+        self.total_batch_weights = js_round(batch_weights + lye_weights + water_weights + fragrance_weights, 2)
+
+        grams = np.array([GRAMS_PER_UNIT[u] for u in UNITS])[units] * batches
+        self.oil_demand = np.bincount(rows.ravel(), (oil_weights * grams[:, None]).ravel(), len(catalog))
+        is_koh = lye_types == 'KOH'
+        self.lye_demand = {
+            'NaOH': float(lye_weights[~is_koh] @ grams[~is_koh]),
+            'KOH': float(lye_weights[is_koh] @ grams[is_koh]),
+        }
+        self.water_demand = float(water_weights @ grams)
+        self.fragrance_demand = float(fragrance_weights @ grams)
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def line(self, i):
+        """Line i as the calculator would show it, in the line's unit"""
+        used = self.oil_weights[i] != 0
+        return {
+            'recipe': self.recipe_ids[i],
+            'batch_weight': float(self.batch_weights[i]),
+            'unit': UNITS[self.units[i]],
+            'lye_type': str(self.lye_types[i]),
+            'batches': int(self.batches[i]),
+            'oils': {self.catalog.ids[row]: w for row, w in
+                     zip(self.rows[i][used].tolist(), self.oil_weights[i][used].tolist())},
+            'lye_weight': float(self.lye_weights[i]),
+            'water_weight': float(self.water_weights[i]),
+            'fragrance_weight': float(self.fragrance_weights[i]),
+            'total_batch_weight': float(self.total_batch_weights[i]),
+        }
+
+    def lines(self):
+        return (self.line(i) for i in range(len(self)))
+
+    def totals(self, unit='g', digits=2):
+        """Schedule demand in unit: {'oils': {oil_id: weight}, 'lye': {...}, 'water': ..., 'fragrance': ...}"""
+        def convert(grams):
+            return round(float(convert_weight(grams, 'g', unit)), digits)
+
+        used = np.flatnonzero(self.oil_demand)
+        order = used[np.argsort(-self.oil_demand[used], kind='stable')]
+        return {
+            'unit': unit,
+            'lines': len(self),
+            'batches': int(self.batches.sum()),
+            'oils': {self.catalog.ids[row]: convert(self.oil_demand[row]) for row in order},
+            'lye': {lye_type: convert(grams) for lye_type, grams in self.lye_demand.items() if grams},
+            'water': convert(self.water_demand),
+            'fragrance': convert(self.fragrance_demand),
+        }
+
+
+def plan_production(catalog, recipes, schedule, derived_sap=False):
+    """ProductionPlan for schedule entries against {recipe_id: recipe}
+
+    Each entry names a recipe and its batch_weight (total oil weight, as
+    RecipeInputs.totalOilWeight), with optional unit (default g), lye_type
+    (default the recipe's) and batches (default 1). Oil, lye and water
+    weights follow calculateOilWeights, calculateLyeWeight and
+    calculateWaterWeight in the line's own unit; the recipe's fragrance
+    weight is scaled with its oils. Raises ValueError naming the first bad
+    entry.
+    """
+    recipe_index, parsed = {}, []
+    for recipe_id, recipe in recipes.items():
+        try:
+            percentages, inputs = parse_recipe(recipe)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Recipe {recipe_id}: {e.args[0] if e.args else e}") from None
+        unknown = [oil_id for oil_id in percentages if oil_id not in catalog]
+        if unknown:
+            raise ValueError(f"Recipe {recipe_id}: unknown oil id: {unknown[0]}")
+        recipe_index[recipe_id] = len(parsed)
+        parsed.append((catalog.indices(list(percentages)), list(percentages.values()), inputs))
+
+    k = max((len(rows) for rows, _, _ in parsed), default=0)
+    recipe_rows = np.zeros((len(parsed), k), dtype=np.intp)
+    recipe_percentages = np.zeros((len(parsed), k))
+    for i, (rows, percentages, _) in enumerate(parsed):
+        recipe_rows[i, :len(rows)] = rows
+        recipe_percentages[i, :len(rows)] = percentages
+    inputs = [p[2] for p in parsed]
+    superfat = np.array([i['superfat'] for i in inputs])
+    water_method = np.array([i['water_method'] for i in inputs])
+    water_value = np.array([i['water_value'] for i in inputs])
+    fragrance_ratio = np.array([i['fragrance_weight'] / i['total_oil_weight'] if i['total_oil_weight'] else 0.0
+                                for i in inputs])
+    recipe_lye = [i['lye_type'] for i in inputs]
+
+    n = len(schedule)
+    which = np.empty(n, dtype=np.intp)
+    units = np.empty(n, dtype=np.intp)
+    batches = np.empty(n, dtype=np.int64)
+    batch_weights = np.empty(n)
+    lye_types = []
+    unit_index = {unit: i for i, unit in enumerate(UNITS)}
+    for line, entry in enumerate(schedule):
+        missing = [field for field in ('recipe', 'batch_weight') if field not in entry]
+        if missing:
+            raise ValueError(f"Schedule entry {line + 1}: missing {missing[0]}")
+        if str(entry['recipe']) not in recipe_index:
+            raise ValueError(f"Schedule entry {line + 1}: unknown recipe: {entry['recipe']}")
+        if entry.get('unit', 'g') not in unit_index:
+            raise ValueError(f"Schedule entry {line + 1}: unknown unit: {entry['unit']}")
+        which[line] = recipe_index[str(entry['recipe'])]
+        units[line] = unit_index[entry.get('unit', 'g')]
+        try:
+            count = float(entry.get('batches', 1))
+            batch_weights[line] = float(entry['batch_weight'])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Schedule entry {line + 1}: {e}") from None
+        if not count.is_integer():
+            raise ValueError(f"Schedule entry {line + 1}: batches must be a whole number, got {entry['batches']}")
+        if not np.isfinite(batch_weights[line]):
+            raise ValueError(f"Schedule entry {line + 1}: batch weight must be finite, got {entry['batch_weight']}")
+        batches[line] = int(count)
+        lye_type = entry.get('lye_type') or recipe_lye[which[line]]
+        if lye_type not in ('NaOH', 'KOH'):
+            raise ValueError(f"Schedule entry {line + 1}: unknown lye type: {lye_type}")
+        if batch_weights[line] < 0 or batches[line] < 0:
+            raise ValueError(f"Schedule entry {line + 1}: batch weight and batches must not be negative")
+        lye_types.append(lye_type)
+    lye_types = np.array(lye_types, dtype='<U4')
+
+    rows = recipe_rows[which]
+    oil_weights = js_round(batch_weights[:, None] * recipe_percentages[which] / 100, 2)
+
+    # Summed oil by oil in recipe order, as calculateLyeWeight does
+    sap = np.where((lye_types == 'KOH')[:, None],
+                   catalog.sap_column('KOH', derived_sap)[rows],
+                   catalog.sap_column('NaOH', derived_sap)[rows])
+    before_superfat = np.zeros(n)
+    for j in range(k):
+        before_superfat += oil_weights[:, j] * sap[:, j]
+    lye = js_round(before_superfat * (1 - superfat[which] / 100), 2)
+    water = water_weights(batch_weights, lye, water_method[which], water_value[which])
+    fragrance = js_round(batch_weights * fragrance_ratio[which], 2)
+
+    return ProductionPlan(catalog, [str(entry['recipe']) for entry in schedule], units, lye_types, batches,
+                          batch_weights, rows, oil_weights, lye, water, fragrance)
@@ -0,0 +1,207 @@
+"""
+Runtime profiling hooks
+Per-stage timing histograms, call counters and optional tracemalloc
+allocation tracking for the engine's hot paths, exported as JSON or
+Prometheus text. Disabled by default, when a hook costs one flag check.
+"""
+
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import json
+import os
+import time
+import tracemalloc
+
+# Histogram upper bounds in seconds, 1 µs to 10 s
+BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Set SOAPCALC_PROFILE=1 (or =alloc to also track allocations) to enable at import
+ENV_VAR = 'SOAPCALC_PROFILE'
+
+_enabled = False
+_track_allocations = False
+_stages = {}    # stage name -> _Histogram
+_counters = {}  # counter name -> count
+_NULL = nullcontext()
+
+
+class _Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets', 'allocated')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.allocated = 0
+
+    def observe(self, seconds, allocated=0):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.allocated += allocated
+
+
+def enable(track_allocations=False):
+    """Start recording; track_allocations also starts tracemalloc, which slows everything down"""
+    global _enabled, _track_allocations
+    _enabled = True
+    _track_allocations = track_allocations
+    if track_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording, keeping what was recorded so far"""
+    global _enabled, _track_allocations
+    _enabled = False
+    if _track_allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _track_allocations = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _stages.clear()
+    _counters.clear()
+
+
+def record(name, seconds, allocated=0):
+    """Add one observation of a stage"""
+    histogram = _stages.get(name)
+    if histogram is None:
+        histogram = _stages[name] = _Histogram()
+    histogram.observe(seconds, allocated)
+
+
+def count(name, n=1):
+    """Add n to a counter, when enabled"""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def _timed_stage(name):
+    allocated = tracemalloc.get_traced_memory()[0] if _track_allocations else 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if _track_allocations:
+            allocated = tracemalloc.get_traced_memory()[0] - allocated
+        record(name, seconds, allocated)
+
+
+def stage(name):
+    """Context manager timing a block as one observation of stage name"""
+    return _timed_stage(name) if _enabled else _NULL
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage name
+
+    Stages nest, so a stage's time includes any stages it calls.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _timed_stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def top_allocations(limit=10):
+    """Largest allocation sites from a tracemalloc snapshot, as (file:line, bytes, blocks)"""
+    if not tracemalloc.is_tracing():
+        return []
+    stats = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+    return [(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size, stat.count) for stat in stats]
+
+
+def snapshot():
+    """Everything recorded so far as a JSON-ready dict"""
+    stages = {}
+    for name, h in sorted(_stages.items()):
+        stages[name] = {
+            'count': h.count,
+            'total_seconds': h.total,
+            'mean_seconds': h.total / h.count,
+            'min_seconds': h.min,
+            'max_seconds': h.max,
+            'buckets': {str(bound): n for bound, n in zip(BUCKETS + ('+Inf',), h.buckets)},
+        }
+        if _track_allocations or h.allocated:
+            stages[name]['allocated_bytes'] = h.allocated
+    report = {'stages': stages, 'counters': dict(sorted(_counters.items()))}
+    if tracemalloc.is_tracing():
+        report['top_allocations'] = [
+            {'site': site, 'bytes': size, 'blocks': blocks} for site, size, blocks in top_allocations()
+        ]
+    return report
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(prefix='soapcalc'):
+    """Prometheus text exposition format: a seconds histogram per stage plus counters"""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent in each engine stage",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for name, h in sorted(_stages.items()):
+        label = _label(name)
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ('+Inf',), h.buckets):
+            cumulative += n
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {h.total!r}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {h.count}')
+
+    if any(h.allocated for h in _stages.values()):
+        lines.append(f"# HELP {prefix}_stage_allocated_bytes Net bytes allocated in each engine stage")
+        lines.append(f"# TYPE {prefix}_stage_allocated_bytes gauge")
+        for name, h in sorted(_stages.items()):
+            lines.append(f'{prefix}_stage_allocated_bytes{{stage="{_label(name)}"}} {h.allocated}')
+
+    if _counters:
+        lines.append(f"# HELP {prefix}_events_total Engine event counters")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, n in sorted(_counters.items()):
+            lines.append(f'{prefix}_events_total{{name="{_label(name)}"}} {n}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_reports(path_prefix):
+    """Write <path_prefix>.json and <path_prefix>.prom"""
+    with open(f"{path_prefix}.json", 'w', encoding='utf-8') as f:
+        f.write(to_json() + '\n')
+    with open(f"{path_prefix}.prom", 'w', encoding='utf-8') as f:
+        f.write(to_prometheus())
+
+
+if os.environ.get(ENV_VAR, '0') not in ('', '0'):
+    enable(track_allocations=os.environ[ENV_VAR] == 'alloc')
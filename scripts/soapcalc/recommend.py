@@ -0,0 +1,823 @@
+"""
+Recommendation engine over the oil matrix
+Port of lib/recommendations.ts that scores every candidate oil in one
+vectorized pass and only builds RecommendationDetail for the top K
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .catalog import FATTY_ACIDS, FATTY_ACID_COLUMNS, INS, IODINE
+from .engine import QUALITIES, get_quality_ranges, js_round
+from .profiling import count, timed
+
+# Qualities calculateCompatibilityScore and calculateQualityProjections look at
+SCORED_QUALITIES = QUALITIES[:5]
+
+# identifyRecipeNeeds, one need per scored quality
+RECIPE_NEEDS = ('hardness', 'cleansing', 'conditioning', 'bubbly_lather', 'creamy_lather')
+
+# improvesQuality prefixes, indexed by CandidateScores.improvements codes
+IMPROVEMENTS = (None, 'increases', 'decreases', 'optimizes')
+
+_ACID = {acid: i for i, acid in enumerate(FATTY_ACIDS)}
+
+RecommendationContext = namedtuple('RecommendationContext', [
+    'indices',           # catalog rows of the current oils
+    'percentages',       # their percentages
+    'total_percentage',  # currentPercentage
+    'fatty_acids',       # currentFattyAcids
+    'qualities',         # currentQualities, rounded like calculateRecipe
+])
+
+CandidateScores = namedtuple('CandidateScores', [
+    'candidates',    # bool mask of oils that are not already selected
+    'scores',        # compatibility score per oil
+    'suggested',     # calculateSuggestedPercentage per oil
+    'improvements',  # (oils x SCORED_QUALITIES) IMPROVEMENTS codes
+    'fills',         # fillsNeeds per oil as (oils x needs) bool, needs in fill_names order
+    'fill_names',
+    'complements',   # complementsFattyAcids per oil
+])
+
+
+def _js_number(value):
+    """Template-literal formatting: 20.0 -> '20', 37.5 -> '37.5'"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _to_fixed0(value):
+    """Number.prototype.toFixed(0) for non-negative values"""
+    return str(int(js_round(value)))
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, highest first
+
+    Uses a partial sort, then breaks ties by index so the order matches a
+    stable descending sort of the whole array (Array.prototype.sort).
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    chosen = np.sort(np.concatenate([above, ties]))
+    return chosen[np.argsort(-scores[chosen], kind='stable')]
+
+
+class Recommender:
+    """Recommendation engine bound to one catalog
+
+    Everything that depends only on the oils (need masks, category flags,
+    alternative pools) is computed once here, so a request only pays for
+    the context-dependent matrix math. Pass a SimilarityIndex covering the
+    catalog's oils to turn similarity checks into table lookups.
+    """
+
+    def __init__(self, catalog, similarity_index=None):
+        self.catalog = catalog
+        self.similarity_index = similarity_index
+        self.similarity_rows = similarity_index.rows(catalog.ids) if similarity_index is not None else None
+        self.properties = catalog.matrix.astype(np.float64)
+        self.fatty_acids = self.properties[:, FATTY_ACID_COLUMNS]
+
+        fa = {acid: self.fatty_acids[:, i] for acid, i in _ACID.items()}
+        categories = np.array(catalog.categories, dtype=object)
+        ids = np.array(catalog.ids, dtype=object)
+
+        self.is_hard_oil = categories == 'Hard Oil'
+        self.is_butter = categories == 'Butter'
+        self.is_castor = ids == 'castor-oil'
+        self.is_olive_base = (categories == 'Soft Oil') & (ids == 'olive-oil')
+
+        # oilFulfillsNeed, per soap type
+        hardening = (fa['palmitic'] > 20) | (fa['stearic'] > 20) | self.is_hard_oil | self.is_butter
+        fulfils = {
+            'hardness': hardening,
+            'cleansing': (fa['lauric'] > 30) | (fa['myristic'] > 10),
+            'conditioning': (fa['oleic'] > 40) | (fa['linoleic'] > 30) | (fa['ricinoleic'] > 50),
+            'bubbly_lather': (fa['lauric'] > 30) | (fa['ricinoleic'] > 50) | self.is_castor,
+            'creamy_lather': (fa['palmitic'] > 20) | (fa['stearic'] > 20) | (fa['ricinoleic'] > 50),
+        }
+        self.need_masks = {
+            'hard': fulfils,
+            'liquid': dict(fulfils, hardness=np.zeros(len(catalog), dtype=bool)),
+        }
+
+        # findBetterAlternatives pools, before excluding selected oils
+        self.liquid_alternatives = (fa['oleic'] > 60) & (fa['palmitic'] + fa['stearic'] < 20)
+        self.hard_alternatives = (fa['palmitic'] > 25) | (fa['stearic'] > 20)
+
+    @timed('recommend.profile')
+    def context(self, current_oils):
+        """RecommendationContext from {oil_id: percentage} or (oil_id, percentage) pairs"""
+        current = dict(current_oils)
+        indices = self.catalog.indices(list(current))
+        percentages = np.array(list(current.values()), dtype=np.float64)
+        terms = [(self.properties[i], p) for i, p in zip(indices, percentages)]
+        fatty_acids, iodine, ins = _js_weighted_properties(terms, normalize=False)
+        return RecommendationContext(
+            indices=indices,
+            percentages=percentages,
+            total_percentage=float(_sequential_sum(percentages)),
+            fatty_acids=np.asarray(fatty_acids),
+            qualities=_js_qualities(fatty_acids, iodine, ins),
+        )
+
+    def needs(self, context, soap_type='hard'):
+        """identifyRecipeNeeds"""
+        ranges = get_quality_ranges(soap_type)
+        return [need for need, quality, value in zip(RECIPE_NEEDS, SCORED_QUALITIES, context.qualities)
+                if value < ranges[quality]['min']]
+
+    def similarity(self, rows, others):
+        """calculateOilSimilarity between each of rows and each of others, as a (rows x others) array"""
+        rows = np.atleast_1d(rows)
+        others = np.atleast_1d(others)
+        if self.similarity_index is not None:
+            return self.similarity_index.similarity(self.similarity_rows[rows], self.similarity_rows[others])
+        a = self.fatty_acids[rows][:, None, :]
+        b = self.fatty_acids[others][None, :, :]
+        total_difference = 0
+        for acid in range(len(FATTY_ACIDS)):
+            total_difference = total_difference + np.abs(a[..., acid] - b[..., acid])
+        similarity = np.maximum(0, 1 - (total_difference / len(FATTY_ACIDS)) / 100)
+        similarity[rows[:, None] == others[None, :]] = 1
+        return similarity
+
+    @timed('recommend.qualities')
+    def project(self, context, rows, percentages):
+        """Rounded qualities after adding each of rows at its percentage and renormalizing
+
+        The candidate dimension is vectorized; the current oils are folded in
+        one at a time so the float rounding matches the TS simulation exactly.
+        """
+        terms = [(self.properties[i], p) for i, p in zip(context.indices, context.percentages)]
+        terms.append((self.properties[rows], np.asarray(percentages, dtype=np.float64)))
+        return _js_qualities(*_js_weighted_properties(terms, normalize=True))
+
+    @timed('recommend.qualities')
+    def project_many(self, contexts, rows, percentages):
+        """project() for many recipes: (recipes x rows x QUALITIES), percentages one row per recipe
+
+        Shorter recipes are padded with 0% terms, which add exact zeros, so
+        every recipe rounds as it would on its own.
+        """
+        k = max(len(context.indices) for context in contexts)
+        indices = np.zeros((len(contexts), k), dtype=np.intp)
+        current = np.zeros((len(contexts), k))
+        for r, context in enumerate(contexts):
+            indices[r, :len(context.indices)] = context.indices
+            current[r, :len(context.indices)] = context.percentages
+        terms = [(self.properties[indices[:, j]][:, None, :], current[:, j, None]) for j in range(k)]
+        terms.append((self.properties[rows], np.asarray(percentages, dtype=np.float64)))
+        return _js_qualities(*_js_weighted_properties(terms, normalize=True))
+
+    def suggested_percentages(self, context, soap_type='hard', needs=None):
+        """calculateSuggestedPercentage for every oil"""
+        remaining = 100 - context.total_percentage
+        n = len(self.catalog)
+        if remaining < 10:
+            return np.full(n, max(5.0, remaining))
+        if needs is None:
+            needs = self.needs(context, soap_type)
+
+        fa = self.fatty_acids
+        return np.select(
+            [
+                self.is_hard_oil & ('hardness' in needs),
+                (fa[:, _ACID['oleic']] > 50) & ('conditioning' in needs),
+                self.is_castor | (fa[:, _ACID['ricinoleic']] > 80),
+                (fa[:, _ACID['lauric']] > 40) & ('cleansing' in needs),
+            ],
+            [min(25, remaining), min(20, remaining), min(8, remaining), min(20, remaining)],
+            min(15, remaining),
+        )
+
+    def score(self, context, soap_type='hard'):
+        """calculateCompatibilityScore for every oil in the catalog at once"""
+        return self.score_many([context], soap_type)[0]
+
+    @timed('recommend.scoring')
+    def score_many(self, contexts, soap_type='hard'):
+        """score() for many recipes, their current oils stacked into one pass over the catalog"""
+        n = len(self.catalog)
+        count('recommend.candidates_scored', sum(n - len(context.indices) for context in contexts))
+        results = [None] * len(contexts)
+        for i, context in enumerate(contexts):
+            if len(context.indices) == 0:
+                fills = np.stack([self.is_hard_oil, self.is_olive_base], axis=1)
+                results[i] = CandidateScores(
+                    candidates=np.ones(n, dtype=bool),
+                    scores=50.0 + 20 * self.is_hard_oil + 25 * self.is_olive_base,
+                    suggested=np.full(n, 30.0),
+                    improvements=np.zeros((n, len(SCORED_QUALITIES)), dtype=np.int8),
+                    fills=fills,
+                    fill_names=('base_hard_oil', 'base_soft_oil'),
+                    complements=np.ones(n, dtype=bool),
+                )
+        stacked = [i for i, result in enumerate(results) if result is None]
+        if not stacked:
+            return results
+        selected = [contexts[i] for i in stacked]
+
+        ranges = get_quality_ranges(soap_type)
+        needs = [self.needs(context, soap_type) for context in selected]
+        current = np.array([context.qualities for context in selected])
+        scores = np.full((len(selected), n), 50.0)
+
+        # Simulate adding every oil at the same test percentage
+        totals = np.array([context.total_percentage for context in selected])
+        test_percentage = np.maximum(5, np.minimum(30, 100 - totals))
+        projected = self.project_many(selected, np.arange(n), np.repeat(test_percentage[:, None], n, axis=1))
+
+        improvements = np.zeros((len(selected), n, len(SCORED_QUALITIES)), dtype=np.int8)
+        for q, quality in enumerate(SCORED_QUALITIES):
+            now = current[:, q, None]
+            value = projected[..., q]
+            bounds = ranges[quality]
+            mid = (bounds['ideal']['min'] + bounds['ideal']['max']) / 2
+            improvements[..., q] = np.select(
+                [
+                    (now < bounds['min']) & (value > now),
+                    (now > bounds['max']) & (value < now),
+                    np.abs(value - mid) < np.abs(now - mid),
+                ],
+                [1, 2, 3],
+                0,
+            )
+        scores += np.select([improvements == 1, improvements == 2, improvements == 3], [15, 15, 5], 0).sum(axis=2)
+
+        current_fatty_acids = np.array([context.fatty_acids for context in selected])
+        complements = ((current_fatty_acids[:, None, :] < 10) & (self.fatty_acids > 20)).sum(axis=2) >= 2
+        scores += 10 * complements
+
+        need_masks = self.need_masks[soap_type]
+        fills = [np.stack([need_masks[need] for need in recipe_needs], axis=1) if recipe_needs
+                 else np.zeros((n, 0), dtype=bool) for recipe_needs in needs]
+        scores += 10 * np.array([recipe_fills.sum(axis=1) for recipe_fills in fills])
+
+        # One similarity pass against every selected oil, then each recipe's most similar
+        rows = np.unique(np.concatenate([context.indices for context in selected]))
+        similarity = self.similarity(np.arange(n), rows)
+        for r, context in enumerate(selected):
+            scores[r] -= 20 * similarity[:, np.searchsorted(rows, context.indices)].max(axis=1)
+        scores = np.clip(scores, 0, 100)
+
+        for r, (i, context) in enumerate(zip(stacked, selected)):
+            candidates = np.ones(n, dtype=bool)
+            candidates[context.indices] = False
+            results[i] = CandidateScores(
+                candidates=candidates,
+                scores=scores[r],
+                suggested=self.suggested_percentages(context, soap_type, needs[r]),
+                improvements=improvements[r],
+                fills=fills[r],
+                fill_names=tuple(needs[r]),
+                complements=complements[r],
+            )
+        return results
+
+    def _factors(self, scores, i):
+        improves = [f"{IMPROVEMENTS[code]}_{quality}"
+                    for quality, code in zip(SCORED_QUALITIES, scores.improvements[i]) if code]
+        fills = [name for name, filled in zip(scores.fill_names, scores.fills[i]) if filled]
+        return {
+            'complementsFattyAcids': bool(scores.complements[i]),
+            'improvesQuality': improves,
+            'fillsNeeds': fills,
+        }
+
+    def _reason(self, context, factors):
+        if len(context.indices) == 0:
+            return "Good starting oil for your recipe"
+        if factors['improvesQuality']:
+            return f"Improves {factors['improvesQuality'][0].replace('_', ' ', 1)}"
+        if factors['fillsNeeds']:
+            return f"Provides {factors['fillsNeeds'][0].replace('_', ' ', 1)}"
+        return "Complements your current selection"
+
+    def _predicted_impact(self, context, projected, soap_type):
+        """calculatePredictedImpact's improvementText from already projected qualities"""
+        if len(context.indices) == 0:
+            return "Great base for your soap recipe"
+
+        ranges = get_quality_ranges(soap_type)
+        improvements, changes = [], []
+        for quality, current, value in zip(QUALITIES, context.qualities, projected):
+            change = value - current
+            if abs(change) > 1:
+                changes.append((quality, change))
+                ideal = ranges[quality]['ideal']
+                current_distance = min(abs(current - ideal['min']), abs(current - ideal['max']))
+                projected_distance = min(abs(value - ideal['min']), abs(value - ideal['max']))
+                if projected_distance < current_distance:
+                    improvements.append(f"{quality} to {value}")
+
+        if improvements:
+            return f"This will bring {improvements[0]}"
+        if changes:
+            quality, change = changes[0]
+            return f"Will {'increase' if change > 0 else 'decrease'} {quality}"
+        return ""
+
+    @timed('recommend.detail')
+    def detail(self, context, i, score, suggested, projected, soap_type='hard'):
+        """generateRecommendationDetail for catalog row i
+
+        projected are the rounded qualities with this oil added at its
+        suggested percentage.
+        """
+        if score >= 70:
+            category, color = 'highly_recommended', 'green'
+        elif score >= 50:
+            category, color = 'good_match', 'blue'
+        elif score >= 30:
+            category, color = 'neutral', 'yellow'
+        elif score >= 25:
+            category, color = 'caution', 'orange'
+        else:
+            category, color = 'incompatible', 'red'
+
+        fa = dict(zip(FATTY_ACIDS, self.fatty_acids[i].tolist()))
+        needs = self.needs(context, soap_type)
+        contributions = _fatty_acid_contributions(fa, needs, soap_type)
+        projections = _quality_projections(context, projected, soap_type)
+        most_similar = self._most_similar(context, i)
+        comparative = self._comparative_analysis(context, fa, most_similar)
+        problems = self._problems(context, i, fa, projections, most_similar, soap_type)
+        alternatives = self._better_alternatives(context, i, problems, soap_type) if problems else None
+
+        detail = {
+            'score': float(score),
+            'scoreCategory': category,
+            'cardColor': color,
+            'fattyAcidContributions': contributions,
+            'qualityProjections': projections,
+            'comparativeAnalysis': comparative,
+        }
+        if problems:
+            detail['problems'] = problems
+        if alternatives is not None:
+            detail['betterAlternatives'] = alternatives
+        detail['displayCopy'] = self._display_copy(score, contributions, projections, problems,
+                                                   alternatives or [], suggested)
+        detail['suggestedPercentage'] = float(suggested)
+
+        usage_tip = None
+        if score >= 50:
+            if self.catalog.ids[i] == 'castor-oil':
+                usage_tip = "Keep under 10% - higher amounts make soap sticky"
+            elif fa['lauric'] > 40:
+                usage_tip = "15-25% range provides cleansing without being too drying"
+            elif self.is_hard_oil[i] or self.is_butter[i]:
+                usage_tip = "Use as base oil at 25-40% for bar structure"
+            elif fa['oleic'] > 60:
+                usage_tip = "Excellent as main conditioning oil up to 50%"
+        if usage_tip is not None:
+            detail['usageTip'] = usage_tip
+        return detail
+
+    def _most_similar(self, context, i):
+        """findMostSimilarOil as (catalog row, similarity), or None with no oils selected"""
+        if len(context.indices) == 0:
+            return None
+        similarity = self.similarity(i, context.indices)[0]
+        best = int(np.argmax(similarity))
+        return int(context.indices[best]), float(similarity[best])
+
+    def _comparative_analysis(self, context, fa, most_similar):
+        analysis = {}
+        if most_similar and most_similar[1] > 0.5:
+            analysis['similarTo'] = self.catalog.ids[most_similar[0]]
+            analysis['overlapPercentage'] = int(js_round(most_similar[1] * 100))
+
+        if len(context.indices) > 0:
+            current = self.fatty_acids[context.indices]
+            hardness = current[:, _ACID['palmitic']] + current[:, _ACID['stearic']]
+            average_hardness = _sequential_sum(hardness.tolist()) / len(hardness)
+            hardness = fa['palmitic'] + fa['stearic']
+            if hardness > average_hardness + 10:
+                analysis['advantageOver'] = {
+                    'oilId': 'current_average',
+                    'metric': 'hardness',
+                    'improvement': int(js_round(hardness - average_hardness)),
+                }
+        return analysis
+
+    def _problems(self, context, i, fa, projections, most_similar, soap_type):
+        """identifyIncompatibilityProblems"""
+        problems = []
+        ranges = get_quality_ranges(soap_type)
+
+        if soap_type == 'liquid':
+            saturated = fa['palmitic'] + fa['stearic']
+            if saturated > 30:
+                problems.append({
+                    'type': 'wrong_soap_type',
+                    'details': f"{_to_fixed0(saturated)}% palmitic + stearic will solidify in KOH liquid soap",
+                    'numericIssue': "Saturated fats crystallize in potassium hydroxide solutions",
+                    'visualResult': "Creates waxy chunks or thick paste requiring heat to remain fluid",
+                })
+
+        if soap_type == 'hard':
+            soft = fa['linoleic'] + fa['linolenic']
+            hardness = next((p for p in projections if p['quality'] == 'hardness'), None)
+            if hardness and hardness['projected'] < ranges['hardness']['min']:
+                problems.append({
+                    'type': 'wrong_soap_type',
+                    'details': f"Only {hardness['projected']} hardness contribution (need {ranges['hardness']['min']}+)",
+                    'numericIssue': f"{_to_fixed0(soft)}% linoleic + linolenic makes bars soft and slow-curing",
+                    'visualResult': "Bars stay soft, deform easily, short shelf life",
+                })
+
+        for projection in projections:
+            if projection['projected'] > projection['range']['max']:
+                problems.append({
+                    'type': 'pushes_out_of_range',
+                    'details': f"Would bring {projection['quality']} to {projection['projected']} (max: {projection['range']['max']})",
+                    'numericIssue': f"Exceeds acceptable range by {projection['projected'] - projection['range']['max']} points",
+                    'visualResult': _out_of_range_visual_result(projection['quality'], 'high'),
+                })
+            elif projection['projected'] < projection['range']['min']:
+                problems.append({
+                    'type': 'pushes_out_of_range',
+                    'details': f"Would bring {projection['quality']} to {projection['projected']} (min: {projection['range']['min']})",
+                    'numericIssue': f"Below acceptable range by {projection['range']['min'] - projection['projected']} points",
+                    'visualResult': _out_of_range_visual_result(projection['quality'], 'low'),
+                })
+
+        if fa['linolenic'] > 10:
+            problems.append({
+                'type': 'dos_risk',
+                'details': f"{_to_fixed0(fa['linolenic'])}% linolenic acid oxidizes rapidly",
+                'numericIssue': "Polyunsaturated fats develop rancidity (dreaded orange spots)",
+                'visualResult': "Orange spots appear within weeks to months",
+            })
+
+        if most_similar and most_similar[1] > 0.7:
+            dominant = _dominant_fatty_acid(fa)
+            problems.append({
+                'type': 'too_similar',
+                'details': f"Already have {self.catalog.names[most_similar[0]]} with "
+                           f"{int(js_round(most_similar[1] * 100))}% similar profile",
+                'numericIssue': f"Both high in {dominant} ({_to_fixed0(fa[dominant])}%)",
+                'visualResult': "Duplicates properties without adding variety to recipe balance",
+            })
+
+        return problems
+
+    @timed('recommend.alternatives')
+    def _better_alternatives(self, context, i, problems, soap_type):
+        """findBetterAlternatives with masks over the whole catalog instead of a scan per problem"""
+        available = np.ones(len(self.catalog), dtype=bool)
+        available[context.indices] = False
+        alternatives = []
+
+        for problem in problems:
+            if problem['type'] == 'wrong_soap_type' and soap_type == 'liquid':
+                for j in np.flatnonzero(available & self.liquid_alternatives)[:2]:
+                    alternatives.append({
+                        'oilId': self.catalog.ids[j],
+                        'whyBetter': f"{_to_fixed0(self.fatty_acids[j, _ACID['oleic']])}% oleic acid stays liquid in KOH soap",
+                        'specificAdvantage': "No crystallization or thickening issues",
+                    })
+
+            if problem['type'] == 'wrong_soap_type' and soap_type == 'hard':
+                for j in np.flatnonzero(available & self.hard_alternatives)[:2]:
+                    saturated = self.fatty_acids[j, _ACID['palmitic']] + self.fatty_acids[j, _ACID['stearic']]
+                    alternatives.append({
+                        'oilId': self.catalog.ids[j],
+                        'whyBetter': f"{_to_fixed0(saturated)}% palmitic + stearic for bar structure",
+                        'specificAdvantage': "Creates firm bars that unmold quickly and last longer",
+                    })
+
+            if problem['type'] == 'too_similar':
+                different = available & (self.similarity(i, np.arange(len(self.catalog)))[0] < 0.5)
+                dominant = _dominant_fatty_acid(dict(zip(FATTY_ACIDS, self.fatty_acids[i])))
+                for j in np.flatnonzero(different)[:2]:
+                    alternatives.append({
+                        'oilId': self.catalog.ids[j],
+                        'whyBetter': "Provides different fatty acid balance for variety",
+                        'specificAdvantage': f"Adds {_dominant_fatty_acid(dict(zip(FATTY_ACIDS, self.fatty_acids[j])))} "
+                                             f"instead of duplicating {dominant}",
+                    })
+
+        return alternatives[:3]
+
+    def _display_copy(self, score, contributions, projections, problems, alternatives, suggested):
+        """generateDisplayCopy"""
+        if score >= 70:
+            parts = []
+            main = next((p for p in projections if p['movesTowardIdeal']), None)
+            if main:
+                parts.append(f"Brings {main['quality']} to {main['projected']} (ideal range)")
+            if contributions:
+                fa = contributions[0]
+                parts.append(f"{_to_fixed0(fa['percentage'])}% {fa['acid'].lower()} • {fa['whyHelpful']}")
+            if main and main['quality'] == 'hardness':
+                parts.append("Bars will unmold faster and last 3-4 weeks of daily use")
+            return " • ".join(parts)
+
+        if score >= 50:
+            parts = []
+            if contributions:
+                fa = contributions[0]
+                parts.append(f"Adds {_to_fixed0(fa['percentage'])}% {fa['acid'].lower()} for {fa['whyHelpful'].lower()}")
+            if projections and not projections[0]['movesTowardIdeal']:
+                parts.append(f"However, {projections[0]['quality']} moves to {projections[0]['projected']}")
+            parts.append(f"Best at {_js_number(suggested)}% of recipe")
+            return " • ".join(parts)
+
+        if score >= 30:
+            parts = []
+            if contributions:
+                fa = contributions[0]
+                parts.append(f"Provides {_to_fixed0(fa['percentage'])}% {fa['acid'].lower()}")
+            worsening = [p for p in projections if not p['movesTowardIdeal']]
+            if worsening:
+                p = worsening[0]
+                parts.append(f"But {p['quality']} becomes {p['projected']} (want {p['range']['min']}-{p['range']['max']})")
+            parts.append(f"Use sparingly, max {_js_number(suggested)}%")
+            return " • ".join(parts)
+
+        if problems:
+            problem = problems[0]
+            parts = [f"⚠️ {problem['details']}", problem['visualResult']]
+            if alternatives:
+                alternative = alternatives[0]
+                if alternative['oilId'] in self.catalog:
+                    name = self.catalog.names[self.catalog.index[alternative['oilId']]]
+                    parts.append(f"Try {name} instead: {alternative['whyBetter']}")
+            return " • ".join(parts)
+
+        return "Not recommended for this recipe"
+
+    @timed('recommend.get_recommended_oils')
+    def recommend(self, current_oils, soap_type='hard', max_recommendations=5):
+        """getRecommendedOils: top N OilRecommendation dicts sorted by score"""
+        context = self.context(current_oils)
+        scores = self.score(context, soap_type)
+        return self._recommendations(context, scores, soap_type, max_recommendations)
+
+    def _recommendations(self, context, scores, soap_type, max_recommendations):
+        candidates = np.flatnonzero(scores.candidates)
+        top = candidates[top_k(scores.scores[candidates], max_recommendations)]
+        projected = self.project(context, top, scores.suggested[top])
+
+        recommendations = []
+        for i, qualities in zip(top, projected):
+            score = scores.scores[i]
+            suggested = scores.suggested[i]
+            factors = self._factors(scores, i)
+            recommendations.append({
+                'oil': self.catalog.oil(self.catalog.ids[i]),
+                'score': float(score),
+                'reason': self._reason(context, factors),
+                'suggestedPercentage': float(suggested),
+                'predictedImpact': self._predicted_impact(context, qualities, soap_type),
+                'compatibilityFactors': factors,
+                'detail': self.detail(context, i, score, suggested, qualities, soap_type),
+            })
+        return recommendations
+
+    @timed('recommend.evaluate')
+    def evaluate(self, current_oils, soap_type='hard', max_recommendations=5, threshold=25):
+        """getRecommendedOils, getIncompatibleOils and getDisabledReason from one scoring pass
+
+        Returns {'recommendations': [...], 'incompatible': [oil ids],
+        'disabledReasons': {oil id: reason}}, with a reason for every
+        incompatible oil.
+        """
+        context = self.context(current_oils)
+        return self._evaluate(context, self.score(context, soap_type), soap_type, max_recommendations, threshold)
+
+    @timed('recommend.evaluate_many')
+    def evaluate_many(self, requests):
+        """evaluate() for many (current_oils, soap_type, max_recommendations, threshold) requests
+
+        Recipes of the same soap type are scored in one score_many() pass. A
+        request that fails gets its exception in place of a result, so one
+        bad recipe does not fail the others.
+        """
+        results = [None] * len(requests)
+        contexts = {}
+        for i, (current_oils, _, _, _) in enumerate(requests):
+            try:
+                contexts[i] = self.context(current_oils)
+            except Exception as e:
+                results[i] = e
+        by_soap_type = {}
+        for i in contexts:
+            by_soap_type.setdefault(requests[i][1], []).append(i)
+        for soap_type, members in by_soap_type.items():
+            try:
+                scores = self.score_many([contexts[i] for i in members], soap_type)
+            except Exception:
+                scores = [None] * len(members)  # score one at a time to find the bad recipe
+            for i, recipe_scores in zip(members, scores):
+                try:
+                    if recipe_scores is None:
+                        recipe_scores = self.score(contexts[i], soap_type)
+                    results[i] = self._evaluate(contexts[i], recipe_scores, *requests[i][1:])
+                except Exception as e:
+                    results[i] = e
+        return results
+
+    def _evaluate(self, context, scores, soap_type, max_recommendations, threshold):
+        incompatible = np.flatnonzero(scores.candidates & (scores.scores < threshold))
+        return {
+            'recommendations': self._recommendations(context, scores, soap_type, max_recommendations),
+            'incompatible': [self.catalog.ids[i] for i in incompatible],
+            'disabledReasons': {self.catalog.ids[i]: self._disabled_reason(context, scores, i) for i in incompatible},
+        }
+
+    def _disabled_reason(self, context, scores, i):
+        factors = self._factors(scores, i)
+        if not factors['improvesQuality'] and not factors['fillsNeeds']:
+            return "Cannot achieve ideal ranges with this oil"
+        return f"Low compatibility: {self._reason(context, factors)}"
+
+    def recommendation_detail(self, oil_id, current_oils, soap_type='hard'):
+        """getOilRecommendationDetail for any oil, selected or not"""
+        context = self.context(current_oils)
+        i = self.catalog.index[oil_id]
+        scores = self.score(context, soap_type)
+        suggested = scores.suggested[i]
+        projected = self.project(context, [i], [suggested])[0]
+        return self.detail(context, i, scores.scores[i], suggested, projected, soap_type)
+
+
+def _sequential_sum(values):
+    """Left-to-right sum, like Array.prototype.reduce"""
+    total = 0.0
+    for value in values:
+        total = total + value
+    return total
+
+
+def _js_weighted_properties(terms, normalize):
+    """(fatty acids, iodine, INS) of (properties, percentage) terms in the TS evaluation order
+
+    Mirrors the normalize step of the recommendation simulations followed by
+    calculateFattyAcidProfile and the iodine/INS sums of
+    calculateSoapQualities. Properties may be one row or one row per
+    candidate, and percentages scalars or one per candidate.
+    """
+    percentages = [p for _, p in terms]
+    if normalize:
+        total = _sequential_sum(percentages)
+        percentages = [(p / total) * 100 for p in percentages]
+    total = _sequential_sum(percentages)
+
+    fatty_acids = iodine = ins = 0.0
+    if np.all(np.asarray(total) == 0):
+        return np.zeros(len(FATTY_ACIDS)), iodine, ins
+    for (properties, _), p in zip(terms, percentages):
+        weight = np.asarray(p / total)[..., None]
+        fatty_acids = fatty_acids + properties[..., FATTY_ACID_COLUMNS] * weight
+        iodine = iodine + (properties[..., IODINE] * p) / total
+        ins = ins + (properties[..., INS] * p) / total
+    return fatty_acids, iodine, ins
+
+
+def _js_qualities(fatty_acids, iodine, ins):
+    """calculateSoapQualities with its exact addition order, rounded"""
+    fa = {acid: fatty_acids[..., i] for acid, i in _ACID.items()}
+    qualities = [
+        fa['lauric'] + fa['myristic'] + fa['palmitic'] + fa['stearic'],
+        fa['lauric'] + fa['myristic'],
+        fa['oleic'] + fa['linoleic'] + fa['linolenic'] + fa['ricinoleic'],
+        fa['lauric'] + fa['myristic'] + fa['ricinoleic'],
+        fa['palmitic'] + fa['stearic'] + fa['ricinoleic'],
+        np.broadcast_to(iodine, np.shape(fa['lauric'])),
+        np.broadcast_to(ins, np.shape(fa['lauric'])),
+    ]
+    return js_round(np.stack(qualities, axis=-1)).astype(np.int64)
+
+
+def _fatty_acid_contributions(fa, needs, soap_type):
+    """getFattyAcidContributions"""
+    contributions = []
+
+    if (fa['palmitic'] > 20 or fa['stearic'] > 5) and 'hardness' in needs and soap_type == 'hard':
+        contributions.append({
+            'acid': "Palmitic + Stearic",
+            'percentage': fa['palmitic'] + fa['stearic'],
+            'whyHelpful': "Saturated fats crystallize to form solid bar structure",
+        })
+
+    if fa['oleic'] > 50:
+        if soap_type == 'liquid':
+            contributions.append({
+                'acid': "Oleic",
+                'percentage': fa['oleic'],
+                'whyHelpful': "Unsaturated fats remain liquid at room temperature, perfect for liquid soap",
+            })
+        elif 'conditioning' in needs:
+            contributions.append({
+                'acid': "Oleic",
+                'percentage': fa['oleic'],
+                'whyHelpful': "Moisturizes skin without stripping natural oils, similar to skin's sebum",
+            })
+
+    if (fa['lauric'] > 30 or fa['myristic'] > 5) and 'cleansing' in needs:
+        contributions.append({
+            'acid': "Lauric + Myristic",
+            'percentage': fa['lauric'] + fa['myristic'],
+            'whyHelpful': "Short-chain fatty acids cut through oils effectively, creating cleansing lather",
+        })
+
+    if fa['linoleic'] > 30 and 'conditioning' in needs:
+        contributions.append({
+            'acid': "Linoleic",
+            'percentage': fa['linoleic'],
+            'whyHelpful': "Polyunsaturated fat provides lightweight moisturizing properties",
+        })
+
+    if fa['ricinoleic'] > 80:
+        if 'bubbly_lather' in needs:
+            contributions.append({
+                'acid': "Ricinoleic",
+                'percentage': fa['ricinoleic'],
+                'whyHelpful': "Creates stable bubbles and helps other oils lather better",
+            })
+        if 'creamy_lather' in needs:
+            contributions.append({
+                'acid': "Ricinoleic",
+                'percentage': fa['ricinoleic'],
+                'whyHelpful': "Produces dense, long-lasting foam structure",
+            })
+
+    return contributions
+
+
+def _quality_projections(context, projected, soap_type):
+    """calculateQualityProjections from already projected qualities"""
+    ranges = get_quality_ranges(soap_type)
+    projections = []
+    for quality, current, value in zip(SCORED_QUALITIES, context.qualities, projected):
+        current, value = int(current), int(value)
+        if abs(value - current) > 1:
+            ideal = ranges[quality]['ideal']
+            mid = (ideal['min'] + ideal['max']) / 2
+            projections.append({
+                'quality': quality,
+                'current': current,
+                'projected': value,
+                'range': {'min': ranges[quality]['min'], 'max': ranges[quality]['max']},
+                'movesTowardIdeal': abs(value - mid) < abs(current - mid),
+            })
+    return projections
+
+
+def _dominant_fatty_acid(fa):
+    """getDominantFattyAcid: the first of the highest fatty acids"""
+    return max(FATTY_ACIDS, key=lambda acid: fa[acid])
+
+
+def _out_of_range_visual_result(quality, direction):
+    """getOutOfRangeVisualResult"""
+    descriptions = {
+        'cleansing': {
+            'high': "Drying, tight feeling, disrupts skin barrier",
+            'low': "Doesn't clean effectively, leaves oily residue",
+        },
+        'hardness': {
+            'high': "Brittle bars that crack, harsh feel",
+            'low': "Soap won't unmold, stays mushy, dissolves quickly",
+        },
+        'conditioning': {
+            'high': "May leave greasy residue on skin",
+            'low': "Strips natural oils, leaves skin feeling tight",
+        },
+        'bubbly': {
+            'high': "Excessive foam, may be irritating",
+            'low': "Minimal lather, poor cleansing experience",
+        },
+        'creamy': {
+            'high': "Too dense, doesn't rinse clean",
+            'low': "Thin lather, lacks luxurious feel",
+        },
+    }
+    return descriptions.get(quality, {}).get(direction, "May affect soap performance")
+
+
+def get_recommended_oils(catalog, current_oils, soap_type='hard', max_recommendations=5, custom_oils=None):
+    """One-off getRecommendedOils; build a Recommender once to serve many requests"""
+    if custom_oils:
+        catalog = catalog.extended(custom_oils)
+    return Recommender(catalog).recommend(current_oils, soap_type, max_recommendations)
+
+
+def evaluate_recommendations(catalog, current_oils, soap_type='hard', max_recommendations=5, threshold=25,
+                             custom_oils=None):
+    """One-off Recommender.evaluate; build a Recommender once to serve many requests"""
+    if custom_oils:
+        catalog = catalog.extended(custom_oils)
+    return Recommender(catalog).evaluate(current_oils, soap_type, max_recommendations, threshold)
@@ -0,0 +1,199 @@
+"""
+Compact oil and recipe records
+Oils are structured-array views over the catalog matrix and recipes hold
+catalog row indices plus a percentage array, so neither copies oil data
+per object
+"""
+
+import numpy as np
+
+from .catalog import FATTY_ACIDS, FATTY_ACID_COLUMNS, INS, IODINE, PROPERTIES, SAP
+from .engine import js_round, quality_values
+
+# One catalog matrix row as a record; same layout, so C-ordered matrices view it without a copy
+OIL_DTYPE = np.dtype([
+    ('sap', '<f4'),
+    ('iodine', '<f4'),
+    ('ins', '<f4'),
+    ('fatty_acids', '<f4', (len(FATTY_ACIDS),)),
+])
+
+# Recipes gathered per block in RecipeBatch, bounding the (block x oils x PROPERTIES) temporary
+BLOCK_RECIPES = 65536
+
+
+def oil_records(catalog):
+    """(oils,) OIL_DTYPE array over the catalog matrix; a view when the matrix is row-major"""
+    matrix = np.ascontiguousarray(catalog.matrix, dtype='<f4')
+    return matrix.view(OIL_DTYPE).reshape(len(catalog))
+
+
+class Oil:
+    """One catalog oil, read from the matrix on access
+
+    Costs two references instead of a dict of values and a fatty acid dict.
+    """
+
+    __slots__ = ('catalog', 'row')
+
+    def __init__(self, catalog, row):
+        self.catalog = catalog
+        self.row = row
+
+    @classmethod
+    def by_id(cls, catalog, oil_id):
+        return cls(catalog, catalog.index[oil_id])
+
+    def __repr__(self):
+        return f"Oil({self.id!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Oil) and other.catalog is self.catalog and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self.catalog), self.row))
+
+    @property
+    def id(self):
+        return self.catalog.ids[self.row]
+
+    @property
+    def name(self):
+        return self.catalog.names[self.row]
+
+    @property
+    def category(self):
+        return self.catalog.categories[self.row]
+
+    @property
+    def sap(self):
+        return float(self.catalog.matrix[self.row, SAP])
+
+    @property
+    def iodine(self):
+        return float(self.catalog.matrix[self.row, IODINE])
+
+    @property
+    def ins(self):
+        return float(self.catalog.matrix[self.row, INS])
+
+    @property
+    def fatty_acids(self):
+        """(FATTY_ACIDS,) float32 view of this oil's profile"""
+        return self.catalog.matrix[self.row, FATTY_ACID_COLUMNS]
+
+    def as_dict(self):
+        """OilData shape, as OilCatalog.oil"""
+        return self.catalog.oil(self.id)
+
+
+class Recipe:
+    """Catalog rows and their percentages, without copies of the oils"""
+
+    __slots__ = ('rows', 'percentages')
+
+    def __init__(self, rows, percentages):
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.percentages = np.asarray(percentages, dtype=np.float64)
+        if self.rows.shape != self.percentages.shape:
+            raise ValueError("Recipe rows and percentages differ in length")
+
+    @classmethod
+    def from_percentages(cls, catalog, current_oils):
+        """From {oil_id: percentage} or (oil_id, percentage) pairs"""
+        current = dict(current_oils)
+        return cls(catalog.indices(list(current)), list(current.values()))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"Recipe(rows={self.rows.tolist()}, percentages={self.percentages.tolist()})"
+
+    def oils(self, catalog):
+        return [Oil(catalog, int(row)) for row in self.rows]
+
+    def as_dict(self, catalog):
+        """{oil_id: percentage}"""
+        return {catalog.ids[row]: p for row, p in zip(self.rows.tolist(), self.percentages.tolist())}
+
+    def properties(self, catalog):
+        """(PROPERTIES,) percentage-weighted properties, zeros for an empty recipe"""
+        total = self.percentages.sum()
+        if total <= 0:
+            return np.zeros(len(PROPERTIES))
+        return self.percentages @ catalog.matrix[self.rows].astype(np.float64) / total
+
+    def qualities(self, catalog):
+        """(QUALITIES,) rounded qualities"""
+        return js_round(quality_values(self.properties(catalog))).astype(np.int64)
+
+
+class RecipeBatch:
+    """Many recipes of up to k oils as two (recipes x k) arrays
+
+    Shorter recipes are padded with row 0 at 0%, which adds nothing to any
+    sum. A million 4-oil candidates take 48 MB (32 MB with float32
+    percentages), against over a gigabyte as a dense recipes x oils matrix
+    of the seed catalog.
+    """
+
+    __slots__ = ('rows', 'percentages')
+
+    def __init__(self, rows, percentages):
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.percentages = np.asarray(percentages)
+        if self.percentages.dtype not in (np.float32, np.float64):
+            self.percentages = self.percentages.astype(np.float64)
+        if self.rows.ndim != 2 or self.rows.shape != self.percentages.shape:
+            raise ValueError("Expected matching (recipes x k) rows and percentages")
+
+    @classmethod
+    def from_recipes(cls, catalog, recipes, dtype=np.float64):
+        """From Recipe objects or {oil_id: percentage} mappings"""
+        recipes = [r if isinstance(r, Recipe) else Recipe.from_percentages(catalog, r) for r in recipes]
+        k = max((len(r) for r in recipes), default=0)
+        rows = np.zeros((len(recipes), k), dtype=np.int32)
+        percentages = np.zeros((len(recipes), k), dtype=dtype)
+        for i, recipe in enumerate(recipes):
+            rows[i, :len(recipe)] = recipe.rows
+            percentages[i, :len(recipe)] = recipe.percentages
+        return cls(rows, percentages)
+
+    @classmethod
+    def empty(cls, count, k, dtype=np.float64):
+        return cls(np.zeros((count, k), dtype=np.int32), np.zeros((count, k), dtype=dtype))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        """Recipe i without its padding"""
+        used = self.percentages[i] != 0
+        return Recipe(self.rows[i][used], self.percentages[i][used])
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.percentages.nbytes
+
+    def to_dense(self, catalog):
+        """(recipes x oils) percentage matrix for the batch engine functions"""
+        dense = np.zeros((len(self), len(catalog)))
+        np.add.at(dense, (np.arange(len(self))[:, None], self.rows), self.percentages)
+        return dense
+
+    def properties(self, catalog, block=BLOCK_RECIPES):
+        """(recipes x PROPERTIES) weighted properties, gathered block by block"""
+        out = np.zeros((len(self), len(PROPERTIES)))
+        matrix = catalog.matrix.astype(np.float64)
+        for start in range(0, len(self), block):
+            rows = self.rows[start:start + block]
+            percentages = self.percentages[start:start + block].astype(np.float64)
+            totals = percentages.sum(axis=1, keepdims=True)
+            sums = np.einsum('nk,nkp->np', percentages, matrix[rows])
+            np.divide(sums, totals, out=out[start:start + block], where=totals > 0)
+        return out
+
+    def qualities(self, catalog, block=BLOCK_RECIPES):
+        """(recipes x QUALITIES) rounded qualities"""
+        return js_round(quality_values(self.properties(catalog, block))).astype(np.int32)
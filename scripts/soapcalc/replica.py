@@ -0,0 +1,372 @@
+"""
+Local SQLite oil catalog replica
+Materializes the oils table into a SQLite file indexed for the lookups
+lib/services/oils.ts makes (id, category, name search, fatty acids),
+applies upserts and deletes from a change feed and serves versioned
+snapshots, so batch jobs and the recipe service read the catalog locally
+"""
+
+from collections import namedtuple
+import hashlib
+import json
+import os
+import sqlite3
+
+from . import startup
+from .catalog import FATTY_ACIDS, OilCatalog
+
+SCHEMA_VERSION = 1
+
+# row is the table's rowid, which FTS5 needs as an integer key; oils keep
+# their row when updated, so unchanged oils keep their snapshot position
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS oils (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    sap_naoh REAL NOT NULL,
+    sap_koh REAL NOT NULL,
+    iodine REAL NOT NULL,
+    ins REAL NOT NULL,
+    category TEXT NOT NULL,
+    {', '.join(f'{acid} REAL NOT NULL' for acid in FATTY_ACIDS)},
+    is_system INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS oils_name ON oils (name);
+CREATE INDEX IF NOT EXISTS oils_category ON oils (category, name);
+{''.join(f'CREATE INDEX IF NOT EXISTS oils_{acid} ON oils ({acid});' for acid in FATTY_ACIDS)}
+
+CREATE VIRTUAL TABLE IF NOT EXISTS oils_fts USING fts5(name, content='oils', content_rowid='row', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS oils_fts_insert AFTER INSERT ON oils BEGIN
+    INSERT INTO oils_fts (rowid, name) VALUES (new.row, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS oils_fts_delete AFTER DELETE ON oils BEGIN
+    INSERT INTO oils_fts (oils_fts, rowid, name) VALUES ('delete', old.row, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS oils_fts_update AFTER UPDATE OF name ON oils BEGIN
+    INSERT INTO oils_fts (oils_fts, rowid, name) VALUES ('delete', old.row, old.name);
+    INSERT INTO oils_fts (rowid, name) VALUES (new.row, new.name);
+END;
+
+CREATE TABLE IF NOT EXISTS replica_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS applied_changes (seq INTEGER PRIMARY KEY);
+INSERT OR IGNORE INTO replica_meta VALUES ('schema', {SCHEMA_VERSION}), ('version', 0), ('sequence', 0);
+"""
+
+COLUMNS = ('id', 'name', 'sap_naoh', 'sap_koh', 'iodine', 'ins', 'category') + FATTY_ACIDS + ('is_system',)
+
+# Trigram search needs at least this many characters; shorter queries use LIKE
+TRIGRAM = 3
+
+# Feed entries below the replica's sequence that a sync reads again. Sequence
+# numbers are taken when a change is written, not when its transaction
+# commits, so a slow transaction can show up after higher numbers were
+# applied; it is still picked up while it is within this many of the top.
+SYNC_LAG = 1000
+
+# Change log table and trigger for the Postgres side of PostgresChangeFeed.
+# seq comes from nextval() inside the writing transaction, so rows can become
+# visible out of seq order; Replica.sync re-reads SYNC_LAG entries to catch
+# them. Changes to one oil hold its row lock until commit, so they still
+# commit in seq order.
+POSTGRES_CHANGE_LOG = """
+CREATE TABLE IF NOT EXISTS oil_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+    id TEXT NOT NULL,
+    oil JSONB,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION log_oil_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO oil_changes (op, id) VALUES ('delete', OLD.id);
+        RETURN OLD;
+    END IF;
+    INSERT INTO oil_changes (op, id, oil) VALUES ('upsert', NEW.id, to_jsonb(NEW));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER oils_change_log AFTER INSERT OR UPDATE OR DELETE ON oils
+    FOR EACH ROW EXECUTE FUNCTION log_oil_change();
+"""
+
+CatalogSnapshot = namedtuple('CatalogSnapshot', [
+    'version',   # replica version the snapshot was read at
+    'sequence',  # last change feed entry applied
+    'catalog',   # OilCatalog in replica row order
+])
+
+
+def oil_values(oil):
+    """COLUMNS values for an OilData dict or a parse_oils() row; raises ValueError when malformed"""
+    try:
+        fatty_acids = oil['fatty_acids']
+        if isinstance(fatty_acids, str):
+            fatty_acids = json.loads(fatty_acids)
+        sap_naoh = float(oil['sap_naoh'] if 'sap_naoh' in oil else oil['sap'])
+        sap_koh = float(oil['sap_koh'] if 'sap_koh' in oil else sap_naoh)
+        return (
+            str(oil['id']), str(oil['name']), sap_naoh, sap_koh, float(oil['iodine']), float(oil['ins']),
+            oil.get('category') or '',
+            *(float(fatty_acids.get(acid) or 0) for acid in FATTY_ACIDS),
+            int(bool(oil.get('is_system', True))),
+        )
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Malformed oil {oil.get('id') if isinstance(oil, dict) else oil!r}: {e}") from None
+
+
+def _oil_data(row):
+    """OilData dict from a COLUMNS row"""
+    fatty_acids = dict(zip(FATTY_ACIDS, row[7:7 + len(FATTY_ACIDS)]))
+    return {
+        'id': row[0], 'name': row[1], 'sap_naoh': row[2], 'sap_koh': row[3], 'fatty_acids': fatty_acids,
+        'iodine': row[4], 'ins': row[5], 'category': row[6],
+    }
+
+
+class Replica:
+    """One SQLite replica file; reads are local and writes come from materialize or apply
+
+    The file is in WAL mode, so a sync writing changes does not block
+    processes reading snapshots.
+    """
+
+    def __init__(self, path, create=True):
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(f"No catalog replica at {path}")
+        self.path = path
+        self.db = sqlite3.connect(path)
+        try:
+            self.db.execute('PRAGMA journal_mode = WAL')
+            self.db.executescript(SCHEMA)
+        except sqlite3.DatabaseError as e:
+            self.db.close()
+            raise ValueError(f"Not a catalog replica: {path} ({e})") from None
+        schema = self._meta('schema')
+        if schema != SCHEMA_VERSION:
+            self.db.close()
+            raise ValueError(f"Unsupported replica schema {schema} in {path}")
+        self._snapshot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def _meta(self, key):
+        return self.db.execute('SELECT value FROM replica_meta WHERE key = ?', (key,)).fetchone()[0]
+
+    @property
+    def version(self):
+        """Bumped by every materialize or apply that changed something"""
+        return self._meta('version')
+
+    @property
+    def sequence(self):
+        """Last change feed sequence number applied"""
+        return self._meta('sequence')
+
+    def __len__(self):
+        return self.db.execute('SELECT count(*) FROM oils').fetchone()[0]
+
+    def materialize(self, oils, sequence=0):
+        """Replace every oil with oils (OilData dicts or parse_oils() rows), as of feed sequence
+
+        Duplicate ids keep their first row, like the seed migration. The
+        next sync applies the lag window below sequence again, which leaves
+        every oil at its latest change.
+        """
+        rows, seen = [], set()
+        for oil in oils:
+            values = oil_values(oil)
+            if values[0] not in seen:
+                seen.add(values[0])
+                rows.append(values)
+        with self.db:
+            self.db.execute('DELETE FROM oils')
+            self.db.executemany(
+                f"INSERT INTO oils ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            self.db.execute("UPDATE replica_meta SET value = value + 1 WHERE key = 'version'")
+            self.db.execute("UPDATE replica_meta SET value = ? WHERE key = 'sequence'", (sequence,))
+            self.db.execute('DELETE FROM applied_changes')
+        return len(rows)
+
+    def apply(self, changes, lag=SYNC_LAG):
+        """Apply change feed entries in seq order in one transaction, returning how many were new
+
+        Entries are {"seq": n, "op": "upsert", "oil": {...}} or
+        {"seq": n, "op": "delete", "id": ...}. The seqs of the last lag
+        entries below the replica's sequence are remembered, so an entry that
+        commits late is applied once and a replayed one is skipped; entries
+        further back count as applied. The version goes up once per call
+        that applied anything.
+        """
+        upsert = (f"INSERT INTO oils ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                  f"ON CONFLICT (id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in COLUMNS[1:])}")
+        applied = 0
+        with self.db:
+            sequence = self.sequence
+            settled = sequence - lag
+            for change in sorted(changes, key=lambda change: int(change['seq'])):
+                seq = int(change['seq'])
+                if seq <= settled or self.db.execute('SELECT 1 FROM applied_changes WHERE seq = ?', (seq,)).fetchone():
+                    continue
+                if change['op'] == 'upsert':
+                    self.db.execute(upsert, oil_values(change['oil']))
+                elif change['op'] == 'delete':
+                    self.db.execute('DELETE FROM oils WHERE id = ?', (change['id'],))
+                else:
+                    raise ValueError(f"Unknown change op at seq {seq}: {change['op']}")
+                self.db.execute('INSERT INTO applied_changes VALUES (?)', (seq,))
+                sequence = max(sequence, seq)
+                applied += 1
+            if applied:
+                self.db.execute("UPDATE replica_meta SET value = value + 1 WHERE key = 'version'")
+                self.db.execute("UPDATE replica_meta SET value = ? WHERE key = 'sequence'", (sequence,))
+                self.db.execute('DELETE FROM applied_changes WHERE seq <= ?', (sequence - lag,))
+        return applied
+
+    def sync(self, feed, lag=SYNC_LAG):
+        """Apply what feed has that this replica has not, re-reading the last lag entries
+
+        Every change is applied exactly once as long as its transaction
+        commits before the feed moves lag entries past its seq; one that
+        commits later than that is skipped.
+        """
+        return self.apply(feed.changes(max(0, self.sequence - lag)), lag)
+
+    def _select(self, where='', params=(), order='name'):
+        rows = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM oils {where} ORDER BY {order}", params)
+        return [_oil_data(row) for row in rows]
+
+    def all_oils(self):
+        """Every oil sorted by name, as getAllAvailableOils"""
+        return self._select()
+
+    def oil(self, oil_id):
+        """OilData for oil_id or None, as getOilById"""
+        oils = self._select('WHERE id = ?', (oil_id,))
+        return oils[0] if oils else None
+
+    def by_category(self, category):
+        """As getOilsByCategory"""
+        return self._select('WHERE category = ?', (category,))
+
+    def search(self, query):
+        """Oils whose name contains query, ignoring case, sorted by name, as searchOils"""
+        if len(query) >= TRIGRAM:
+            phrase = '"' + query.replace('"', '""') + '"'
+            return self._select('WHERE row IN (SELECT rowid FROM oils_fts WHERE oils_fts MATCH ?)', (phrase,))
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self._select("WHERE name LIKE ? ESCAPE '\\'", (pattern,))
+
+    def categories(self):
+        """Sorted categories of system oils, as getOilCategories"""
+        rows = self.db.execute('SELECT DISTINCT category FROM oils WHERE is_system ORDER BY category')
+        return [category for category, in rows]
+
+    def by_fatty_acid(self, acid, minimum=None, maximum=None):
+        """Oils with acid between minimum and maximum percent, highest first"""
+        if acid not in FATTY_ACIDS:
+            raise ValueError(f"Unknown fatty acid: {acid}")
+        return self._select(f'WHERE {acid} BETWEEN ? AND ?',
+                            (float('-inf') if minimum is None else minimum,
+                             float('inf') if maximum is None else maximum), order=f'{acid} DESC, name')
+
+    def snapshot(self):
+        """CatalogSnapshot of the current version; reread only after the version changes
+
+        Read in one transaction, so a concurrent sync is seen entirely or not at all.
+        """
+        version = self.version
+        if self._snapshot is not None and self._snapshot.version == version:
+            return self._snapshot
+        with self.db:
+            self.db.execute('BEGIN')
+            version, sequence = self.version, self.sequence
+            oils = self._select(order='row')
+        self._snapshot = CatalogSnapshot(version, sequence, OilCatalog.from_oils(oils))
+        return self._snapshot
+
+    def export_snapshot(self, directory):
+        """Write the current snapshot as a binary catalog named for its version; returns the path
+
+        Batch jobs memory-map the file with binary_catalog.load_binary_catalog,
+        which costs no SQLite reads. An existing file for the version is kept.
+        """
+        from .binary_catalog import write_binary_catalog
+
+        snapshot = self.snapshot()
+        path = os.path.join(directory, f"oil_catalog.v{snapshot.version:06d}.bin")
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            digest = hashlib.sha256(f"replica {snapshot.version} {snapshot.sequence}".encode()).digest()
+            write_binary_catalog(snapshot.catalog, path, digest)
+        return path
+
+
+class FileChangeFeed:
+    """Change log kept as a JSONL file, one entry per line; stands in for Postgres in tests"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def changes(self, after=0):
+        """Entries with seq above after, in seq order"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+        return sorted((entry for entry in entries if int(entry['seq']) > after), key=lambda entry: entry['seq'])
+
+    def last_sequence(self):
+        return max((int(entry['seq']) for entry in self.changes()), default=0)
+
+    def append(self, op, value):
+        """Log an upsert of an oil dict or a delete of an oil id; returns its seq"""
+        if op not in ('upsert', 'delete'):
+            raise ValueError(f"Unknown change op: {op}")
+        seq = self.last_sequence() + 1
+        entry = {'seq': seq, 'op': op}
+        if op == 'upsert':
+            oil_values(value)
+            entry['oil'] = value
+        else:
+            entry['id'] = value
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        return seq
+
+
+class PostgresChangeFeed:
+    """Change log in a Postgres table filled by the POSTGRES_CHANGE_LOG trigger (needs psycopg)"""
+
+    def __init__(self, dsn, table='oil_changes'):
+        self.dsn = dsn
+        self.table = table
+
+    def changes(self, after=0):
+        try:
+            import psycopg
+        except ImportError:
+            raise RuntimeError("psycopg is not installed; pip install psycopg to sync from Postgres") from None
+        with psycopg.connect(self.dsn) as connection:
+            rows = connection.execute(
+                f"SELECT seq, op, id, oil FROM {self.table} WHERE seq > %s ORDER BY seq", (after,)).fetchall()
+        return [{'seq': seq, 'op': op, 'id': oil_id, 'oil': oil} for seq, op, oil_id, oil in rows]
+
+
+def load_replica_catalog(path):
+    """OilCatalog from a replica's current snapshot, for --replica options"""
+    with Replica(path, create=False) as replica:
+        snapshot = replica.snapshot()
+    startup.note('catalog', f"replica v{snapshot.version}")
+    return snapshot.catalog
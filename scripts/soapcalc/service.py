@@ -0,0 +1,343 @@
+"""
+Async recipe service
+A small asyncio HTTP/1.1 server over the engine. Requests that arrive
+within a short window are micro-batched: recipes are evaluated as one
+percentage matrix and recommendation requests share one worker hop and
+the evaluation cache.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import math
+
+from .batch import evaluate_chunk, read_recipes
+from .cache import CachedEvaluator
+from .pareto import FrontierCache
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8400
+
+# How long the first request of a batch waits for others, in seconds
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 256
+
+# Largest request body accepted, in bytes
+MAX_BODY = 16 * 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    """A client error, answered with a 400 and its message"""
+
+
+class MicroBatcher:
+    """Collects submitted items and hands them to process() in batches
+
+    A batch runs when max_batch items are waiting or window seconds after
+    its first item arrived. process(items) runs on the executor and
+    returns one result per item; an Exception instance in place of a
+    result fails just that item.
+    """
+
+    def __init__(self, process, executor, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.process = process
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = {'batches': 0, 'items': 0}
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        self.stats['batches'] += 1
+        self.stats['items'] += len(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.process, [item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class RecipeService:
+    """Endpoint handlers over one catalog
+
+    Batched engine work runs on a single worker thread, so the evaluation
+    cache is never shared between threads. Frontier searches can take
+    seconds, so they get a thread of their own and a cache miss never holds
+    up /calculate or /recommendations batches.
+
+        POST /calculate          one recipe in the evaluate_recipes.py format -> calculateRecipe results
+        POST /calculate/stream   JSONL recipes -> JSONL results, streamed a batch at a time
+        POST /recommendations    {"oils", "soapType", "maxRecommendations"} -> getRecommendedOils
+        POST /incompatible       {"oils", "soapType", "threshold"} -> getIncompatibleOils and reasons
+        POST /frontier           {"pool", "soapType", "maxOils", "step", "prices", ...} -> Pareto frontier recipes
+        GET  /stats              batching and cache counters
+    """
+
+    def __init__(self, catalog, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH, similarity_index=None):
+        self.catalog = catalog
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='soapcalc')
+        self.frontier_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='soapcalc-frontier')
+        self.evaluator = CachedEvaluator(catalog, similarity_index=similarity_index)
+        self.frontiers = FrontierCache(catalog)
+        self.recipes = MicroBatcher(self._calculate, self.executor, window, max_batch)
+        self.recommendations = MicroBatcher(self._recommend, self.executor, window, max_batch)
+        self.routes = {
+            ('POST', '/calculate'): self.calculate,
+            ('POST', '/recommendations'): self.recommend,
+            ('POST', '/incompatible'): self.incompatible,
+            ('POST', '/frontier'): self.frontier,
+            ('GET', '/stats'): self.get_stats,
+            ('GET', '/health'): self.health,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.frontier_executor.shutdown(wait=True)
+
+    # Engine work, on the worker threads
+
+    def _calculate(self, recipes):
+        return evaluate_chunk(self.catalog, list(enumerate(recipes, 1)))
+
+    def _recommend(self, requests):
+        # Scored in one stacked pass; a failed request gets its own error, the rest still answer
+        return [RequestError(result.args[0]) if isinstance(result, (KeyError, ValueError)) else result
+                for result in self.evaluator.evaluate_many(requests)]
+
+    def _frontier(self, request):
+        pool, soap_type, max_oils, step, prices, within, select = request
+        try:
+            frontier = self.frontiers.get(pool, soap_type, max_oils, step, prices, within)
+            positions = frontier.select(**select)
+        except (KeyError, ValueError) as e:
+            raise RequestError(e.args[0]) from None
+        return {'size': len(frontier), 'recipes': frontier.records(positions)}
+
+    # Handlers, on the event loop
+
+    async def calculate(self, body):
+        recipe = _json_object(body)
+        result = await self.recipes.submit(recipe)
+        if 'error' in result:
+            raise RequestError(result['error'])
+        result.pop('line', None)
+        return result
+
+    async def recommend(self, body):
+        result = await self.recommendations.submit(_recommendation_request(body))
+        return result['recommendations']
+
+    async def incompatible(self, body):
+        result = await self.recommendations.submit(_recommendation_request(body))
+        return {'incompatible': result['incompatible'], 'disabledReasons': result['disabledReasons']}
+
+    async def frontier(self, body):
+        # Frontiers are cached per pool, so requests are not batched; a miss runs one search
+        request = _frontier_request(body)
+        return await asyncio.get_running_loop().run_in_executor(self.frontier_executor, self._frontier, request)
+
+    async def get_stats(self, body):
+        return {
+            'calculate': dict(self.recipes.stats),
+            'recommendations': dict(self.recommendations.stats),
+            'cache': dict(self.evaluator.cache.stats),
+            'frontiers': dict(self.frontiers.cache.stats),
+        }
+
+    async def health(self, body):
+        return {'status': 'ok', 'oils': len(self.catalog)}
+
+    async def stream_calculate(self, body, writer, keep_alive=True):
+        """Evaluate JSONL recipes max_batch at a time, writing each batch's results as a chunk"""
+        try:
+            lines = _text(body).splitlines()
+        except RequestError as e:
+            await _respond(writer, 400, {'error': str(e)}, keep_alive)
+            return
+        loop = asyncio.get_running_loop()
+        writer.write(_head(200, 'application/x-ndjson', chunked=True))
+        for start in range(0, len(lines), self.max_batch):
+            chunk = list(read_recipes(lines[start:start + self.max_batch], start + 1))
+            results = await loop.run_in_executor(self.executor, evaluate_chunk, self.catalog, chunk)
+            data = ''.join(json.dumps(result) + '\n' for result in results).encode('utf-8')
+            if data:
+                writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    # HTTP
+
+    async def handle(self, reader, writer):
+        """Serve one connection, with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await _respond(writer, 413, {'error': f"Body over {MAX_BODY} bytes"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                await self.dispatch(method, path.split('?', 1)[0], body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body, writer, keep_alive=True):
+        if (method, path) == ('POST', '/calculate/stream'):
+            await self.stream_calculate(body, writer, keep_alive)
+            return
+        handler = self.routes.get((method, path))
+        if handler is None:
+            known = any(route_path == path for _, route_path in self.routes)
+            await _respond(writer, 405 if known else 404, {'error': f"{method} {path}"}, keep_alive)
+            return
+        try:
+            result = await handler(body)
+        except RequestError as e:
+            await _respond(writer, 400, {'error': str(e)}, keep_alive)
+        except Exception as e:
+            await _respond(writer, 500, {'error': f"{type(e).__name__}: {e}"}, keep_alive)
+        else:
+            await _respond(writer, 200, result, keep_alive)
+
+
+def _text(body):
+    try:
+        return body.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise RequestError(f"Body is not UTF-8: {e}") from None
+
+
+def _json_object(body):
+    try:
+        value = json.loads(_text(body) or '{}')
+    except json.JSONDecodeError as e:
+        raise RequestError(f"Invalid JSON: {e}") from None
+    if not isinstance(value, dict):
+        raise RequestError("Expected a JSON object")
+    return value
+
+
+def _recommendation_request(body):
+    """(current_oils, soap_type, max_recommendations, threshold) from a request body"""
+    request = _json_object(body)
+    soap_type = request.get('soapType', 'hard')
+    if soap_type not in ('hard', 'liquid'):
+        raise RequestError(f"Unknown soap type: {soap_type}")
+    try:
+        oils = request.get('oils', {})
+        if isinstance(oils, list):
+            oils = {oil['id']: oil['percentage'] for oil in oils}
+        current_oils = {oil_id: float(p) for oil_id, p in oils.items()}
+        max_recommendations = int(request.get('maxRecommendations', 5))
+        threshold = float(request.get('threshold', 25))
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise RequestError(f"Malformed request: {e}") from None
+    for oil_id, percentage in current_oils.items():
+        if not (math.isfinite(percentage) and percentage > 0):
+            raise RequestError(f"Percentage for {oil_id} must be a positive number, got {percentage}")
+    return current_oils, soap_type, max_recommendations, threshold
+
+
+def _frontier_request(body):
+    """(pool, soap_type, max_oils, step, prices, within, select arguments) from a request body"""
+    request = _json_object(body)
+    pool = request.get('pool')
+    if not isinstance(pool, list) or not pool:
+        raise RequestError("pool must be a non-empty list of oil ids")
+    soap_type = request.get('soapType', 'hard')
+    if soap_type not in ('hard', 'liquid'):
+        raise RequestError(f"Unknown soap type: {soap_type}")
+    try:
+        prices = request.get('prices')
+        prices = None if prices is None else {oil_id: float(p) for oil_id, p in prices.items()}
+        limits = {name: tuple(bounds) for name, bounds in (request.get('limits') or {}).items()}
+        limit = request.get('limit')
+        select = {
+            'limits': limits,
+            'sort_by': request.get('sortBy'),
+            'descending': bool(request.get('descending', False)),
+            'limit': None if limit is None else int(limit),
+        }
+        return ([str(oil_id) for oil_id in pool], soap_type, int(request.get('maxOils', 3)),
+                float(request.get('step', 5)), prices, request.get('within', 'range'), select)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise RequestError(f"Malformed request: {e}") from None
+
+
+def _head(status, content_type, length=None, keep_alive=True, chunked=False):
+    lines = [f"HTTP/1.1 {status} {REASONS[status]}", f"Content-Type: {content_type}"]
+    lines.append('Transfer-Encoding: chunked' if chunked else f"Content-Length: {length}")
+    if not keep_alive:
+        lines.append('Connection: close')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def _respond(writer, status, payload, keep_alive=True):
+    data = json.dumps(payload).encode('utf-8')
+    writer.write(_head(status, 'application/json', len(data), keep_alive) + data)
+    await writer.drain()
+
+
+async def serve(catalog, host=DEFAULT_HOST, port=DEFAULT_PORT, window=DEFAULT_WINDOW,
+                max_batch=DEFAULT_MAX_BATCH, similarity_index=None, ready=None):
+    """Run the service until cancelled; ready(server) is called once it is listening"""
+    service = RecipeService(catalog, window, max_batch, similarity_index)
+    server = await asyncio.start_server(service.handle, host, port)
+    if ready:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
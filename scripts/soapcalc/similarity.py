@@ -0,0 +1,175 @@
+"""
+Precomputed pairwise oil similarity
+calculateOilSimilarity for every pair of oils, stored as a uint8 matrix of
+fatty acid distances so lookups replace per-request profile comparisons
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from .catalog import FATTY_ACIDS
+from .recommend import top_k
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / 'data' / 'oil_similarity.npz'
+
+# Largest storable distance; profiles that sum to at most 100% stay below 201
+MAX_DISTANCE = np.iinfo(np.uint8).max
+
+# Rows compared per block when building, bounding memory to BLOCK_ROWS x oils x acids
+BLOCK_ROWS = 256
+
+
+def fatty_acid_distances(rows, others):
+    """Summed absolute fatty acid differences between each of rows and each of others
+
+    Acids are summed in FATTY_ACIDS order, like the loop in calculateOilSimilarity.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    others = np.asarray(others, dtype=np.float64)
+    total = np.zeros((len(rows), len(others)))
+    for acid in range(len(FATTY_ACIDS)):
+        total += np.abs(rows[:, None, acid] - others[None, :, acid])
+    return total
+
+
+def quantize(distances):
+    """Round distances to whole percentage points and clip them into uint8
+
+    Seed profiles are whole percentages, so their distances are stored
+    exactly. Ingested or custom oils may carry decimal fatty acids; their
+    distances are off by up to half a point, which moves a similarity by at
+    most 0.5 / 800 (and the recommender's 20 x similarity penalty by 0.0125).
+    """
+    return np.clip(np.floor(distances + 0.5), 0, MAX_DISTANCE).astype(np.uint8)
+
+
+def distance_similarity(distances):
+    """calculateOilSimilarity from summed fatty acid distances"""
+    return np.maximum(0, 1 - (np.asarray(distances, dtype=np.float64) / len(FATTY_ACIDS)) / 100)
+
+
+class SimilarityIndex:
+    """N x N oil similarity as uint8 fatty acid distances
+
+    The matrix lives in a buffer with spare capacity, so adding a custom oil
+    fills in one row and one column rather than rebuilding or copying the
+    whole matrix.
+    """
+
+    def __init__(self, ids, fatty_acids, distances):
+        n = len(ids)
+        fatty_acids = np.asarray(fatty_acids, dtype=np.float64)
+        if fatty_acids.shape != (n, len(FATTY_ACIDS)) or np.shape(distances) != (n, n):
+            raise ValueError(f"Expected {n} fatty acid profiles and a {n}x{n} distance matrix")
+
+        self.ids = list(ids)
+        self.index = {oil_id: i for i, oil_id in enumerate(self.ids)}
+        self._fatty_acids = fatty_acids.copy()
+        self._distances = np.array(distances, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, oil_id):
+        return oil_id in self.index
+
+    @property
+    def fatty_acids(self):
+        return self._fatty_acids[:len(self)]
+
+    @property
+    def distances(self):
+        n = len(self)
+        return self._distances[:n, :n]
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Build the full matrix from an OilCatalog, BLOCK_ROWS oils at a time"""
+        fatty_acids = catalog.fatty_acids.astype(np.float64)
+        distances = np.empty((len(catalog), len(catalog)), dtype=np.uint8)
+        for start in range(0, len(catalog), BLOCK_ROWS):
+            block = fatty_acids[start:start + BLOCK_ROWS]
+            distances[start:start + len(block)] = quantize(fatty_acid_distances(block, fatty_acids))
+        return cls(catalog.ids, fatty_acids, distances)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'].tolist(), data['fatty_acids'], data['distances'])
+
+    def save(self, path=DEFAULT_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, ids=np.array(self.ids), fatty_acids=self.fatty_acids,
+                                distances=self.distances)
+
+    def matches(self, catalog):
+        """Whether this index was built from exactly these oils and profiles"""
+        return (self.ids == catalog.ids and
+                np.array_equal(self.fatty_acids, catalog.fatty_acids.astype(np.float64)))
+
+    def rows(self, oil_ids):
+        """Index rows for a sequence of oil ids"""
+        try:
+            return np.array([self.index[oil_id] for oil_id in oil_ids], dtype=np.intp)
+        except KeyError as e:
+            raise KeyError(f"Unknown oil id: {e.args[0]}") from None
+
+    def similarity(self, rows, others):
+        """calculateOilSimilarity between each of rows and each of others, as a (rows x others) array"""
+        rows = np.atleast_1d(rows)
+        others = np.atleast_1d(others)
+        similarity = distance_similarity(self._distances[rows[:, None], others[None, :]])
+        similarity[rows[:, None] == others[None, :]] = 1
+        return similarity
+
+    def nearest(self, oil_id, k=5):
+        """The k most similar other oils as (oil_id, similarity) pairs, most similar first"""
+        i = self.index[oil_id]
+        closeness = -self.distances[i].astype(np.int16)
+        closeness[i] = np.iinfo(np.int16).min
+        neighbours = top_k(closeness, min(k, len(self) - 1))
+        similarity = distance_similarity(self.distances[i, neighbours])
+        return [(self.ids[j], float(s)) for j, s in zip(neighbours, similarity)]
+
+    def set_oil(self, oil_id, fatty_acids):
+        """Add or edit one oil, updating only its row and column"""
+        profile = np.array([float(fatty_acids.get(acid, 0)) for acid in FATTY_ACIDS])
+
+        i = self.index.get(oil_id)
+        if i is None:
+            i = len(self)
+            self._reserve(i + 1)
+            self.ids.append(oil_id)
+            self.index[oil_id] = i
+
+        self._fatty_acids[i] = profile
+        row = quantize(fatty_acid_distances(profile[None, :], self.fatty_acids))[0]
+        self._distances[i, :len(row)] = row
+        self._distances[:len(row), i] = row
+
+    def _reserve(self, n):
+        """Grow the buffers geometrically so repeated additions stay amortized O(N)"""
+        capacity = len(self._distances)
+        if n <= capacity:
+            return
+        capacity = max(n, 2 * capacity)
+        size = len(self)
+
+        distances = np.zeros((capacity, capacity), dtype=np.uint8)
+        distances[:size, :size] = self.distances
+        fatty_acids = np.zeros((capacity, len(FATTY_ACIDS)))
+        fatty_acids[:size] = self.fatty_acids
+        self._distances = distances
+        self._fatty_acids = fatty_acids
+
+
+def load_similarity_index(catalog, path=DEFAULT_PATH):
+    """The shipped index when it matches catalog, otherwise one built from catalog"""
+    if Path(path).exists():
+        index = SimilarityIndex.load(path)
+        if index.matches(catalog):
+            return index
+    return SimilarityIndex.from_catalog(catalog)
@@ -0,0 +1,41 @@
+"""
+Startup timing
+Splits a CLI's cold start into phases (imports, catalog load, ...) for
+--timing. Import this before anything heavy: the clock starts here, so
+interpreter startup itself is not counted.
+"""
+
+import time
+
+STARTED = time.perf_counter()
+
+_phases = []  # (name, seconds)
+_notes = {}   # phase name -> detail shown beside it
+_last = STARTED
+
+
+def mark(name):
+    """End phase name now; it covers everything since the previous mark"""
+    global _last
+    now = time.perf_counter()
+    _phases.append((name, now - _last))
+    _last = now
+
+
+def note(name, detail):
+    """Detail to show beside phase name, e.g. where the catalog came from"""
+    _notes[name] = detail
+
+
+def phases():
+    return list(_phases)
+
+
+def report():
+    """One-line summary for stderr"""
+    parts = []
+    for name, seconds in _phases:
+        detail = f" ({_notes[name]})" if name in _notes else ''
+        parts.append(f"{name} {seconds * 1000:.1f} ms{detail}")
+    total = sum(seconds for _, seconds in _phases)
+    return f"⏱️  Startup: {', '.join(parts)}; total {total * 1000:.1f} ms"
@@ -0,0 +1,205 @@
+"""
+Monte Carlo tolerance analysis
+Supplier lots differ from the catalog's SAP, iodine and fatty acid values.
+Draws many lots per oil and reports how far the lye needed and the real
+superfat can move from calculateLyeWeight's answer, and how often each
+soap quality falls out of range.
+"""
+
+from collections import namedtuple
+import json
+
+import numpy as np
+
+from .batch import chunked, parse_recipe, read_recipes
+from .catalog import FATTY_ACID_COLUMNS, INS, IODINE, SAP
+from .engine import QUALITIES, QUALITY_MATRIX, get_quality_ranges, js_round, lye_weights, oil_weights
+
+# How one property varies between lots: distribution is 'normal' (scale is
+# the standard deviation), 'uniform' or 'triangular' (scale is the half
+# width) or 'none'; relative scales are fractions of the catalog value,
+# absolute ones are in the property's own units
+Variation = namedtuple('Variation', ['distribution', 'scale', 'relative'])
+
+DISTRIBUTIONS = ('normal', 'uniform', 'triangular', 'none')
+
+DEFAULT_VARIATION = {
+    'sap': Variation('normal', 0.02, True),
+    'iodine': Variation('normal', 0.05, True),
+    'fatty_acids': Variation('normal', 1.0, False),  # percentage points
+}
+
+DEFAULT_DRAWS = 100000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SEED = 42
+
+# Draws simulated at once, bounding memory to DRAW_BLOCK x oils x fatty acids
+DRAW_BLOCK = 16384
+
+# Recipes handed to a worker per task
+DEFAULT_CHUNK_SIZE = 8
+
+
+def variation(distribution='normal', scale=0.0, relative=False):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution} (expected one of {', '.join(DISTRIBUTIONS)})")
+    if scale < 0:
+        raise ValueError("Variation scale must not be negative")
+    return Variation(distribution, float(scale), bool(relative))
+
+
+def perturb(rng, values, spec, size):
+    """(size x *values.shape) float64 draws of values under one Variation"""
+    values = np.asarray(values, dtype=np.float64)
+    shape = (size,) + values.shape
+    if spec.distribution == 'none' or spec.scale == 0:
+        return np.broadcast_to(values, shape).copy()
+    if spec.distribution == 'normal':
+        noise = rng.standard_normal(shape, dtype=np.float32)
+    elif spec.distribution == 'uniform':
+        noise = rng.uniform(-1, 1, shape).astype(np.float32)
+    else:
+        noise = rng.triangular(-1, 0, 1, shape).astype(np.float32)
+    noise = noise * spec.scale
+    return values * (1 + noise) if spec.relative else values + noise
+
+
+def _interval(values, confidence):
+    low, high = np.percentile(values, [50 * (1 - confidence), 50 * (1 + confidence)])
+    return {'mean': round(float(values.mean()), 4), 'low': round(float(low), 4), 'high': round(float(high), 4)}
+
+
+def simulate_recipe(catalog, percentages, inputs, soap_type='hard', draws=DEFAULT_DRAWS, variations=None,
+                    confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED):
+    """Tolerance report for one recipe: ({oil_id: percentage}, batch.DEFAULT_INPUTS-style inputs)
+
+    Each draw gives every oil its own lot. SAP and iodine vary as the
+    variations say, fatty acids vary per acid (acids an oil lacks stay at 0,
+    the rest are clipped at 0), and INS follows SAP x 1000 - iodine. The lye actually weighed is the nominal
+    calculateLyeWeight result, so a draw's real superfat is what that lye
+    leaves unsaponified in its lot.
+    """
+    variations = dict(DEFAULT_VARIATION, **(variations or {}))
+    rng = np.random.default_rng(seed)
+    oil_ids = list(percentages)
+    rows = catalog.indices(oil_ids)
+    shares = np.array([percentages[oil_id] for oil_id in oil_ids], dtype=np.float64)
+    total_share = shares.sum()
+    if total_share <= 0:
+        raise ValueError("Recipe has no oils")
+
+    dense = np.zeros((1, len(catalog)))
+    dense[0, rows] = shares
+    weights = oil_weights(dense, inputs['total_oil_weight'])
+    lye = float(lye_weights(catalog, weights, inputs['lye_type'], inputs['superfat'])[0])
+    oil_weight = weights[0, rows]
+    superfat_factor = 1 - inputs['superfat'] / 100
+
+    properties = catalog.matrix[rows].astype(np.float64)
+    acids = properties[:, FATTY_ACID_COLUMNS]
+    sap = catalog.sap_column(inputs['lye_type'])[rows]
+    ranges = get_quality_ranges(soap_type)
+    low = np.array([ranges[q]['min'] for q in QUALITIES])
+    high = np.array([ranges[q]['max'] for q in QUALITIES])
+    ideal_low = np.array([ranges[q]['ideal']['min'] for q in QUALITIES])
+    ideal_high = np.array([ranges[q]['ideal']['max'] for q in QUALITIES])
+    quality_matrix = QUALITY_MATRIX.astype(np.float64)
+    mix = shares / total_share
+
+    required = np.empty(draws)
+    superfat = np.empty(draws)
+    qualities = np.empty((draws, len(QUALITIES)), dtype=np.int16)
+    for start in range(0, draws, DRAW_BLOCK):
+        size = min(DRAW_BLOCK, draws - start)
+        lot_sap = perturb(rng, sap, variations['sap'], size)
+        lot_iodine = perturb(rng, properties[:, IODINE], variations['iodine'], size)
+        lot_acids = perturb(rng, acids, variations['fatty_acids'], size)
+        lot_acids = np.where(acids > 0, np.maximum(lot_acids, 0), 0)
+        lot_ins = properties[:, INS] + 1000 * (lot_sap - sap) - (lot_iodine - properties[:, IODINE])
+
+        full_lye = lot_sap @ oil_weight
+        required[start:start + size] = full_lye * superfat_factor
+        superfat[start:start + size] = 100 * (1 - lye / full_lye)
+
+        weighted = np.empty((size, properties.shape[1]))
+        weighted[:, SAP] = lot_sap @ mix
+        weighted[:, IODINE] = lot_iodine @ mix
+        weighted[:, INS] = lot_ins @ mix
+        weighted[:, FATTY_ACID_COLUMNS] = mix @ lot_acids
+        qualities[start:start + size] = js_round(weighted @ quality_matrix)
+
+    nominal = js_round(shares @ properties / total_share @ quality_matrix).astype(int)
+    report = {
+        'draws': draws,
+        'confidence': confidence,
+        'lye_weight': lye,
+        'lye_required': _interval(required, confidence),
+        'superfat': dict(
+            _interval(superfat, confidence),
+            nominal=inputs['superfat'],
+            p_lye_heavy=float((superfat < 0).mean()),
+        ),
+        'qualities': {},
+    }
+    for i, name in enumerate(QUALITIES):
+        values = qualities[:, i]
+        report['qualities'][name] = dict(
+            _interval(values, confidence),
+            nominal=int(nominal[i]),
+            p_out_of_range=float(((values < low[i]) | (values > high[i])).mean()),
+            p_outside_ideal=float(((values < ideal_low[i]) | (values > ideal_high[i])).mean()),
+        )
+    return report
+
+
+def soap_type_of(recipe, inputs):
+    """The recipe's soapType, or the one the calculator pairs with its lye type"""
+    soap_type = recipe.get('soap_type') or recipe.get('inputs', {}).get('soapType')
+    if soap_type is None:
+        return 'liquid' if inputs['lye_type'] == 'KOH' else 'hard'
+    if soap_type not in ('hard', 'liquid'):
+        raise ValueError(f"Unknown soap type: {soap_type}")
+    return soap_type
+
+
+def simulate_chunk(catalog, item):
+    """JSONL report lines and error count for one (settings, [(line, recipe)]) chunk; runs in pool workers
+
+    Every recipe draws from its own stream, seeded by the run seed and its
+    line number, so results do not depend on chunking or worker count.
+    """
+    settings, chunk = item
+    lines, errors = [], 0
+    for line_number, recipe in chunk:
+        if isinstance(recipe, str):
+            result = {'line': line_number, 'error': recipe}
+        else:
+            try:
+                percentages, inputs = parse_recipe(recipe)
+                result = {'id': recipe.get('id')}
+                result.update(simulate_recipe(
+                    catalog, percentages, inputs, soap_type_of(recipe, inputs), settings['draws'],
+                    settings['variations'], settings['confidence'], [settings['seed'], line_number],
+                ))
+            except (KeyError, TypeError, ValueError) as e:
+                result = {'id': recipe.get('id'), 'line': line_number, 'error': e.args[0] if e.args else str(e)}
+        errors += 'error' in result
+        lines.append(json.dumps(result))
+    return lines, errors
+
+
+def simulate_lines(catalog, lines, draws=DEFAULT_DRAWS, variations=None, confidence=DEFAULT_CONFIDENCE,
+                   seed=DEFAULT_SEED, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """Yield (JSONL report lines, error count) per chunk of JSONL recipe lines, in input order
+
+    workers other than 1 shard chunks across a CatalogPool (0 or None for every core).
+    """
+    settings = {'draws': draws, 'variations': variations, 'confidence': confidence, 'seed': seed}
+    items = ((settings, chunk) for chunk in chunked(read_recipes(lines), chunk_size))
+    if workers == 1:
+        for item in items:
+            yield simulate_chunk(catalog, item)
+        return
+    from .parallel import CatalogPool
+    with CatalogPool(catalog, workers or None) as pool:
+        yield from pool.imap(simulate_chunk, items)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Keep a local SQLite replica of the oil catalog in sync
+Creates the replica from the seed oils on first run, then applies upserts
+and deletes from a change feed: a JSONL change log or the Postgres
+oil_changes table (see --postgres-schema)
+
+Usage:
+    python sync_catalog.py catalog.db
+    python sync_catalog.py catalog.db --feed oil_changes.jsonl --export-dir snapshots/
+    python sync_catalog.py catalog.db --postgres "$DATABASE_URL"
+    python serve_recipes.py --replica catalog.db
+"""
+
+import argparse
+import sys
+
+from soapcalc import startup  # first, so --timing counts the imports below
+from soapcalc.replica import POSTGRES_CHANGE_LOG, SYNC_LAG, FileChangeFeed, PostgresChangeFeed, Replica
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('replica', nargs='?', help="SQLite replica file, created if missing")
+    feed = parser.add_mutually_exclusive_group()
+    feed.add_argument('--feed', help="JSONL change log to apply")
+    feed.add_argument('--postgres', metavar='DSN', help="Apply changes from the oil_changes table (needs psycopg)")
+    parser.add_argument('--seed', action='store_true',
+                        help="Rebuild from the seed oils; a later feed replays from its start")
+    parser.add_argument('--lag', type=int, default=SYNC_LAG,
+                        help=f"Feed entries below the last applied one to read again for late commits "
+                             f"(default: {SYNC_LAG})")
+    parser.add_argument('--export-dir', help="Also write the synced snapshot here as a versioned binary catalog")
+    parser.add_argument('--postgres-schema', action='store_true',
+                        help="Print the SQL creating the oil_changes table and its trigger, then exit")
+    parser.add_argument('--timing', action='store_true', help="Report import and sync times on stderr")
+    args = parser.parse_args(argv)
+    if not args.replica and not args.postgres_schema:
+        parser.error("the replica file is required")
+    return args
+
+
+def main(argv=None):
+    startup.mark('imports')
+    args = parse_args(argv)
+    if args.postgres_schema:
+        print(POSTGRES_CHANGE_LOG.strip())
+        return 0
+
+    try:
+        with Replica(args.replica) as replica:
+            if args.seed or replica.version == 0:
+                from soapcalc import load_catalog
+                catalog = load_catalog()
+                count = replica.materialize(catalog.oil(oil_id) for oil_id in catalog.ids)
+                print(f"📁 Seeded {count} oils into {args.replica}", file=sys.stderr)
+            startup.mark('seed')
+
+            applied = 0
+            if args.feed or args.postgres:
+                feed = FileChangeFeed(args.feed) if args.feed else PostgresChangeFeed(args.postgres)
+                applied = replica.sync(feed, args.lag)
+            startup.mark('sync')
+
+            if args.export_dir:
+                path = replica.export_snapshot(args.export_dir)
+                print(f"📁 Snapshot: {path}", file=sys.stderr)
+                startup.mark('export')
+            version, sequence, oils = replica.version, replica.sequence, len(replica)
+    except (OSError, RuntimeError, ValueError, KeyError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    if args.timing:
+        print(startup.report(), file=sys.stderr)
+    print(f"✅ Replica v{version}: {oils} oils, {applied} changes applied (feed sequence {sequence})", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
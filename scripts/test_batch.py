@@ -0,0 +1,103 @@
+"""
+Batch recipe evaluation: chunked results match evaluate() and bad lines become error records
+
+Usage:
+    python -m pytest -q test_batch.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from soapcalc import evaluate, load_catalog
+from soapcalc.batch import evaluate_chunk, evaluate_lines, evaluate_stream, parse_recipe
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def random_recipes(catalog, count, seed=0):
+    """Recipes of 1 to 5 random oils at 0.1% percentages, with mixed inputs"""
+    rng = np.random.default_rng(seed)
+    recipes = []
+    for i in range(count):
+        oils = rng.choice(catalog.ids, size=rng.integers(1, 6), replace=False)
+        shares = np.round(100 * rng.dirichlet(np.ones(len(oils))), 1)
+        shares[0] += 100 - shares.sum()
+        recipes.append({
+            'id': f'r{i}',
+            'oils': {str(oil_id): float(p) for oil_id, p in zip(oils, shares)},
+            'total_oil_weight': float(rng.choice([500, 1000, 1234.5])),
+            'superfat': float(rng.choice([0, 5, 8])),
+            'lye_type': str(rng.choice(['NaOH', 'KOH'])),
+            'water_method': str(rng.choice(['water_as_percent_of_oils', 'lye_concentration'])),
+            'water_value': float(rng.choice([30, 38])),
+        })
+    return recipes
+
+
+def evaluate_one(catalog, recipe):
+    matrix = np.zeros((1, len(catalog)))
+    matrix[0, catalog.indices(list(recipe['oils']))] = list(recipe['oils'].values())
+    return evaluate(catalog, matrix, recipe['total_oil_weight'], recipe['superfat'], recipe['water_method'],
+                    recipe['water_value'], recipe['lye_type'])
+
+
+def test_chunk_matches_evaluate(catalog):
+    recipes = random_recipes(catalog, 200)
+    results = evaluate_chunk(catalog, list(enumerate(recipes, 1)))
+    for recipe, result in zip(recipes, results):
+        single = evaluate_one(catalog, recipe)
+        assert result['id'] == recipe['id']
+        assert result['lye_weight'] == float(single.lye_weight[0])
+        assert result['water_weight'] == float(single.water_weight[0])
+        assert result['total_batch_weight'] == float(single.total_batch_weight[0])
+        assert list(result['qualities'].values()) == single.qualities[0].tolist()
+
+
+def test_stream_results_do_not_depend_on_chunk_size(catalog):
+    lines = [json.dumps(recipe) for recipe in random_recipes(catalog, 50)]
+    whole = list(evaluate_stream(catalog, lines, chunk_size=50))
+    for chunked, result in zip(evaluate_stream(catalog, lines, chunk_size=7), whole, strict=True):
+        # BLAS may sum a different number of rows in another order, so profiles can differ in the last bit
+        fatty_acids = chunked.pop('fatty_acids')
+        assert list(fatty_acids.values()) == pytest.approx(list(result.pop('fatty_acids').values()), abs=1e-9)
+        assert chunked == result
+
+
+def test_bad_lines_become_error_records(catalog):
+    lines = ['{"id": "ok", "oils": {"olive-oil": 100}}', '', 'not json', '[1, 2]',
+             '{"id": "unknown", "oils": {"no-such-oil": 100}}', '{"id": "neg", "oils": {"olive-oil": -1}}']
+    results, errors = evaluate_lines(catalog, (10, lines))
+    results = [json.loads(result) for result in results]
+    assert errors == 4
+    assert 'qualities' in results[0]
+    assert [r.get('line') for r in results[1:]] == [12, 13, 14, 15]
+    assert results[3]['error'] == 'Unknown oil id: no-such-oil'
+
+
+def test_saved_recipe_form():
+    percentages, inputs = parse_recipe({
+        'inputs': {'totalOilWeight': 800, 'lyeType': 'KOH', 'superfatPercentage': 3},
+        'selectedOils': [{'id': 'olive-oil', 'percentage': 60}, {'id': 'coconut', 'percentage': 30},
+                         {'id': 'olive-oil', 'percentage': 10}],
+    })
+    assert percentages == {'olive-oil': 70.0, 'coconut': 30.0}
+    assert (inputs['total_oil_weight'], inputs['lye_type'], inputs['superfat']) == (800.0, 'KOH', 3.0)
+
+
+@pytest.mark.parametrize('recipe, message', [
+    ({'oils': {'olive-oil': 'nan'}}, 'Percentage of olive-oil'),
+    ({'oils': {'olive-oil': 100}, 'superfat': -5}, 'superfat'),
+    ({'oils': {'olive-oil': 100}, 'total_oil_weight': 'inf'}, 'total_oil_weight'),
+    ({'oils': {'olive-oil': 100}, 'water_method': 'lye_concentration', 'water_value': 0}, 'water_value'),
+    ({'oils': {'olive-oil': 100}, 'lye_type': 'LiOH'}, 'Unknown lye type'),
+    ({'inputs': {'waterValue': -1}, 'selectedOils': []}, 'waterValue'),
+    ({'inputs': {}, 'selectedOils': [{'id': 'olive-oil'}]}, 'selectedOils entry 1 has no percentage'),
+])
+def test_parse_recipe_rejects(recipe, message):
+    with pytest.raises(ValueError, match=message):
+        parse_recipe(recipe)
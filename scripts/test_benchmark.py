@@ -0,0 +1,57 @@
+"""
+Benchmark harness: synthetic catalogs and recipes, and regression checks against a baseline
+
+Usage:
+    python -m pytest -q test_benchmark.py
+"""
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.benchmark import OPERATIONS, compare, run_benchmarks, synthetic_catalog, synthetic_recipes
+from soapcalc.catalog import FATTY_ACID_COLUMNS
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def test_synthetic_catalog_keeps_the_seed_oils(catalog):
+    grown = synthetic_catalog(catalog, 500)
+    assert len(grown) == 500 and len(set(grown.ids)) == 500
+    assert grown.ids[:len(catalog)] == catalog.ids
+    assert np.array_equal(grown.matrix[:len(catalog)], catalog.matrix)
+    # Scaled to 100% before rounding, so each of the eight acids can round up half a point
+    assert (grown.matrix[len(catalog):, FATTY_ACID_COLUMNS].sum(axis=1) <= 104).all()
+    assert np.array_equal(synthetic_catalog(catalog, 500).matrix, grown.matrix)
+    assert synthetic_catalog(catalog, 10).ids == catalog.ids[:10]
+
+
+def test_synthetic_recipes_add_up_to_100(catalog):
+    recipes = synthetic_recipes(np.arange(len(catalog)), 50, max_oils=8)
+    for recipe in recipes:
+        assert 1 <= len(recipe.rows) <= 8 and len(set(recipe.rows.tolist())) == len(recipe.rows)
+        assert recipe.percentages.sum() == pytest.approx(100)
+    assert [recipe.soap_type for recipe in recipes[:2]] == ['hard', 'liquid']
+
+
+def test_run_benchmarks_reports_every_operation(catalog):
+    report = run_benchmarks(catalog, sizes=(len(catalog), 300), samples=5)
+    operations = [(r['operation'], r['oils']) for r in report['results']]
+    for oils in (len(catalog), 300):
+        assert [(name, oils) for name in OPERATIONS] + [('recommender_setup', oils)] == \
+            [key for key in operations if key[1] == oils]
+    assert all(r['p50_us'] <= r['p95_us'] <= r['p99_us'] for r in report['results'])
+
+
+def test_compare_flags_slower_results_only():
+    def result(operation, p50, samples=10):
+        return {'operation': operation, 'oils': 150, 'samples': samples, 'p50_us': p50}
+    baseline = {'results': [result('qualities', 10), result('recommend', 100), result('recommender_setup', 5, 1)]}
+    report = {'results': [result('qualities', 12.5), result('recommend', 115), result('recommender_setup', 50, 1),
+                          result('lye_water', 1)]}
+    assert compare(report, baseline) == [{'operation': 'qualities', 'oils': 150, 'baseline_p50_us': 10,
+                                          'p50_us': 12.5, 'ratio': 1.25}]
+    assert compare(report, baseline, tolerance=0.3) == []
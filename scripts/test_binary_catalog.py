@@ -0,0 +1,87 @@
+"""
+Binary catalog round trip, and rejection of stale, foreign and truncated files
+
+Usage:
+    python -m pytest -q test_binary_catalog.py
+"""
+
+import mmap
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.binary_catalog import HEADER, BinaryCatalog, _current, load_binary_catalog, write_binary_catalog
+
+DIGEST = b'\x01' * 32
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+@pytest.fixture
+def written(catalog, tmp_path):
+    path = str(tmp_path / 'oils.bin')
+    write_binary_catalog(catalog, path, DIGEST)
+    return path
+
+
+@pytest.fixture
+def maps(monkeypatch):
+    """Every mapping BinaryCatalog opens"""
+    opened, real = [], mmap.mmap
+
+    def record(*args, **kwargs):
+        opened.append(real(*args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr(mmap, 'mmap', record)
+    return opened
+
+
+def test_round_trip(catalog, written):
+    loaded = load_binary_catalog(written)
+    assert loaded.ids == catalog.ids
+    assert loaded.names == catalog.names
+    assert loaded.categories == catalog.categories
+    assert np.array_equal(loaded.matrix, catalog.matrix)
+
+
+def test_lookup_by_id(catalog, written):
+    mapped = BinaryCatalog(written)
+    assert mapped.find('olive-oil') == catalog.index['olive-oil']
+    assert mapped.find('no-such-oil') == -1
+
+
+def test_current_closes_stale_catalogs(written, maps):
+    assert _current(written, b'\x02' * 32) is None
+    assert maps[-1].closed
+    assert _current(written, DIGEST) is not None
+
+
+@pytest.mark.parametrize('damage', ['magic', 'truncated', 'short header', 'offset'])
+def test_corrupt_files_are_rejected_and_unmapped(written, maps, damage):
+    with open(written, 'rb') as f:
+        data = bytearray(f.read())
+    if damage == 'magic':
+        data[:8] = b'NOTACAT\x00'
+    elif damage == 'truncated':
+        data = data[:len(data) - 100]
+    elif damage == 'short header':
+        data = data[:HEADER.size - 1]
+    else:
+        fields = list(HEADER.unpack_from(data))
+        fields[-1] += 1 << 20  # properties offset past the end
+        data[:HEADER.size] = HEADER.pack(*fields)
+    with open(written, 'wb') as f:
+        f.write(data)
+
+    with pytest.raises(ValueError):
+        BinaryCatalog(written)
+    assert maps[-1].closed
+    assert _current(written, DIGEST) is None
+
+
+def test_missing_file_is_not_current(tmp_path):
+    assert _current(str(tmp_path / 'missing.bin'), DIGEST) is None
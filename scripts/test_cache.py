@@ -0,0 +1,110 @@
+"""
+Recipe cache: canonical keys, LRU and TTL expiry, per-oil invalidation and copies on every hit
+
+Usage:
+    python -m pytest -q test_cache.py
+"""
+
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.cache import ALL_OILS, CachedEvaluator, LRUCache, canonical_recipe, recipe_fingerprint
+from soapcalc.recommend import Recommender
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def test_canonical_recipe_sums_ids_and_rounds_to_tenths():
+    assert canonical_recipe([('olive-oil', 40.04), ('coconut', 30), ('olive-oil', 29.96)]) == \
+        (('coconut', 300), ('olive-oil', 700))
+    assert canonical_recipe({'coconut': 30, 'olive-oil': 70}) == canonical_recipe({'olive-oil': 70.0, 'coconut': 30})
+    assert recipe_fingerprint(canonical_recipe({'olive-oil': 100}), 'hard') != \
+        recipe_fingerprint(canonical_recipe({'olive-oil': 100}), 'liquid')
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache and 'b' not in cache and 'c' in cache
+    assert cache.stats['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None and len(cache) == 0
+    assert cache.stats['expirations'] == 1
+
+
+def test_invalidate_oil_drops_only_dependent_entries():
+    cache = LRUCache()
+    cache.put('olive', 1, ['olive-oil'])
+    cache.put('blend', 2, ['olive-oil', 'coconut'])
+    cache.put('palm', 3, ['palm-oil'])
+    cache.put('everything', 4, (ALL_OILS,))
+    assert cache.invalidate_oil('coconut') == 2
+    assert 'olive' in cache and 'palm' in cache
+    assert 'blend' not in cache and 'everything' not in cache
+    assert cache.invalidate_oil('olive-oil') == 1
+    assert cache.invalidate_oil('olive-oil') == 0
+    assert cache._by_oil == {'palm-oil': {'palm'}}
+
+
+def test_get_and_get_or_compute_hand_out_copies():
+    cache = LRUCache()
+    computed = cache.get_or_compute('a', ['olive-oil'], lambda: {'values': [1, 2]})
+    computed['values'].append(3)
+    hit = cache.get('a')
+    assert hit == {'values': [1, 2]}
+    hit['values'].clear()
+    assert cache.get_or_compute('a', ['olive-oil'], lambda: pytest.fail('recomputed')) == {'values': [1, 2]}
+
+
+def test_evaluator_matches_the_recommender(catalog):
+    evaluator = CachedEvaluator(catalog)
+    recipe = {'olive-oil': 50, 'coconut': 30, 'palm-oil': 20}
+    assert evaluator.evaluate(recipe) == Recommender(catalog).evaluate(recipe)
+    assert evaluator.evaluate(recipe) == evaluator.evaluate({'palm-oil': 20.01, 'coconut': 30, 'olive-oil': 49.99})
+    assert (evaluator.cache.stats['hits'], evaluator.cache.stats['misses']) == (2, 1)
+
+
+def test_evaluate_many_results_are_independent_copies(catalog):
+    evaluator = CachedEvaluator(catalog)
+    recipe = {'olive-oil': 60, 'coconut': 40}
+    first, second, bad = evaluator.evaluate_many([(recipe, 'hard', 5, 25), (recipe, 'hard', 5, 25),
+                                                  ({'no-such-oil': 100}, 'hard', 5, 25)])
+    assert isinstance(bad, Exception) and len(evaluator.cache) == 1
+    assert first == second and first is not second
+    first['recommendations'].clear()
+    assert evaluator.evaluate(recipe) == second
+    assert evaluator.evaluate_many([(recipe, 'hard', 5, 25)]) == [second]
+
+
+def test_oil_edits_drop_dependent_results(catalog):
+    evaluator = CachedEvaluator(catalog)
+    evaluator.qualities({'olive-oil': 100})
+    evaluator.qualities({'coconut': 100})
+    evaluator.evaluate({'coconut': 100})
+    olive = dict(catalog.oil('olive-oil'), fatty_acids={'oleic': 90, 'palmitic': 10})
+    assert evaluator.set_oil(olive) == 2
+    assert evaluator.qualities({'olive-oil': 100})['fattyAcids']['oleic'] == pytest.approx(90)
+    assert evaluator.remove_oil('palm-oil') == 0
+    assert len(evaluator.cache) == 2
@@ -0,0 +1,75 @@
+"""
+COPY export: text escaping, CSV quoting and numbered chunk files
+
+Usage:
+    python -m pytest -q test_copy_export.py
+"""
+
+import csv
+
+import pytest
+
+from generate_oils_sql import OIL_COLUMNS, chunk_path, copy_fields, copy_text_line, parse_oils, write_copy
+
+
+@pytest.fixture(scope='module')
+def oils():
+    return parse_oils()
+
+
+def data_lines(path):
+    """Header and data lines of one COPY script, checking it ends with the \\. terminator"""
+    with open(path) as f:
+        lines = f.read().split('\n')
+    assert lines[-2:] == ['\\.', '']
+    return lines[0], lines[1:-2]
+
+
+def test_text_line_escapes_backslashes_and_separators():
+    line = copy_text_line(['a\\b', 'tab\there', 'two\nlines', 'cr\r'])
+    assert line == 'a\\\\b\ttab\\there\ttwo\\nlines\tcr\\r\n'
+
+
+def test_chunk_path_numbers_files():
+    assert chunk_path('out/oils_copy.sql', 12) == 'out/oils_copy.0012.sql'
+
+
+def test_text_copy_writes_one_row_per_oil(oils, tmp_path):
+    output = tmp_path / 'oils_copy.sql'
+    assert write_copy(oils, str(output)) == [str(output)]
+    header, rows = data_lines(output)
+    assert header == f"COPY oils ({', '.join(OIL_COLUMNS)}) FROM STDIN;"
+    assert rows == [copy_text_line(copy_fields(oil))[:-1] for oil in oils]
+
+
+def test_csv_copy_quotes_names_and_json(tmp_path):
+    oil = dict(parse_oils()[0], name='Oil, "special"\tblend')
+    output = tmp_path / 'oils_copy.sql'
+    write_copy([oil], str(output), 'csv', table='oils_staging')
+    header, rows = data_lines(output)
+    assert header.startswith('COPY oils_staging (') and header.endswith(' FROM STDIN WITH (FORMAT csv);')
+    assert list(csv.reader(rows)) == [copy_fields(oil)]
+
+
+def test_chunks_are_complete_copies(oils, tmp_path):
+    output = tmp_path / 'oils_copy.sql'
+    files = write_copy(oils, str(output), chunk_rows=50)
+    assert files == [chunk_path(str(output), n) for n in range(1, (len(oils) + 49) // 50 + 1)]
+    assert not output.exists()
+    written = []
+    for path in files:
+        header, rows = data_lines(path)
+        assert header.startswith('COPY oils (') and 0 < len(rows) <= 50
+        written += rows
+    assert written == [copy_text_line(copy_fields(oil))[:-1] for oil in oils]
+
+
+def test_duplicate_ids_keep_the_first_row(oils, tmp_path):
+    output = tmp_path / 'oils_copy.sql'
+    write_copy(oils[:3] + [dict(oils[0], name='Shadowed')], str(output))
+    _, rows = data_lines(output)
+    assert len(rows) == 3 and 'Shadowed' not in output.read_text()
+
+
+def test_no_oils_writes_no_files(tmp_path):
+    assert write_copy([], str(tmp_path / 'oils_copy.sql')) == []
@@ -0,0 +1,71 @@
+"""
+Exhaustive recipe search: branch and bound against brute-force enumeration
+
+Usage:
+    python -m pytest -q test_exhaustive.py
+"""
+
+from itertools import combinations, product
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog, quality_values, weighted_properties
+from soapcalc.engine import get_quality_ranges
+from soapcalc.exhaustive import search_recipes
+from soapcalc.optimizer import fit_penalty
+
+POOL = ['olive-oil', 'coconut', 'palm-oil', 'castor-oil', 'shea-butter', 'cocoa-butter']
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def penalties(catalog, recipes, ranges):
+    """fit_penalty of each {oil_id: percentage} recipe"""
+    matrix = np.zeros((len(recipes), len(catalog)))
+    for i, recipe in enumerate(recipes):
+        matrix[i, catalog.indices(list(recipe))] = list(recipe.values())
+    return fit_penalty(quality_values(weighted_properties(catalog, matrix)), ranges)
+
+
+def every_recipe(max_oils, step, include=()):
+    units = round(100 / step)
+    for parts in range(1, max_oils + 1):
+        for oils in combinations(POOL, parts):
+            if set(include) <= set(oils):
+                for split in product(range(1, units + 1), repeat=parts):
+                    if sum(split) == units:
+                        yield dict(zip(oils, (np.array(split) * step).tolist()))
+
+
+@pytest.mark.parametrize('soap_type, max_oils, include', [('hard', 2, ()), ('hard', 3, ()),
+                                                          ('hard', 3, ('olive-oil',)), ('liquid', 3, ())])
+def test_search_matches_brute_force(catalog, soap_type, max_oils, include):
+    step, top = 10, 5
+    ranges = get_quality_ranges(soap_type)
+    expected = np.sort(penalties(catalog, list(every_recipe(max_oils, step, include)), ranges))
+
+    found = search_recipes(catalog, max_oils, step, soap_type, top, POOL, include)
+    assert len(found) == top
+    assert all(set(include) <= set(recipe.percentages) for recipe in found)
+    assert all(len(recipe.percentages) <= max_oils for recipe in found)
+    searched = penalties(catalog, [recipe.percentages for recipe in found], ranges)
+    assert searched.tolist() == pytest.approx(expected[:top].tolist(), abs=1e-9)
+
+
+def test_workers_find_the_same_recipes(catalog):
+    alone = search_recipes(catalog, 3, 10, 'hard', 5, POOL)
+    assert search_recipes(catalog, 3, 10, 'hard', 5, POOL, workers=2) == alone
+
+
+@pytest.mark.parametrize('arguments, message', [
+    ({'step': 7}, 'must divide 100'),
+    ({'max_oils': 0}, 'max_oils must be between'),
+    ({'max_oils': 1, 'include': ('olive-oil', 'coconut')}, 'More required oils'),
+])
+def test_bad_arguments_raise(catalog, arguments, message):
+    with pytest.raises(ValueError, match=message):
+        search_recipes(catalog, oil_ids=POOL, **arguments)
@@ -0,0 +1,95 @@
+"""
+Incremental recipes: running sums against engine.evaluate, and adds, removes and refreshes
+
+Usage:
+    python -m pytest -q test_incremental.py
+"""
+
+import numpy as np
+import pytest
+
+from soapcalc import evaluate, load_catalog, weighted_properties
+from soapcalc.incremental import IncrementalRecipe
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def random_recipes(catalog, count, seed=0):
+    """{oil_id: percentage} recipes of 1 to 5 random oils adding up to 100"""
+    rng = np.random.default_rng(seed)
+    recipes = []
+    for _ in range(count):
+        oils = rng.choice(catalog.ids, size=rng.integers(1, 6), replace=False)
+        shares = np.round(100 * rng.dirichlet(np.ones(len(oils))), 1)
+        shares[0] += 100 - shares.sum()
+        recipes.append({str(oil_id): float(p) for oil_id, p in zip(oils, shares)})
+    return recipes
+
+
+def dense(catalog, recipe):
+    matrix = np.zeros((1, len(catalog)))
+    matrix[0, catalog.indices(list(recipe))] = list(recipe.values())
+    return matrix
+
+
+def test_incremental_matches_evaluate(catalog):
+    for recipe in random_recipes(catalog, 50):
+        incremental = IncrementalRecipe(catalog)
+        for oil_id, percentage in recipe.items():
+            incremental.add_oil(oil_id, percentage)
+        assert np.allclose(incremental.properties, weighted_properties(catalog, dense(catalog, recipe))[0])
+        single = evaluate(catalog, dense(catalog, recipe), 1000)
+        assert np.abs(incremental.qualities - single.qualities[0]).max() <= 1
+
+        rows = np.arange(len(catalog))
+        previews = incremental.preview_batch(rows, np.full(len(catalog), 10.0))
+        matrix = np.repeat(dense(catalog, recipe), len(catalog), axis=0)
+        matrix[rows, rows] += 10
+        expected = evaluate(catalog, matrix, 100).qualities
+        assert np.abs(previews - expected).max() <= 1
+
+
+def test_edits_match_a_fresh_recipe(catalog):
+    incremental = IncrementalRecipe(catalog, {'olive-oil': 50, 'coconut': 30, 'palm-oil': 20})
+    incremental.add_oil('coconut', 10)
+    incremental.set_percentage('castor-oil', 5)
+    incremental.remove_oil('palm-oil')
+    expected = {'olive-oil': 50, 'coconut': 40, 'castor-oil': 5}
+    assert incremental.percentages == expected
+    fresh = IncrementalRecipe(catalog, expected)
+    assert np.allclose(incremental.properties, fresh.properties)
+    sums = incremental.sums.copy()
+    incremental.refresh()
+    fresh.refresh()
+    assert np.allclose(incremental.sums, sums) and np.array_equal(incremental.sums, fresh.sums)
+
+
+def test_preview_does_not_change_the_recipe(catalog):
+    incremental = IncrementalRecipe(catalog, {'olive-oil': 100})
+    before = incremental.qualities
+    change = incremental.preview('coconut', 30)
+    assert np.array_equal(incremental.qualities, before)
+    applied = incremental.set_percentage('coconut', 30)
+    assert np.array_equal(change.qualities, applied.qualities)
+    assert np.array_equal(applied.changes, incremental.qualities - before)
+
+
+def test_emptied_recipe_resets_to_zero(catalog):
+    incremental = IncrementalRecipe(catalog, {'olive-oil': 33.3, 'coconut': 66.7})
+    incremental.remove_oil('olive-oil')
+    incremental.remove_oil('coconut')
+    assert len(incremental) == 0 and incremental.total == 0
+    assert not incremental.sums.any() and not incremental.qualities.any()
+
+
+def test_bad_edits_raise(catalog):
+    incremental = IncrementalRecipe(catalog, {'olive-oil': 100})
+    with pytest.raises(KeyError, match='Unknown oil id'):
+        incremental.add_oil('no-such-oil', 10)
+    with pytest.raises(KeyError, match='Oil not in recipe'):
+        incremental.remove_oil('coconut')
+    with pytest.raises(ValueError, match='Negative percentage'):
+        incremental.set_percentage('olive-oil', -1)
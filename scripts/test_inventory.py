@@ -0,0 +1,113 @@
+"""
+Inventory optimizer: price and stock files, stock limits, and warm re-solves against cold ones
+
+Usage:
+    python -m pytest -q test_inventory.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc import lp
+from soapcalc.inventory import InventoryOptimizer, read_amounts
+
+POOL = ['olive-oil', 'coconut', 'palm-oil', 'castor-oil', 'shea-butter', 'cocoa-butter']
+PRICES = {'olive-oil': 0.012, 'coconut': 0.006, 'palm-oil': 0.004, 'castor-oil': 0.015, 'shea-butter': 0.02,
+          'cocoa-butter': 0.03}
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def test_read_amounts_csv_skips_a_header(tmp_path):
+    path = tmp_path / 'prices.csv'
+    path.write_text('oil,price\nolive-oil, 1.5\n\ncoconut,2\n', encoding='utf-8')
+    assert read_amounts(str(path)) == {'olive-oil': 1.5, 'coconut': 2.0}
+
+
+def test_read_amounts_csv_rejects_a_bad_value(tmp_path):
+    path = tmp_path / 'stock.csv'
+    path.write_text('olive-oil,100\ncoconut,lots\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='Stock for coconut'):
+        read_amounts(str(path), 'Stock')
+
+
+def test_read_amounts_json(tmp_path):
+    path = tmp_path / 'prices.json'
+    path.write_text(json.dumps({'olive-oil': '1.25'}), encoding='utf-8')
+    assert read_amounts(str(path)) == {'olive-oil': 1.25}
+
+
+def test_stock_limits_the_recipe(catalog):
+    stock = {oil_id: 10000 for oil_id in POOL}
+    stock['palm-oil'] = 2000
+    result = InventoryOptimizer(catalog, PRICES, stock, 10000, oil_ids=POOL).solve()
+    assert sum(result.percentages.values()) == pytest.approx(100)
+    assert result.in_range
+    for oil_id, weight in result.weights.items():
+        assert weight <= stock[oil_id] + 0.01
+    assert result.percentages.get('palm-oil', 0) <= 20
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_lp_warm_resolve_matches_cold(seed):
+    rng = np.random.default_rng(seed)
+    c = rng.uniform(0.5, 2, size=6)
+    A_ub = np.vstack([rng.uniform(-1, 1, size=(3, 6)), np.eye(6)])
+    b_ub = np.concatenate([rng.uniform(0.5, 1, size=3), np.full(6, 0.6)])
+    A_eq, b_eq = np.ones((1, 6)), np.array([1.0])
+
+    program = lp.LinearProgram(c, A_ub, b_ub, A_eq, b_eq)
+    program.solve()
+    for _ in range(5):
+        c = c * rng.uniform(0.5, 1.5, size=6)
+        b_ub = b_ub.copy()
+        b_ub[3 + rng.integers(6)] = rng.uniform(0.2, 1)
+        program.set_costs(c)
+        program.set_b_ub(b_ub)
+        warm = program.solve()
+        cold = lp.solve(c, A_ub, b_ub, A_eq, b_eq)
+        assert warm.status == cold.status
+        if cold.status == 'optimal':
+            assert warm.objective == pytest.approx(cold.objective, abs=1e-7)
+
+
+def cost(optimizer):
+    """Cost of the optimizer's recipe, or its error message"""
+    try:
+        return optimizer.solve().cost
+    except ValueError as e:
+        return str(e)
+
+
+def test_warm_resolve_matches_a_fresh_optimizer(catalog):
+    stock = {oil_id: 10000 for oil_id in POOL}
+    optimizer = InventoryOptimizer(catalog, PRICES, stock, 10000, oil_ids=POOL)
+    optimizer.solve()
+    edits = [('price', 'palm-oil', 0.05), ('stock', 'coconut', 2500), ('price', 'shea-butter', None),
+             ('stock', 'castor-oil', 300), ('price', 'palm-oil', 0.003), ('stock', 'olive-oil', 3000),
+             ('price', 'shea-butter', 0.005), ('stock', 'coconut', 1500)]
+    prices, stock = dict(PRICES), dict(stock)
+    for kind, oil_id, value in edits:
+        if kind == 'price':
+            optimizer.set_price(oil_id, value)
+            if value is None:
+                prices.pop(oil_id)
+            else:
+                prices[oil_id] = value
+        else:
+            optimizer.set_stock(oil_id, value)
+            stock[oil_id] = value
+        warm = cost(optimizer)
+        cold = cost(InventoryOptimizer(catalog, prices, stock, 10000, oil_ids=POOL))
+        assert warm == pytest.approx(cold, abs=0.02) if isinstance(cold, float) else warm == cold
+
+
+def test_no_stocked_mix_raises(catalog):
+    with pytest.raises(ValueError, match='No recipe within stock'):
+        InventoryOptimizer(catalog, {'olive-oil': 1}, {'olive-oil': 100000}, 1000, oil_ids=['olive-oil']).solve()
@@ -0,0 +1,104 @@
+"""
+Oil ingest: row validation, duplicate ids, and markdown, CSV and JSONL readers
+
+Usage:
+    python -m pytest -q test_oil_ingest.py
+"""
+
+import json
+
+import pytest
+
+from oil_ingest import (FATTY_ACIDS, IngestReport, RowError, as_row, csv_rows, file_rows, ingest, jsonl_rows,
+                        markdown_rows, validate)
+from soapcalc.catalog import FATTY_ACIDS as ENGINE_FATTY_ACIDS
+
+OLIVE = {'name': 'Olive Oil', 'sap': '0.19', 'iodine': '85', 'ins': '105', 'palmitic': '13', 'stearic': '4',
+         'oleic': '71', 'linoleic': '10', 'linolenic': '1'}
+
+
+def test_fatty_acids_match_the_engine():
+    assert FATTY_ACIDS == tuple(ENGINE_FATTY_ACIDS)
+
+
+def test_valid_row_becomes_a_record():
+    record, warnings = validate(OLIVE, 'sheet.csv', 3)
+    assert (record.id, record.sap, record.category, record.line) == ('olive-oil', 0.19, 'Soft Oil', 3)
+    assert record.fatty_acids == dict.fromkeys(FATTY_ACIDS, 0) | {'palmitic': 13, 'stearic': 4, 'oleic': 71,
+                                                                   'linoleic': 10, 'linolenic': 1}
+    assert warnings == []
+    assert json.loads(as_row(record)['fatty_acids']) == record.fatty_acids
+    assert as_row(record)['sap'] == '0.19' and as_row(record)['iodine'] == '85'
+
+
+@pytest.mark.parametrize('change, message', [
+    ({'name': ' '}, 'Missing name'),
+    ({'name': '()'}, 'no id characters'),
+    ({'sap': ''}, 'Missing sap'),
+    ({'iodine': 'n/a'}, 'iodine is not a number'),
+    ({'ins': 'nan'}, 'ins is not a number'),
+    ({'sap': '0'}, 'SAP must be positive'),
+    ({'lauric': '-1'}, 'Negative lauric'),
+    ({'lauric': '8'}, 'Fatty acids sum to 107%'),
+])
+def test_bad_rows_are_rejected(change, message):
+    with pytest.raises(RowError, match=message):
+        validate(dict(OLIVE, **change))
+
+
+def test_suspicious_rows_warn():
+    _, warnings = validate(dict(OLIVE, lauric='3', ins='150'))
+    assert warnings == ['Fatty acids sum to 102%', 'INS 150 is not SAP x 1000 - iodine (105)']
+
+
+def test_ingest_reports_rejects_and_keeps_the_first_duplicate():
+    rows = [(1, OLIVE), (2, dict(OLIVE, sap='bad')), (3, RowError('Expected 12 columns, got 3')),
+            (4, dict(OLIVE, name='Olive  Oil', sap='0.2'))]
+    report = IngestReport()
+    records = list(ingest([('a.csv', rows), ('b.csv', [(1, dict(OLIVE, name='Coconut Oil', ins='258'))])], report))
+    assert [(r.id, r.sap, r.source) for r in records] == [('olive-oil', 0.19, 'a.csv'), ('coconut-oil', 0.19, 'b.csv')]
+    assert (report.rows, report.accepted, report.rejected, report.duplicates) == (5, 2, 2, 1)
+    assert [(i.line, i.severity, i.oil_id) for i in report.issues] == [
+        (2, 'error', 'olive-oil'), (3, 'error', None), (4, 'warning', 'olive-oil'), (1, 'warning', 'coconut-oil')]
+    assert "keeping 'Olive Oil' from a.csv line 1" in report.issues[2].message
+    assert [r.sap for r in ingest([('a.csv', rows)], dedupe=False)] == [0.19, 0.2]
+
+
+def test_report_caps_kept_issues(tmp_path):
+    report = IngestReport(max_issues=2)
+    list(ingest([('a', [(line, {'name': 'x'}) for line in range(5)])], report))
+    assert report.rejected == 5 and len(report.issues) == 2
+    report.write_jsonl(tmp_path / 'issues.jsonl')
+    lines = (tmp_path / 'issues.jsonl').read_text().splitlines()
+    assert [json.loads(line)['message'] for line in lines] == ['Missing sap', 'Missing sap']
+
+
+def test_markdown_rows_skip_headers_and_flag_short_rows():
+    lines = ['# Oils', '| Name | SAP | Iodine | INS | Lauric | Myristic | Palmitic | Stearic | Ricinoleic | Oleic '
+             '| Linoleic | Linolenic |', '|---|---|---|---|---|---|---|---|---|---|---|---|',
+             '| Olive Oil | 0.19 | 85 | 105 | 0 | 0 | 13 | 4 | 0 | 71 | 10 | 1 |', '| Broken | 0.2 |']
+    rows = list(markdown_rows(lines))
+    assert rows[0] == (4, dict(OLIVE, lauric='0', myristic='0', ricinoleic='0'))
+    assert rows[1][0] == 5 and isinstance(rows[1][1], RowError)
+
+
+def test_csv_and_jsonl_accept_aliases():
+    csv_lines = ['Oil Name,SAP KOH,iodine,ins,oleic', '', 'Olive Oil,0.19,85,105,71']
+    assert list(csv_rows(csv_lines)) == [(3, {'name': 'Olive Oil', 'sap': '0.19', 'iodine': '85', 'ins': '105',
+                                              'oleic': '71'})]
+    jsonl_lines = ['{"oil": "Olive Oil", "sap_value": 0.19, "fatty_acids": {"oleic": 71}}',
+                   '{"name": "Castor Oil", "fatty_acids": "{\\"ricinoleic\\": 90}"}', '', '[1]', '{bad',
+                   '{"name": "x", "fatty_acids": "{bad"}']
+    rows = list(jsonl_rows(jsonl_lines))
+    assert rows[0] == (1, {'name': 'Olive Oil', 'sap': 0.19, 'oleic': 71})
+    assert rows[1] == (2, {'name': 'Castor Oil', 'ricinoleic': 90})
+    assert [line for line, _ in rows[2:]] == [4, 5, 6]
+    assert all(isinstance(fields, RowError) for _, fields in rows[2:])
+
+
+def test_file_rows_picks_the_reader_by_extension(tmp_path):
+    path = tmp_path / 'oils.jsonl'
+    path.write_text(json.dumps(OLIVE) + '\n', encoding='utf-8')
+    assert list(file_rows(str(path))) == [(1, OLIVE)]
+    with pytest.raises(ValueError, match='Unknown source format'):
+        list(file_rows(str(tmp_path / 'oils.xlsx')))
@@ -0,0 +1,97 @@
+"""
+Oil search: autocomplete, substring, fuzzy and range lookups against scans, and one-oil edits
+
+Usage:
+    python -m pytest -q test_oil_search.py
+"""
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.catalog import PROPERTIES
+from soapcalc.oil_search import OilSearchIndex, parse_conditions
+
+CUSTOM = {'id': 'my-tallow-blend', 'name': 'Tallow Blend, house', 'sap': '0.143', 'iodine': 45, 'ins': 147,
+          'fatty_acids': {'oleic': 42, 'palmitic': 27, 'stearic': 20, 'myristic': 6}}
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def state(index):
+    """Everything the index keeps, to compare an edited index with a fresh one"""
+    return (index.names, index.values, index._terms, index._word_trigrams, index._tokens, index._trigrams,
+            index._columns)
+
+
+def test_autocomplete_matches_word_prefixes_in_any_order(catalog):
+    index = OilSearchIndex(catalog)
+    assert index.autocomplete('sw alm') == ['almond-oil-sweet']
+    assert index.autocomplete('sweet almond') == ['almond-oil-sweet']
+    assert 'olive-oil' in index.autocomplete('oli')
+    assert index.autocomplete('zzz') == [] and index.autocomplete('  ') == []
+    assert len(index.autocomplete('oil', limit=3)) == 3
+
+
+@pytest.mark.parametrize('query', ['oil', 'nut', 'ive o', 'seed oil', 'butter', 'sweet', 'co', 'x'])
+def test_contains_matches_a_scan(catalog, query):
+    index = OilSearchIndex(catalog)
+    expected = [oil_id for oil_id in index._by_name(index.names)
+                if any(query in term for term in index._terms[oil_id])]
+    assert index.contains(query) == expected
+
+
+def test_fuzzy_finds_misspellings(catalog):
+    index = OilSearchIndex(catalog)
+    assert index.fuzzy('jojba')[0][0] == 'jojoba-oil-a-liquid-wax-ester'
+    scores = [score for _, score in index.fuzzy('cocnut oil', limit=20)]
+    assert scores == sorted(scores, reverse=True) and min(scores) >= 0.3
+
+
+@pytest.mark.parametrize('conditions', ['oleic > 60 and linolenic < 5', 'lauric >= 40', 'iodine <= 10',
+                                        'stearic = 0 and palmitic < 5', 'ricinoleic > 100'])
+def test_where_matches_a_scan(catalog, conditions):
+    index = OilSearchIndex(catalog)
+    keep = np.ones(len(catalog), dtype=bool)
+    for prop, op, value in parse_conditions(conditions):
+        column = catalog.matrix[:, PROPERTIES.index(prop)]
+        value = np.float32(value)
+        keep &= {'<': column < value, '<=': column <= value, '>': column > value, '>=': column >= value,
+                 '=': column == value}[op]
+    expected = [catalog.ids[i] for i in np.flatnonzero(keep)]
+    assert index.where(conditions) == index._by_name(expected)
+
+
+def test_set_and_remove_oil_match_a_fresh_index(catalog):
+    index = OilSearchIndex(catalog)
+    index.set_oil(CUSTOM, aliases=['dripping'])
+    assert 'my-tallow-blend' in index
+    assert index.autocomplete('house tal') == ['my-tallow-blend']
+    assert index.autocomplete('drip') == ['my-tallow-blend']
+    assert 'my-tallow-blend' in index.where('palmitic >= 27 and oleic = 42')
+
+    index.set_oil(dict(CUSTOM, name='Lard Blend'))
+    assert index.autocomplete('house') == [] and index.autocomplete('drip') == []
+    assert index.autocomplete('lard bl') == ['my-tallow-blend']
+
+    index.remove_oil('my-tallow-blend')
+    assert state(index) == state(OilSearchIndex(catalog))
+
+
+def test_replacing_a_catalog_oil_moves_its_columns(catalog):
+    index = OilSearchIndex(catalog)
+    olive = dict(catalog.oil('olive-oil'), fatty_acids={'oleic': 99})
+    index.set_oil(olive)
+    assert 'olive-oil' in index.where('oleic > 98')
+    assert len(index) == len(catalog)
+    for values, _ in index._columns.values():
+        assert values == sorted(values)
+
+
+@pytest.mark.parametrize('text, message', [('oleic >> 5', 'Cannot parse'), ('wax > 5', 'Unknown property')])
+def test_bad_conditions_raise(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_conditions(text)
@@ -0,0 +1,108 @@
+"""
+Recipe optimizer: the simplex against vertex enumeration, the fit against random recipes, and bounds
+
+Usage:
+    python -m pytest -q test_optimizer.py
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog, quality_values, weighted_properties
+from soapcalc import lp
+from soapcalc.engine import get_quality_ranges
+from soapcalc.optimizer import (_bounds, fit_penalty, optimize_recipe, quality_contributions, round_percentages,
+                                solve_percentages)
+
+POOL = ['olive-oil', 'coconut', 'palm-oil', 'castor-oil', 'shea-butter', 'cocoa-butter']
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def unrounded_qualities(catalog, oil_ids, percentages):
+    matrix = np.zeros((len(percentages), len(catalog)))
+    matrix[:, catalog.indices(oil_ids)] = percentages
+    return quality_values(weighted_properties(catalog, matrix))
+
+
+def vertex_minimum(c, A_ub, b_ub, A_eq, b_eq):
+    """Smallest c @ x over every basic feasible solution, by trying each set of active constraints"""
+    n = len(c)
+    rows = np.vstack([A_ub, A_eq, -np.eye(n)])
+    rhs = np.concatenate([b_ub, b_eq, np.zeros(n)])
+    equalities = set(range(len(A_ub), len(A_ub) + len(A_eq)))
+    best = np.inf
+    for active in combinations(range(len(rows)), n):
+        if not equalities <= set(active):
+            continue
+        try:
+            x = np.linalg.solve(rows[list(active)], rhs[list(active)])
+        except np.linalg.LinAlgError:
+            continue
+        if (x >= -1e-9).all() and (A_ub @ x <= b_ub + 1e-9).all() and np.allclose(A_eq @ x, b_eq):
+            best = min(best, c @ x)
+    return best
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_lp_matches_vertex_enumeration(seed):
+    rng = np.random.default_rng(seed)
+    c = rng.normal(size=4)
+    A_ub = rng.uniform(-1, 1, size=(4, 4))
+    b_ub = rng.uniform(0.2, 1, size=4)
+    A_eq, b_eq = np.ones((1, 4)), np.array([1.0])
+
+    result = lp.solve(c, A_ub, b_ub, A_eq, b_eq)
+    best = vertex_minimum(c, A_ub, b_ub, A_eq, b_eq)
+    if np.isinf(best):
+        assert result.status == 'infeasible'
+    else:
+        assert result.status == 'optimal'
+        assert result.objective == pytest.approx(best, abs=1e-7)
+
+
+@pytest.mark.parametrize('soap_type', ['hard', 'liquid'])
+def test_optimizer_beats_random_recipes(catalog, soap_type):
+    ranges = get_quality_ranges(soap_type)
+    lower, upper = _bounds(POOL, None)
+    raw = solve_percentages(quality_contributions(catalog, catalog.indices(POOL)), ranges, lower, upper)
+    best = fit_penalty(unrounded_qualities(catalog, POOL, raw[None, :]), ranges)[0]
+
+    samples = 100 * np.random.default_rng(0).dirichlet(np.ones(len(POOL)), size=20000)
+    sampled = fit_penalty(unrounded_qualities(catalog, POOL, samples), ranges)
+    assert best <= sampled.min() + 1e-9
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_rounded_recipe_keeps_bounds(catalog, seed):
+    rng = np.random.default_rng(seed)
+    bounds = {}
+    for oil_id in rng.choice(POOL, size=3, replace=False):
+        low = rng.uniform(0, 25)
+        bounds[str(oil_id)] = (low, low + rng.uniform(0.05, 20))
+    recipe = optimize_recipe(catalog, POOL, bounds=bounds)
+    assert sum(recipe.percentages.values()) == pytest.approx(100)
+    for oil_id, (low, high) in bounds.items():
+        assert low <= recipe.percentages.get(oil_id, 0) <= high
+
+
+def test_round_percentages_sums_to_100_within_caps():
+    percentages = round_percentages(np.array([33.333, 33.333, 33.334]))
+    assert percentages.sum() == pytest.approx(100) and set(percentages.tolist()) <= {33.3, 33.4}
+    capped = round_percentages(np.array([10.05, 45.0, 44.95]), upper=np.array([10.05, 100, 100]))
+    assert capped[0] <= 10.05 and capped.sum() == pytest.approx(100)
+
+
+@pytest.mark.parametrize('bounds, message', [
+    ({'olive-oil': (60, 50)}, '0 <= min <= max <= 100'),
+    ({'olive-oil': (10.01, 10.09)}, 'multiple of 0.1'),
+    ({'olive-oil': (60, 100), 'coconut': (50, 100)}, 'cannot add up to 100'),
+])
+def test_bad_bounds_raise(catalog, bounds, message):
+    with pytest.raises(ValueError, match=message):
+        optimize_recipe(catalog, POOL, bounds=bounds)
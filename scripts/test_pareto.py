@@ -0,0 +1,107 @@
+"""
+Pareto frontiers: the skyline and frontier search against brute force, selection and the frontier cache
+
+Usage:
+    python -m pytest -q test_pareto.py
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from soapcalc import evaluate, load_catalog
+from soapcalc.engine import QUALITIES
+from soapcalc.pareto import FrontierCache, ParetoFrontier, _signs, compositions, pareto_frontier, skyline
+
+POOL = ['olive-oil', 'coconut', 'palm-oil', 'castor-oil', 'shea-butter', 'cocoa-butter']
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def dense(catalog, recipes):
+    """(recipes x catalog) matrix from {oil_id: percentage} recipes"""
+    matrix = np.zeros((len(recipes), len(catalog)))
+    for i, recipe in enumerate(recipes):
+        matrix[i, catalog.indices(list(recipe))] = list(recipe.values())
+    return matrix
+
+
+def brute_skyline(points):
+    dominated = [((points <= p).all(axis=1) & (points < p).any(axis=1)).any() for p in points]
+    return {tuple(p) for p, d in zip(points.tolist(), dominated) if not d}
+
+
+def test_pareto_frontier_matches_brute_force(catalog):
+    pool, step, max_oils = POOL[:4], 10, 2
+    frontier = pareto_frontier(catalog, pool, max_oils=max_oils, step=step, within=None)
+
+    records = frontier.records()
+    single = evaluate(catalog, dense(catalog, [record['percentages'] for record in records]), 100)
+    assert frontier.qualities.tolist() == single.qualities.tolist()
+
+    recipes = [{oil_id: 100.0} for oil_id in pool]
+    for a, b in combinations(pool, 2):
+        recipes += [{a: float(p), b: float(100 - p)} for p in range(step, 100, step)]
+    points = evaluate(catalog, dense(catalog, recipes), 100).qualities * _signs(None)
+    expected = {tuple(int(v) for v in np.array(q) * _signs(None)) for q in brute_skyline(points)}
+    assert {tuple(q) for q in frontier.qualities.tolist()} == expected
+    assert len(frontier) == len(expected)
+    assert frontier.qualities.shape[1] == len(QUALITIES)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_skyline_matches_all_pairs(seed):
+    points = np.random.default_rng(seed).integers(0, 8, size=(1000, 3)).astype(float)
+    kept = skyline(points, block=128)
+    expected = brute_skyline(points)
+    assert {tuple(p) for p in points[kept].tolist()} == expected and len(kept) == len(expected)
+
+
+def test_skyline_keeps_the_first_of_identical_points():
+    assert sorted(skyline(np.array([[1, 2], [0, 3], [1, 2], [2, 2]])).tolist()) == [0, 1]
+    assert skyline(np.zeros((0, 3))).tolist() == []
+
+
+def test_compositions_are_every_positive_split():
+    splits = compositions(5, 3)
+    assert (splits > 0).all() and (splits.sum(axis=1) == 5).all()
+    assert len({tuple(s) for s in splits.tolist()}) == len(splits) == 6
+
+
+def test_select_filters_and_sorts(catalog):
+    prices = {oil_id: 0.01 * (i + 1) for i, oil_id in enumerate(POOL)}
+    frontier = pareto_frontier(catalog, POOL, max_oils=3, step=10, prices=prices)
+    hardness = frontier.qualities[:, QUALITIES.index('hardness')]
+    positions = frontier.select({'hardness': (40, None), 'cost': (None, 0.04)}, sort_by='cost', limit=5)
+    assert (hardness[positions] >= 40).all() and (frontier.cost[positions] <= 0.04).all()
+    assert list(frontier.cost[positions]) == sorted(frontier.cost[positions])
+    assert len(positions) == min(5, ((hardness >= 40) & (frontier.cost <= 0.04)).sum())
+    with pytest.raises(ValueError, match='Unknown quality'):
+        frontier.select(sort_by='lather')
+
+
+def test_save_and_load(catalog, tmp_path):
+    frontier = pareto_frontier(catalog, POOL[:4], max_oils=2, step=10)
+    frontier.save(tmp_path / 'frontier.npz')
+    loaded = ParetoFrontier.load(tmp_path / 'frontier.npz', catalog)
+    assert loaded.records() == frontier.records() and loaded.cost is None
+    with pytest.raises(ValueError, match='different catalog'):
+        ParetoFrontier.load(tmp_path / 'frontier.npz', catalog.without_oil(catalog.ids[0]))
+
+
+def test_frontier_cache_shares_read_only_frontiers(catalog, tmp_path):
+    cache = FrontierCache(catalog, directory=str(tmp_path))
+    frontier = cache.get(POOL[:3], max_oils=2, step=10)
+    assert cache.get(list(reversed(POOL[:3])), max_oils=2, step=10) is frontier
+    with pytest.raises(ValueError, match='read-only'):
+        frontier.qualities[0, 0] = 0
+    assert len(list(tmp_path.glob('*.npz'))) == 1
+
+    assert cache.invalidate_oil('cocoa-butter') == 0
+    assert cache.invalidate_oil('coconut') == 1
+    reloaded = FrontierCache(catalog, directory=str(tmp_path)).get(POOL[:3], max_oils=2, step=10)
+    assert reloaded.records() == frontier.records()
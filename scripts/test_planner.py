@@ -0,0 +1,115 @@
+"""
+Production planner: scaled lines against engine.evaluate, schedule totals and schedule validation
+
+Usage:
+    python -m pytest -q test_planner.py
+"""
+
+import numpy as np
+import pytest
+
+from soapcalc import evaluate, load_catalog
+from soapcalc.planner import convert_weight, plan_production, read_schedule
+
+RECIPES = {
+    'castile': {'oils': {'olive-oil': 100}, 'superfat': 5},
+    'bastille': {'oils': {'olive-oil': 70, 'coconut': 30}, 'lye_type': 'KOH', 'total_oil_weight': 1000,
+                 'fragrance_weight': 30},
+}
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def random_recipes(catalog, count, seed=0):
+    rng = np.random.default_rng(seed)
+    recipes = []
+    for i in range(count):
+        oils = rng.choice(catalog.ids, size=rng.integers(1, 6), replace=False)
+        shares = np.round(100 * rng.dirichlet(np.ones(len(oils))), 1)
+        shares[0] += 100 - shares.sum()
+        recipes.append({
+            'id': f'r{i}',
+            'oils': {str(oil_id): float(p) for oil_id, p in zip(oils, shares)},
+            'total_oil_weight': float(rng.choice([500, 1000, 1234.5])),
+            'superfat': float(rng.choice([0, 5, 8])),
+            'lye_type': str(rng.choice(['NaOH', 'KOH'])),
+            'water_method': 'water_as_percent_of_oils',
+            'water_value': 38.0,
+        })
+    return recipes
+
+
+def evaluate_one(catalog, recipe):
+    matrix = np.zeros((1, len(catalog)))
+    matrix[0, catalog.indices(list(recipe['oils']))] = list(recipe['oils'].values())
+    return evaluate(catalog, matrix, recipe['total_oil_weight'], recipe['superfat'], recipe['water_method'],
+                    recipe['water_value'], recipe['lye_type'])
+
+
+def test_planner_matches_evaluate(catalog):
+    recipes = random_recipes(catalog, 100)
+    schedule = [{'recipe': r['id'], 'batch_weight': r['total_oil_weight']} for r in recipes]
+    plan = plan_production(catalog, {r['id']: r for r in recipes}, schedule)
+    for recipe, line in zip(recipes, plan.lines()):
+        single = evaluate_one(catalog, recipe)
+        assert line['lye_weight'] == pytest.approx(float(single.lye_weight[0]), abs=0.011)
+        assert line['water_weight'] == pytest.approx(float(single.water_weight[0]), abs=0.011)
+        rows = catalog.indices(list(line['oils']))
+        assert list(line['oils'].values()) == single.oil_weights[0, rows].tolist()
+
+
+def test_totals_add_up_every_line_in_grams(catalog):
+    schedule = [{'recipe': 'castile', 'batch_weight': 1000, 'batches': 3},
+                {'recipe': 'bastille', 'batch_weight': 2, 'unit': 'lb'},
+                {'recipe': 'castile', 'batch_weight': 16, 'unit': 'oz', 'lye_type': 'KOH'}]
+    plan = plan_production(catalog, RECIPES, schedule)
+    lines = list(plan.lines())
+    assert lines[1]['oils'] == {'olive-oil': 1.4, 'coconut': 0.6}
+    assert lines[2]['lye_type'] == 'KOH' and lines[1]['fragrance_weight'] == pytest.approx(0.06)
+
+    grams = [3 * 1, convert_weight(1, 'lb', 'g'), convert_weight(1, 'oz', 'g')]
+    totals = plan.totals()
+    olive = sum(line['oils']['olive-oil'] * g for line, g in zip(lines, grams))
+    assert totals['oils']['olive-oil'] == pytest.approx(olive, abs=0.01)
+    assert list(totals['oils']) == ['olive-oil', 'coconut']
+    assert totals['lye']['NaOH'] == pytest.approx(3 * lines[0]['lye_weight'], abs=0.01)
+    assert totals['lye']['KOH'] == pytest.approx(lines[1]['lye_weight'] * grams[1] + lines[2]['lye_weight'] * grams[2],
+                                                 abs=0.01)
+    assert (totals['lines'], totals['batches']) == (3, 5)
+    assert plan.totals('lb')['water'] == pytest.approx(totals['water'] / 453.59237, abs=0.01)
+
+
+def test_read_schedule_csv_and_jsonl():
+    csv_lines = ['recipe, batch_weight, unit', '', 'castile, 1000,', 'bastille, 2, lb']
+    assert read_schedule(csv_lines) == [{'recipe': 'castile', 'batch_weight': '1000'},
+                                        {'recipe': 'bastille', 'batch_weight': '2', 'unit': 'lb'}]
+    assert read_schedule(['{"recipe": "castile", "batch_weight": 500}', '']) == [
+        {'recipe': 'castile', 'batch_weight': 500}]
+    assert read_schedule(['', '  ']) == []
+    with pytest.raises(ValueError, match='needs recipe and batch_weight'):
+        read_schedule(['recipe,weight'])
+    with pytest.raises(ValueError, match='Schedule line 2: invalid JSON'):
+        read_schedule(['{"recipe": "castile", "batch_weight": 1}', '{bad'])
+
+
+@pytest.mark.parametrize('entry, message', [
+    ({'batch_weight': 500}, 'missing recipe'),
+    ({'recipe': 'soap', 'batch_weight': 500}, 'unknown recipe: soap'),
+    ({'recipe': 'castile', 'batch_weight': 500, 'unit': 'kg'}, 'unknown unit: kg'),
+    ({'recipe': 'castile', 'batch_weight': 'heavy'}, 'Schedule entry 1: could not convert'),
+    ({'recipe': 'castile', 'batch_weight': 500, 'batches': 1.5}, 'batches must be a whole number'),
+    ({'recipe': 'castile', 'batch_weight': 'nan'}, 'batch weight must be finite'),
+    ({'recipe': 'castile', 'batch_weight': 500, 'lye_type': 'LiOH'}, 'unknown lye type: LiOH'),
+    ({'recipe': 'castile', 'batch_weight': -500}, 'must not be negative'),
+])
+def test_bad_schedule_entries_raise(catalog, entry, message):
+    with pytest.raises(ValueError, match=message):
+        plan_production(catalog, RECIPES, [entry])
+
+
+def test_bad_recipes_raise(catalog):
+    with pytest.raises(ValueError, match='Recipe soap: unknown oil id: no-such-oil'):
+        plan_production(catalog, {'soap': {'oils': {'no-such-oil': 100}}}, [])
@@ -0,0 +1,70 @@
+"""
+Profiling hooks: nothing is recorded while disabled, and snapshots and Prometheus text agree
+
+Usage:
+    python -m pytest -q test_profiling.py
+"""
+
+import json
+
+import pytest
+
+from soapcalc import load_catalog, profiling
+from soapcalc.recommend import Recommender
+
+
+@pytest.fixture
+def profiler():
+    profiling.disable()
+    profiling.reset()
+    yield profiling
+    profiling.disable()
+    profiling.reset()
+
+
+def test_disabled_hooks_record_nothing(profiler):
+    with profiler.stage('block'):
+        pass
+    profiler.count('events')
+    Recommender(load_catalog()).recommend({'olive-oil': 100})
+    assert profiler.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_engine_stages_are_recorded(profiler):
+    recommender = Recommender(load_catalog())
+    profiler.enable()
+    recommender.recommend({'olive-oil': 70, 'coconut': 30})
+    stages = profiler.snapshot()['stages']
+    assert stages['recommend.get_recommended_oils']['count'] == 1
+    assert stages['recommend.scoring']['count'] == 1
+    assert profiler.snapshot()['counters']['recommend.candidates_scored'] == len(recommender.catalog) - 2
+    assert stages['recommend.get_recommended_oils']['total_seconds'] >= stages['recommend.scoring']['total_seconds']
+
+
+def test_histogram_buckets_and_summary(profiler):
+    for seconds in (2e-6, 3e-3, 20.0):
+        profiler.record('stage', seconds)
+    report = profiler.snapshot()['stages']['stage']
+    assert (report['count'], report['min_seconds'], report['max_seconds']) == (3, 2e-6, 20.0)
+    assert report['buckets']['2.5e-06'] == report['buckets']['0.005'] == report['buckets']['+Inf'] == 1
+    assert sum(report['buckets'].values()) == 3
+    assert json.loads(profiler.to_json()) == profiler.snapshot()
+
+
+def test_prometheus_buckets_are_cumulative(profiler):
+    profiler.enable()
+    profiler.record('a "quoted" stage', 1e-4)
+    profiler.record('a "quoted" stage', 0.3)
+    profiler.count('events', 2)
+    text = profiler.to_prometheus()
+    assert 'soapcalc_stage_seconds_bucket{stage="a \\"quoted\\" stage",le="0.0001"} 1' in text
+    assert 'soapcalc_stage_seconds_bucket{stage="a \\"quoted\\" stage",le="0.5"} 2' in text
+    assert 'soapcalc_stage_seconds_count{stage="a \\"quoted\\" stage"} 2' in text
+    assert 'soapcalc_events_total{name="events"} 2' in text
+
+
+def test_write_reports(profiler, tmp_path):
+    profiler.record('stage', 0.01)
+    profiler.write_reports(tmp_path / 'profile')
+    assert json.loads((tmp_path / 'profile.json').read_text())['stages']['stage']['count'] == 1
+    assert (tmp_path / 'profile.prom').read_text() == profiler.to_prometheus()
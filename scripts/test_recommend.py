@@ -0,0 +1,51 @@
+"""
+Fused recommendations: evaluate() and evaluate_many() against separate recommend and score calls
+
+Usage:
+    python -m pytest -q test_recommend.py
+"""
+
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.recommend import Recommender
+
+RECIPES = [
+    ({'olive-oil': 50, 'coconut': 30, 'palm-oil': 20}, 'hard'),
+    ({'olive-oil': 100}, 'hard'),
+    ({'coconut': 70, 'castor-oil': 10}, 'liquid'),
+    ({}, 'hard'),
+]
+
+
+@pytest.fixture(scope='module')
+def recommender():
+    return Recommender(load_catalog())
+
+
+@pytest.mark.parametrize('current_oils, soap_type', RECIPES)
+def test_evaluate_matches_separate_calls(recommender, current_oils, soap_type):
+    result = recommender.evaluate(current_oils, soap_type, 5, threshold=40)
+    assert result['recommendations'] == recommender.recommend(current_oils, soap_type, 5)
+
+    scores = recommender.score(recommender.context(current_oils), soap_type)
+    catalog = recommender.catalog
+    expected = [oil_id for i, oil_id in enumerate(catalog.ids) if scores.candidates[i] and scores.scores[i] < 40]
+    assert result['incompatible'] == expected
+    assert expected or not current_oils
+    assert set(result['disabledReasons']) == set(expected)
+    assert not set(expected) & set(current_oils)
+
+
+def test_evaluate_many_matches_evaluate(recommender):
+    requests = [(current_oils, soap_type, 3, 40) for current_oils, soap_type in RECIPES]
+    assert recommender.evaluate_many(requests) == [recommender.evaluate(*request) for request in requests]
+
+
+def test_evaluate_many_returns_the_error_of_a_bad_request(recommender):
+    requests = [({'olive-oil': 100}, 'hard', 5, 25), ({'no-such-oil': 100}, 'hard', 5, 25),
+                ({'coconut': 100}, 'hard', 5, 25)]
+    results = recommender.evaluate_many(requests)
+    assert isinstance(results[1], Exception)
+    assert results[0] == recommender.evaluate(*requests[0])
+    assert results[2] == recommender.evaluate(*requests[2])
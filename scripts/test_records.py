@@ -0,0 +1,65 @@
+"""
+Compact records: oil views and index-based recipes against the catalog and the dense engine
+
+Usage:
+    python -m pytest -q test_records.py
+"""
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog, weighted_properties
+from soapcalc.catalog import FATTY_ACID_COLUMNS, IODINE, SAP
+from soapcalc.records import Oil, Recipe, RecipeBatch, oil_records
+
+RECIPES = [{'olive-oil': 50, 'coconut': 30, 'palm-oil': 20}, {'castor-oil': 100},
+           {'shea-butter': 33.3, 'cocoa-butter': 66.7}]
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def test_oil_records_view_the_matrix(catalog):
+    records = oil_records(catalog)
+    assert len(records) == len(catalog)
+    assert np.array_equal(records['sap'], catalog.matrix[:, SAP])
+    assert np.array_equal(records['fatty_acids'], catalog.matrix[:, FATTY_ACID_COLUMNS])
+    if catalog.matrix.flags.c_contiguous:
+        assert np.shares_memory(records, catalog.matrix)
+
+
+def test_oil_reads_its_catalog_row(catalog):
+    oil = Oil.by_id(catalog, 'olive-oil')
+    assert (oil.id, oil.iodine) == ('olive-oil', float(catalog.matrix[catalog.index['olive-oil'], IODINE]))
+    assert oil.as_dict() == catalog.oil('olive-oil')
+    assert oil == Oil(catalog, oil.row) and len({oil, Oil(catalog, oil.row)}) == 1
+    assert not hasattr(oil, '__dict__')
+
+
+def test_recipe_matches_the_dense_engine(catalog):
+    for current in RECIPES:
+        recipe = Recipe.from_percentages(catalog, current)
+        assert recipe.as_dict(catalog) == current
+        dense = np.zeros((1, len(catalog)))
+        dense[0, catalog.indices(list(current))] = list(current.values())
+        assert np.allclose(recipe.properties(catalog), weighted_properties(catalog, dense)[0])
+    assert not Recipe([], []).properties(catalog).any()
+
+
+def test_batch_matches_single_recipes(catalog):
+    batch = RecipeBatch.from_recipes(catalog, RECIPES + [{}])
+    assert batch.rows.shape == (4, 3)
+    assert batch[1].as_dict(catalog) == RECIPES[1]
+    expected = [Recipe.from_percentages(catalog, current).qualities(catalog) for current in RECIPES]
+    assert np.array_equal(batch.qualities(catalog, block=2)[:3], expected)
+    assert not batch.properties(catalog)[3].any()
+    assert np.allclose(batch.properties(catalog), weighted_properties(catalog, batch.to_dense(catalog)))
+
+
+def test_mismatched_shapes_raise():
+    with pytest.raises(ValueError, match='differ in length'):
+        Recipe([1, 2], [50])
+    with pytest.raises(ValueError, match='matching'):
+        RecipeBatch(np.zeros((2, 3)), np.zeros((2, 2)))
@@ -0,0 +1,113 @@
+"""
+Catalog replica: materialize, change feed apply and the lag-window replay
+
+Usage:
+    python -m pytest -q test_replica.py
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from soapcalc.replica import FileChangeFeed, Replica
+
+
+def oil(oil_id, name=None, oleic=50):
+    return {'id': oil_id, 'name': name or oil_id.replace('-', ' ').title(), 'sap_naoh': 0.19, 'sap_koh': 0.19,
+            'iodine': 80, 'ins': 110, 'category': 'Liquid Oil', 'fatty_acids': {'oleic': oleic}}
+
+
+@pytest.fixture
+def replica(tmp_path):
+    with Replica(str(tmp_path / 'replica.db')) as replica:
+        replica.materialize([oil('olive-oil'), oil('almond-oil'), oil('olive-oil', 'Duplicate')], sequence=0)
+        yield replica
+
+
+def test_materialize_keeps_first_duplicate(replica):
+    assert len(replica) == 2
+    assert replica.oil('olive-oil')['name'] == 'Olive Oil'
+    assert [o['id'] for o in replica.all_oils()] == ['almond-oil', 'olive-oil']
+
+
+def test_apply_in_seq_order_and_skip_replays(replica):
+    version = replica.version
+    changes = [{'seq': 2, 'op': 'upsert', 'oil': oil('olive-oil', oleic=70)},
+               {'seq': 1, 'op': 'upsert', 'oil': oil('olive-oil', oleic=60)},
+               {'seq': 3, 'op': 'delete', 'id': 'almond-oil'}]
+    assert replica.apply(changes) == 3
+    assert replica.oil('olive-oil')['fatty_acids']['oleic'] == 70
+    assert replica.oil('almond-oil') is None
+    assert (replica.sequence, replica.version) == (3, version + 1)
+
+    assert replica.apply(changes) == 0
+    assert replica.version == version + 1
+
+
+def test_sync_picks_up_a_late_commit_inside_the_lag_window(replica, tmp_path):
+    feed = FileChangeFeed(str(tmp_path / 'changes.jsonl'))
+    late = {'seq': 2, 'op': 'upsert', 'oil': oil('castor-oil')}
+    visible = [{'seq': 1, 'op': 'upsert', 'oil': oil('olive-oil', oleic=71)},
+               {'seq': 3, 'op': 'upsert', 'oil': oil('olive-oil', oleic=73)}]
+    replica.apply(visible, lag=10)
+    assert replica.sequence == 3 and replica.oil('castor-oil') is None
+
+    # seq 2 commits after seq 3 was read; the re-read window still covers it
+    with open(feed.path, 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(entry) + '\n' for entry in [*visible, late])
+    assert replica.sync(feed, lag=10) == 1
+    assert replica.oil('castor-oil') is not None
+    assert replica.oil('olive-oil')['fatty_acids']['oleic'] == 73
+    assert replica.sync(feed, lag=10) == 0
+
+
+def test_changes_older_than_the_lag_count_as_applied(replica):
+    replica.apply([{'seq': 10, 'op': 'upsert', 'oil': oil('shea-butter')}], lag=3)
+    assert replica.apply([{'seq': 5, 'op': 'delete', 'id': 'shea-butter'}], lag=3) == 0
+    assert replica.apply([{'seq': 8, 'op': 'delete', 'id': 'shea-butter'}], lag=3) == 1
+    assert replica.oil('shea-butter') is None
+
+
+def test_materialize_resets_the_applied_seqs(replica):
+    replica.apply([{'seq': 5, 'op': 'delete', 'id': 'almond-oil'}])
+    replica.materialize([oil('olive-oil'), oil('almond-oil')], sequence=4)
+    assert replica.apply([{'seq': 5, 'op': 'delete', 'id': 'almond-oil'}]) == 1
+    assert replica.oil('almond-oil') is None
+
+
+def test_unknown_op_rolls_back(replica):
+    with pytest.raises(ValueError):
+        replica.apply([{'seq': 1, 'op': 'upsert', 'oil': oil('shea-butter')}, {'seq': 2, 'op': 'rename'}])
+    assert replica.oil('shea-butter') is None and replica.sequence == 0
+
+
+def test_snapshot_follows_the_version(replica):
+    first = replica.snapshot()
+    assert replica.snapshot() is first
+    replica.apply([{'seq': 1, 'op': 'upsert', 'oil': oil('shea-butter')}])
+    second = replica.snapshot()
+    assert second.version == first.version + 1
+    assert 'shea-butter' in second.catalog.ids
+
+
+def test_unsupported_schema_closes_the_connection(tmp_path, monkeypatch):
+    path = str(tmp_path / 'replica.db')
+    Replica(path).close()
+    db = sqlite3.connect(path)
+    with db:
+        db.execute("UPDATE replica_meta SET value = 99 WHERE key = 'schema'")
+    db.close()
+
+    connections = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, 'connect', lambda *args: connections.append(connect(*args)) or connections[-1])
+    with pytest.raises(ValueError, match='schema 99'):
+        Replica(path)
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[-1].execute('SELECT 1')
+
+
+def test_missing_replica_is_not_created(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Replica(str(tmp_path / 'missing.db'), create=False)
@@ -0,0 +1,61 @@
+"""
+Incremental seed migrations: manifest diffs and the upserts and deletes they generate
+
+Usage:
+    python -m pytest -q test_seed_migrations.py
+"""
+
+import json
+
+import pytest
+
+from generate_oils_sql import (build_manifest, diff_oils, generate_incremental_sql, load_manifest, parse_oils,
+                               save_manifest)
+
+
+@pytest.fixture(scope='module')
+def oils():
+    return parse_oils()
+
+
+def test_unchanged_catalog_has_no_diff(oils):
+    assert diff_oils(oils, build_manifest(oils)) == ([], [])
+
+
+def test_diff_finds_changed_new_and_removed_oils(oils):
+    previous = build_manifest(oils)
+    previous['retired-oil'] = 'ab' * 32
+    edited = [dict(oil, iodine='90') if oil['id'] == 'olive-oil' else oil for oil in oils[1:]]
+    edited.append(dict(oils[1], id='new-oil', name='New Oil'))
+    changed, removed = diff_oils(edited, previous)
+    assert [oil['id'] for oil in changed] == ['olive-oil', 'new-oil']
+    assert removed == sorted(['retired-oil', oils[0]['id']])
+
+
+def test_diff_keeps_the_first_of_duplicate_ids(oils):
+    duplicated = oils + [dict(oils[0], name='Shadowed')]
+    assert build_manifest(duplicated) == build_manifest(oils)
+    assert diff_oils(duplicated, build_manifest(oils)) == ([], [])
+
+
+def test_incremental_sql_batches_upserts_and_deletes(oils):
+    sql = generate_incremental_sql(oils[:5], ['gone-1', 'gone-2', "it's-gone"], batch_size=2)
+    assert sql.count('INSERT INTO oils') == 3
+    assert sql.count('ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name') == 3
+    assert sql.count('DELETE FROM oils WHERE is_system = true') == 2
+    assert "id IN ('gone-1', 'gone-2');" in sql
+    assert all(f"('{oil['id']}', " in sql for oil in oils[:5])
+    assert '-- Upserted oils: 5' in sql and '-- Deleted oils: 3' in sql
+
+
+def test_empty_diff_writes_no_statements():
+    sql = generate_incremental_sql([], [])
+    assert 'INSERT' not in sql and 'DELETE' not in sql
+
+
+def test_manifest_round_trip(oils, tmp_path):
+    path = tmp_path / 'seed_manifest.json'
+    assert load_manifest(path) == {}
+    save_manifest(path, build_manifest(oils))
+    assert load_manifest(path) == build_manifest(oils)
+    assert 'generated_at' in json.loads(path.read_text())
@@ -0,0 +1,84 @@
+"""
+Recipe service request handling: every bad request gets a 400, not a dropped connection
+
+Usage:
+    python -m pytest -q test_service.py
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.service import RecipeService
+
+
+class Writer:
+    """Collects what the service writes to a connection"""
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = RecipeService(load_catalog(), window=0.001)
+    yield service
+    service.close()
+
+
+def request(service, method, path, body=b''):
+    """(status, headers text, body bytes) for one request over a closing connection"""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                         .encode('latin-1') + body)
+        reader.feed_eof()
+        writer = Writer()
+        await service.handle(reader, writer)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.closed
+    head, _, payload = writer.data.partition(b'\r\n\r\n')
+    return int(head.split()[1]), head.decode('latin-1'), payload
+
+
+def test_stream_rejects_non_utf8_body(service):
+    status, _, payload = request(service, 'POST', '/calculate/stream', b'{"oils": {"olive-oil": 100}}\n\xff\xfe\n')
+    assert status == 400
+    assert 'UTF-8' in json.loads(payload)['error']
+
+
+def test_stream_answers_each_line(service):
+    lines = b'{"id": "a", "oils": {"olive-oil": 100}}\nnot json\n'
+    status, head, payload = request(service, 'POST', '/calculate/stream', lines)
+    assert status == 200 and 'chunked' in head
+    size, _, rest = payload.partition(b'\r\n')
+    results = [json.loads(line) for line in rest[:int(size, 16)].splitlines()]
+    assert results[0]['id'] == 'a' and 'qualities' in results[0]
+    assert results[1]['line'] == 2 and 'error' in results[1]
+
+
+@pytest.mark.parametrize('body', [b'\xff{}', b'[1]', b'{"oils": {"olive-oil": "nan"}}', b'{"oils": {"olive-oil": -5}}',
+                                  b'{"oils": [{"percentage": 50}]}', b'{"soapType": "bar"}'])
+def test_bad_recommendation_requests_are_400(service, body):
+    status, _, payload = request(service, 'POST', '/recommendations', body)
+    assert status == 400
+    assert json.loads(payload)['error']
+
+
+def test_unknown_oil_is_400(service):
+    status, _, _ = request(service, 'POST', '/recommendations', b'{"oils": {"no-such-oil": 50}}')
+    assert status == 400
@@ -0,0 +1,62 @@
+"""
+Similarity index: lookups match calculateOilSimilarity and edits touch one row and column
+
+Usage:
+    python -m pytest -q test_similarity.py
+"""
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.recommend import Recommender
+from soapcalc.similarity import SimilarityIndex, quantize
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def test_index_matches_direct_similarity(catalog):
+    index = SimilarityIndex.from_catalog(catalog)
+    rows = np.arange(len(catalog))
+    direct = Recommender(catalog).similarity(rows, rows)
+    assert np.array_equal(index.similarity(rows, rows), direct)
+    assert np.array_equal(Recommender(catalog, index).similarity(rows, rows), direct)
+
+
+def test_nearest_is_sorted_and_skips_the_oil(catalog):
+    index = SimilarityIndex.from_catalog(catalog)
+    nearest = index.nearest('olive-oil', 5)
+    assert len(nearest) == 5 and 'olive-oil' not in [oil_id for oil_id, _ in nearest]
+    scores = [score for _, score in nearest]
+    assert scores == sorted(scores, reverse=True)
+    others = [s for oil_id, s in zip(catalog.ids, index.similarity(index.rows(['olive-oil']), np.arange(len(index)))[0])
+              if oil_id != 'olive-oil']
+    assert scores[0] == max(others)
+
+
+def test_set_oil_matches_a_rebuild(catalog):
+    index = SimilarityIndex.from_catalog(catalog)
+    profile = {'oleic': 40, 'palmitic': 30, 'lauric': 20}
+    index.set_oil('custom-blend', profile)
+    index.set_oil('olive-oil', {'oleic': 80, 'linoleic': 10})
+    edited = catalog.with_oil({'id': 'custom-blend', 'name': 'Custom', 'sap_naoh': 0.2, 'iodine': 50, 'ins': 150,
+                               'fatty_acids': profile})
+    edited = edited.with_oil(dict(edited.oil('olive-oil'), fatty_acids={'oleic': 80, 'linoleic': 10}))
+    rebuilt = SimilarityIndex.from_catalog(edited)
+    rows = index.rows(rebuilt.ids)
+    assert np.array_equal(index.distances[np.ix_(rows, rows)], rebuilt.distances)
+
+
+def test_save_and_load(catalog, tmp_path):
+    index = SimilarityIndex.from_catalog(catalog)
+    index.save(tmp_path / 'index.npz')
+    loaded = SimilarityIndex.load(tmp_path / 'index.npz')
+    assert loaded.matches(catalog)
+    assert np.array_equal(loaded.distances, index.distances)
+
+
+def test_quantize_rounds_half_points_up_and_clips():
+    assert quantize(np.array([0.4, 0.5, 12.49, 300.0])).tolist() == [0, 1, 12, 255]
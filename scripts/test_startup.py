@@ -0,0 +1,63 @@
+"""
+Fast startup: lazy package imports and the binary catalog lookup order
+
+Usage:
+    python -m pytest -q test_startup.py
+"""
+
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import soapcalc
+from generate_oils_sql import parse_oils
+from soapcalc import binary_catalog, startup
+from soapcalc.binary_catalog import DEFAULT_PATH, _current, cache_path, load_seed_catalog, source_digest
+from soapcalc.catalog import OilCatalog
+
+
+@pytest.fixture(scope='module')
+def parsed():
+    return OilCatalog.from_oils(parse_oils())
+
+
+def same_catalog(a, b):
+    return (a.ids, a.names, a.categories) == (b.ids, b.names, b.categories) and np.array_equal(a.matrix, b.matrix)
+
+
+def test_package_import_does_not_load_numpy():
+    code = "import sys, soapcalc, soapcalc.profiling, soapcalc.startup; print('numpy' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+
+def test_exports_load_on_first_use():
+    assert soapcalc.load_catalog is soapcalc.catalog.load_catalog
+    assert 'evaluate' in dir(soapcalc)
+    with pytest.raises(AttributeError, match='no attribute'):
+        soapcalc.no_such_name
+
+
+def test_shipped_binary_catalog_is_current(parsed):
+    mapped = _current(DEFAULT_PATH, source_digest())
+    assert mapped is not None, 'Regenerate data/oil_catalog.bin with generate_oils_sql.py'
+    assert same_catalog(mapped.to_catalog(), parsed)
+
+
+def test_stale_catalog_is_parsed_then_cached(parsed, tmp_path, monkeypatch):
+    monkeypatch.setattr(binary_catalog, 'DEFAULT_PATH', str(tmp_path / 'missing.bin'))
+    monkeypatch.setenv(binary_catalog.CACHE_ENV_VAR, str(tmp_path / 'cache'))
+    monkeypatch.setattr(startup, '_notes', {})
+    assert same_catalog(load_seed_catalog(), parsed)
+    assert startup._notes == {'catalog': 'parsed'}
+    assert _current(cache_path(source_digest()), source_digest()) is not None
+    assert same_catalog(load_seed_catalog(), parsed)
+    assert startup._notes == {'catalog': 'cached catalog'}
+
+
+def test_report_lists_phases(monkeypatch):
+    monkeypatch.setattr(startup, '_phases', [('imports', 0.0125), ('catalog', 0.002)])
+    monkeypatch.setattr(startup, '_notes', {'catalog': 'binary catalog'})
+    assert startup.report() == '⏱️  Startup: imports 12.5 ms, catalog 2.0 ms (binary catalog); total 14.5 ms'
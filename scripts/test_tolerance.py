@@ -0,0 +1,81 @@
+"""
+Tolerance analysis: fixed lots reproduce the calculator, SAP spread matches theory, and runs are reproducible
+
+Usage:
+    python -m pytest -q test_tolerance.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from soapcalc import load_catalog
+from soapcalc.batch import parse_recipe
+from soapcalc.engine import QUALITIES
+from soapcalc.tolerance import perturb, simulate_lines, simulate_recipe, soap_type_of, variation
+
+RECIPE = {'oils': {'olive-oil': 60, 'coconut': 25, 'castor-oil': 15}, 'superfat': 5, 'total_oil_weight': 1000}
+FIXED = {'sap': variation('none'), 'iodine': variation('none'), 'fatty_acids': variation('none')}
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog()
+
+
+def test_fixed_lots_reproduce_the_nominal_recipe(catalog):
+    percentages, inputs = parse_recipe(RECIPE)
+    report = simulate_recipe(catalog, percentages, inputs, draws=1000, variations=FIXED)
+    required = report['lye_required']
+    assert required['low'] == required['high'] == pytest.approx(report['lye_weight'], abs=0.01)
+    assert report['superfat']['mean'] == pytest.approx(5, abs=0.01) and report['superfat']['p_lye_heavy'] == 0
+    for quality in report['qualities'].values():
+        assert quality['low'] == quality['high'] == quality['mean'] == quality['nominal']
+        assert quality['p_out_of_range'] in (0, 1)
+    assert list(report['qualities']) == list(QUALITIES)
+
+
+def test_sap_spread_matches_the_normal_approximation(catalog):
+    percentages, inputs = parse_recipe(RECIPE)
+    spec = variation('normal', 0.02, relative=True)
+    report = simulate_recipe(catalog, percentages, inputs, draws=50000, variations=dict(FIXED, sap=spec))
+
+    rows = catalog.indices(list(percentages))
+    weights = np.array(list(percentages.values())) / 100 * 1000
+    full_lye = catalog.sap_column('NaOH')[rows].astype(np.float64) * weights
+    sd = 0.95 * np.sqrt(((0.02 * full_lye) ** 2).sum())
+    required = report['lye_required']
+    assert required['mean'] == pytest.approx(0.95 * full_lye.sum(), rel=1e-3)
+    assert required['high'] - required['low'] == pytest.approx(2 * 1.96 * sd, rel=0.05)
+
+
+def test_runs_are_reproducible_and_chunking_independent(catalog):
+    lines = [json.dumps(dict(RECIPE, id=f'r{i}', superfat=i)) for i in range(5)] + ['not json']
+    one = [line for chunk, _ in simulate_lines(catalog, lines, draws=500, chunk_size=1) for line in chunk]
+    many = [line for chunk, _ in simulate_lines(catalog, lines, draws=500, chunk_size=4) for line in chunk]
+    assert one == many
+    assert json.loads(one[-1])['line'] == 6 and 'error' in json.loads(one[-1])
+    assert json.loads(one[0]) != json.loads(one[1])
+
+
+def test_perturb_keeps_uniform_draws_within_the_half_width():
+    rng = np.random.default_rng(0)
+    draws = perturb(rng, [10.0, 20.0], variation('uniform', 0.1, relative=True), 1000)
+    assert draws.shape == (1000, 2)
+    assert (np.abs(draws / [10.0, 20.0] - 1) <= 0.1 + 1e-6).all()
+    assert (perturb(rng, [1.0], variation('none', 5), 3) == 1).all()
+
+
+def test_soap_type_follows_the_lye():
+    assert soap_type_of({}, {'lye_type': 'KOH'}) == 'liquid'
+    assert soap_type_of({'inputs': {'soapType': 'hard'}}, {'lye_type': 'KOH'}) == 'hard'
+    with pytest.raises(ValueError, match='Unknown soap type'):
+        soap_type_of({'soap_type': 'gel'}, {'lye_type': 'NaOH'})
+
+
+@pytest.mark.parametrize('arguments, message', [(('poisson',), 'Unknown distribution'),
+                                                (('normal', -1), 'must not be negative')])
+def test_bad_variations_raise(arguments, message):
+    with pytest.raises(ValueError, match=message):
+        variation(*arguments)